@@ -0,0 +1 @@
+"""Performance benchmarks and load tools for CrossFi Quest (not shipped with the app)."""
@@ -0,0 +1,112 @@
+"""Throughput and memory of streaming bulk progress import and export.
+
+Writes a JSONL cohort of ``--learners`` synthetic learners (profile,
+lessons, achievements, a quiz score history and half of them with a
+linked wallet), imports it into an empty checkpoint store with
+``progress_transfer.import_file`` and exports it again. It reports
+learners per second and peak resident memory of this process and of the
+validation workers. Peak memory should stay flat as ``--learners`` grows.
+
+    python -m benchmarks.bulk_import --learners 1000000 --workers 4
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.rerun_latency import ROOT, git_revision
+from progress_transfer import export_progress, import_file
+from session_checkpoint import CheckpointStore
+
+
+def write_cohort(path, learners):
+    """Synthetic progress records, written one line at a time"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(learners):
+            lessons = list(range(1, 1 + i % 8))
+            record = {
+                'learner_id': f"learner-{i:08d}",
+                'username': f"Learner {i}",
+                'xp': 150 * len(lessons) + i % 97,
+                'tokens': 10 * len(lessons),
+                'completed_lessons': lessons,
+                'lesson_completed_at': {str(lesson): 1.76e9 + lesson * 3600 for lesson in lessons},
+                'achievements': ['first_lesson'] if lessons else [],
+                'quiz_scores': [float((i * 7 + q * 37) % 101) for q in range(i % 12)],
+            }
+            if i % 2:
+                record.update(wallet_connected=True, wallet_address='0x' + f"{i:040x}", wallet_network='CrossFi Testnet')
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+def peak_rss_mib(who):
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--learners', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--dir', help='Working directory (default: a temporary one); use the real DATA_DIR disk')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'bulk_import.json'))
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='crossfi-import-', dir=args.dir) as directory:
+        cohort = os.path.join(directory, 'cohort.jsonl')
+        write_cohort(cohort, args.learners)
+        input_mib = os.path.getsize(cohort) / 2**20
+        baseline_mib = peak_rss_mib(resource.RUSAGE_SELF)
+
+        store = CheckpointStore(os.path.join(directory, 'checkpoints'))
+        started = time.perf_counter()
+        state = import_file(cohort, 'progress', store, chunk_size=args.chunk_size, workers=args.workers)
+        import_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with open(os.path.join(directory, 'export.jsonl'), 'w', encoding='utf-8') as out:
+            exported = export_progress(store, out, 'jsonl')
+        export_seconds = time.perf_counter() - started
+
+    results = {
+        'input_mib': round(input_mib, 1),
+        'imported': state['imported'],
+        'rejected': state['rejected'],
+        'import_seconds': round(import_seconds, 1),
+        'import_per_second': round(state['imported'] / import_seconds),
+        'exported': exported,
+        'export_seconds': round(export_seconds, 1),
+        'export_per_second': round(exported / export_seconds),
+        'peak_rss_mib_before_import': baseline_mib,
+        'peak_rss_mib': peak_rss_mib(resource.RUSAGE_SELF),
+        'peak_worker_rss_mib': peak_rss_mib(resource.RUSAGE_CHILDREN),
+    }
+    print(f"import {results['imported']:,} learners ({results['input_mib']:.0f} MiB) in "
+          f"{results['import_seconds']:.1f} s = {results['import_per_second']:,}/s; "
+          f"export {results['export_seconds']:.1f} s = {results['export_per_second']:,}/s; "
+          f"peak RSS {results['peak_rss_mib']} MiB (workers {results['peak_worker_rss_mib']} MiB)")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'learners': args.learners,
+            'workers': args.workers,
+            'chunk_size': args.chunk_size,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Per-interaction cost of incremental session checkpoints.
+
+Replays typical interactions (lesson completion, a quiz start, four
+answers, the result and a wallet connect) against the real session models
+and times ``SessionCheckpointer.checkpoint`` after each one, as the app does
+at the end of every rerun. This is done for a fresh learner and for one with
+thousands of quiz scores. It reports microseconds and bytes per
+checkpoint, the cost of the periodic compaction snapshot, and how long
+resuming takes (replaying the log and rebuilding the models).
+
+    python -m benchmarks.checkpoint_overhead --sessions 200
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import fake_groq
+from benchmarks.rerun_latency import ROOT, git_revision
+from question_bank import QuestionStore
+from session_checkpoint import CheckpointStore, SessionCheckpointer, restore_models
+from session_models import QuizState, UserData, WalletState
+
+SIZES = {'small': 0, 'large': 5000}
+MODELS = {'user_data': UserData, 'wallet': WalletState, 'quiz_state': QuizState}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def interactions(models, question_ids):
+    """(name, mutation) pairs in the order a learner's reruns would apply them"""
+    user_data, wallet, quiz_state = models['user_data'], models['wallet'], models['quiz_state']
+
+    def complete_lesson():
+        lesson_id = len(user_data.completed_lessons) + 1
+        user_data.completed_lessons.append(lesson_id)
+        user_data.lesson_completed_at[lesson_id] = time.time()
+        user_data.xp += 100
+        user_data.tokens += 10
+
+    def start_quiz():
+        quiz_state.update(active=True, question_ids=question_ids, current_q=0, score=0,
+                          topic='DeFi Concepts', start_time=time.time(), question_started=time.time())
+
+    def answer():
+        quiz_state.score += 1
+        quiz_state.current_q += 1
+        quiz_state.question_started = time.time()
+        user_data.ability += 0.1
+        user_data.ability_answers += 1
+
+    def finish_quiz():
+        user_data.quiz_scores.append(quiz_state.score / 4 * 100)
+        user_data.xp += 20
+        quiz_state.update(active=False, question_ids=(), current_q=0, score=0)
+
+    def connect_wallet():
+        wallet.update(connected=True, address='0x' + 'ab' * 20, network='CrossFi Testnet', balance=1.5)
+
+    return [('no_change', lambda: None), ('complete_lesson', complete_lesson), ('start_quiz', start_quiz)] + \
+        [('answer', answer)] * 4 + [('finish_quiz', finish_quiz), ('connect_wallet', connect_wallet)]
+
+
+def run_size(directory, sessions, quiz_count, compact_after, question_sets):
+    store = CheckpointStore(directory)
+    question_store = QuestionStore()
+    question_id_sets = [question_store.intern_many(questions) for questions in question_sets]
+    timings = {}
+    sizes = {}
+    snapshot_us = []
+    resume_us = []
+    for i in range(sessions):
+        models = {
+            'user_data': UserData(quiz_scores=[float((i * 7 + q * 37) % 101) for q in range(quiz_count)]),
+            'wallet': WalletState(),
+            'quiz_state': QuizState()
+        }
+        checkpointer = SessionCheckpointer(store, models['user_data'].learner_id, question_store,
+                                           compact_after=compact_after, skip={('user_data', 'reviews')})
+        started = time.perf_counter()
+        checkpointer.checkpoint(models)
+        snapshot_us.append((time.perf_counter() - started) * 1e6)
+        for name, mutate in interactions(models, question_id_sets[i % len(question_id_sets)]):
+            mutate()
+            started = time.perf_counter()
+            size = checkpointer.checkpoint(models)
+            timings.setdefault(name, []).append((time.perf_counter() - started) * 1e6)
+            sizes.setdefault(name, []).append(size)
+        started = time.perf_counter()
+        fields, _ = store.load(checkpointer.learner_id)
+        restore_models(fields, MODELS)
+        resume_us.append((time.perf_counter() - started) * 1e6)
+
+    per_interaction = [us for name, values in timings.items() for us in values]
+    return {
+        'checkpoint_us': {
+            'p50': round(statistics.median(per_interaction), 1),
+            'p95': round(percentile(per_interaction, 95), 1),
+            'p99': round(percentile(per_interaction, 99), 1),
+            'max': round(max(per_interaction), 1),
+        },
+        'by_interaction': {
+            name: {'median_us': round(statistics.median(values), 1),
+                   'median_bytes': statistics.median(sizes[name])}
+            for name, values in timings.items()
+        },
+        'snapshot_us': round(statistics.median(snapshot_us), 1),
+        'resume_us': round(statistics.median(resume_us), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sessions', type=int, default=200, help='Simulated sessions per learner size')
+    parser.add_argument('--compact-after', type=int, default=64)
+    parser.add_argument('--dir', help='Checkpoint directory (default: a temporary one); use the real DATA_DIR disk')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'checkpoint_overhead.json'))
+    args = parser.parse_args(argv)
+
+    question_sets = [json.loads(fake_groq.fake_quiz_payload(f"Create 4 questions about DeFi #{i}", 'bench'))['questions']
+                     for i in range(20)]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='crossfi-checkpoints-', dir=args.dir) as directory:
+        for size, quiz_count in SIZES.items():
+            result = run_size(os.path.join(directory, size), args.sessions, quiz_count, args.compact_after,
+                              question_sets)
+            results[size] = result
+            latency = result['checkpoint_us']
+            print(f"{size:6s} checkpoint p50 {latency['p50']:7.1f}  p95 {latency['p95']:7.1f}  "
+                  f"p99 {latency['p99']:7.1f} us   snapshot {result['snapshot_us']:8.1f} us   "
+                  f"resume {result['resume_us']:8.1f} us")
+            for name, row in result['by_interaction'].items():
+                print(f"         {name:16s} {row['median_us']:7.1f} us  {row['median_bytes']:6.0f} B")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'sessions': args.sessions,
+            'compact_after': args.compact_after,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Cohort analytics over a large synthetic learning-event log.
+
+Writes ``--events`` synthetic events for ``--learners`` learners, spread
+over ``--days`` UTC day partitions, with the same schema and writer the
+app uses (``EventLog.write_table``), then times the memory-mapped
+read of the queried columns (warm page cache) and each admin query: the funnel, lesson
+completion rates and score distributions by topic and difficulty.
+
+    python -m benchmarks.event_analytics --events 20000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+
+from benchmarks.rerun_latency import ROOT, git_revision
+from cohort_analytics import COLUMNS, CohortEvents
+from event_log import EVENT_TYPES, SCHEMA, EventLog
+from quiz_generation import QUIZ_DIFFICULTIES, QUIZ_TOPICS
+
+# Share of each event type in the synthetic log (answers dominate, as in the app)
+EVENT_MIX = {'lesson_completed': 0.08, 'quiz_started': 0.1, 'quiz_answered': 0.62, 'quiz_completed': 0.1,
+             'tokens_claimed': 0.05, 'achievement_unlocked': 0.05}
+ACHIEVEMENTS = ['first_lesson', 'level_5', 'perfect_quiz', 'wallet_connected', 'all_lessons']
+LESSONS = 7
+
+
+def _category(indices, values, present):
+    return pa.DictionaryArray.from_arrays(pa.array(indices.astype(np.int16), mask=~present), pa.array(values))
+
+
+def synthetic_day(rng, day, count, learners):
+    """One day's events as a table with ``SCHEMA``"""
+    event = rng.choice(len(EVENT_TYPES), size=count, p=[EVENT_MIX[name] for name in EVENT_TYPES])
+    is_quiz = np.isin(event, [EVENT_TYPES.index(name) for name in ('quiz_started', 'quiz_answered', 'quiz_completed')])
+    is_lesson = event == EVENT_TYPES.index('lesson_completed')
+    is_answer = event == EVENT_TYPES.index('quiz_answered')
+    is_result = event == EVENT_TYPES.index('quiz_completed')
+    is_achievement = event == EVENT_TYPES.index('achievement_unlocked')
+    # Skewed toward low lesson numbers and a long tail of learners, like real drop-off
+    lesson = np.where(is_lesson, np.minimum(rng.geometric(0.35, size=count), LESSONS), 0)
+    learner = rng.zipf(1.3, size=count) % learners
+    score = np.where(is_result, rng.integers(0, 5, size=count) * 25.0, np.nan)
+    return pa.table({
+        'ts': day * 86400 + np.sort(rng.uniform(0, 86400, size=count)),
+        'learner': learner.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15),
+        'event': _category(event, list(EVENT_TYPES), np.ones(count, dtype=bool)),
+        'lesson': lesson.astype(np.int8),
+        'topic': _category(rng.integers(0, len(QUIZ_TOPICS), size=count), list(QUIZ_TOPICS), is_quiz),
+        'difficulty': _category(rng.integers(0, len(QUIZ_DIFFICULTIES), size=count), list(QUIZ_DIFFICULTIES),
+                                is_quiz),
+        'correct': np.where(is_answer, rng.random(count) < 0.65, -1).astype(np.int8),
+        'score': score.astype(np.float32),
+        'tokens': np.where(is_result | is_lesson, 30.0, 0.0).astype(np.float32),
+        'achievement': _category(rng.integers(0, len(ACHIEVEMENTS), size=count), ACHIEVEMENTS, is_achievement),
+    }, schema=SCHEMA)
+
+
+def timed(results, name, fn):
+    started = time.perf_counter()
+    value = fn()
+    results[name] = round(time.perf_counter() - started, 3)
+    print(f"{name:20s} {results[name]:8.3f} s")
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--events', type=int, default=20_000_000)
+    parser.add_argument('--learners', type=int, default=500_000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--files-per-day', type=int, default=4, help='Flushes per day before compaction')
+    parser.add_argument('--dir', help='Event log directory (default: a temporary one); use the real DATA_DIR disk')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'event_analytics.json'))
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(47)
+    first_day = int(time.time() // 86400) - args.days
+    per_file = args.events // (args.days * args.files_per_day)
+    timings = {}
+    with tempfile.TemporaryDirectory(prefix='crossfi-events-', dir=args.dir) as directory:
+        log = EventLog(directory, flush_interval=3600)
+
+        def write():
+            for day in range(first_day, first_day + args.days):
+                for _ in range(args.files_per_day):
+                    log.write_table(synthetic_day(rng, day, per_file, args.learners))
+
+        timed(timings, 'write', write)
+        timed(timings, 'compact', log.compact)
+        disk_bytes = sum(os.path.getsize(path) for files in log.partitions().values() for path in files)
+        table = timed(timings, 'read', lambda: log.read(COLUMNS))
+        events = timed(timings, 'prepare', lambda: CohortEvents(table))
+        timed(timings, 'funnel', events.funnel)
+        timed(timings, 'lesson_completion', lambda: events.lesson_completion(range(1, LESSONS + 1)))
+        timed(timings, 'score_distribution', events.score_distribution)
+        timings['total_query'] = round(sum(timings[name] for name in
+                                           ('read', 'prepare', 'funnel', 'lesson_completion', 'score_distribution')), 3)
+        print(f"{len(events):,} events, {events.learners:,} learners, {disk_bytes / 2**20:.0f} MiB on disk; "
+              f"read + all queries {timings['total_query']:.2f} s")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'events': len(events),
+            'learners': events.learners,
+            'days': args.days,
+            'disk_mib': round(disk_bytes / 2**20, 1),
+        },
+        'seconds': timings,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
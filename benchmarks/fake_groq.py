@@ -0,0 +1,138 @@
+"""Deterministic stand-in for the Groq client used by benchmarks.
+
+``FakeGroq`` mimics the parts of ``groq.Groq`` the app touches
+(``chat.completions.create`` returning ``choices`` and ``usage``) and
+answers with quiz JSON derived from a hash of the request, after an
+optional simulated latency. ``install()`` swaps it in for ``groq.Groq``.
+``serve()`` exposes the same answers over HTTP as an OpenAI-compatible
+``/chat/completions`` endpoint for load tests against the real SDK.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+_real_sleep = time.sleep
+
+
+def fake_quiz_payload(prompt, model, count=4):
+    """Stable quiz JSON for a prompt: same prompt and model, same questions"""
+    topic_match = re.search(r'questions about (.+?) in CrossFi', prompt)
+    topic = topic_match.group(1) if topic_match else 'CrossFi'
+    seed = int(hashlib.sha256(f'{model}|{prompt}'.encode('utf-8')).hexdigest(), 16)
+    questions = []
+    for i in range(count):
+        correct = (seed >> (i * 2)) % 4
+        questions.append({
+            'question': f'Benchmark question {i + 1} about {topic} ({seed % 10007})?',
+            'options': [f'{label}) Option {label} for {topic}' for label in 'ABCD'],
+            'correct': correct,
+            'explanation': f'Option {"ABCD"[correct]} is correct for this deterministic benchmark item.'
+        })
+    return json.dumps({'questions': questions})
+
+
+class FakeGroq:
+    """Drop-in for ``groq.Groq`` with configurable latency and failure rate"""
+
+    latency = 0.0
+    fail_every = 0
+
+    def __init__(self, api_key=None, timeout=None, max_retries=None, **kwargs):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, model, temperature=None, max_tokens=None, timeout=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            _real_sleep(self.latency)
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise RuntimeError("FakeGroq simulated failure")
+        prompt = messages[-1]['content']
+        content = fake_quiz_payload(prompt, model)
+        usage = SimpleNamespace(
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=len(content) // 4,
+            total_tokens=(len(prompt) + len(content)) // 4
+        )
+        message = SimpleNamespace(role='assistant', content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, index=0)], usage=usage, model=model)
+
+
+def install(latency=0.0, fail_every=0):
+    """Replace ``groq.Groq`` so the app's ``from groq import Groq`` picks up the fake"""
+    import groq
+    FakeGroq.latency = latency
+    FakeGroq.fail_every = fail_every
+    groq.Groq = FakeGroq
+    return FakeGroq
+
+
+class _ChatCompletionsHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    jitter = 0.0
+    rng = random.Random(0)
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send(404, {'error': {'message': 'not found'}})
+            return
+        delay = self.latency + (self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            _real_sleep(delay)
+        prompt = request['messages'][-1]['content']
+        model = request.get('model', 'fake-model')
+        content = fake_quiz_payload(prompt, model)
+        self._send(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4,
+                      'total_tokens': (len(prompt) + len(content)) // 4}
+        })
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=0, latency=0.0, jitter=0.0, ready=None):
+    """Run an OpenAI-compatible chat completions endpoint until the process exits.
+
+    Point the app at it with ``GROQ_BASE_URL = "http://127.0.0.1:<port>"``.
+    ``ready`` (a multiprocessing queue) receives the bound port.
+    """
+    handler = type('FakeGroqHandler', (_ChatCompletionsHandler,), {'latency': latency, 'jitter': jitter})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local fake Groq chat completions server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=1.0, help='Seconds per completion')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Uniform +/- seconds added to latency')
+    args = parser.parse_args()
+    print(f"Fake Groq listening on http://127.0.0.1:{args.port}")
+    serve(args.port, args.latency, args.jitter)
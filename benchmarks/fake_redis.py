@@ -0,0 +1,122 @@
+"""Minimal Redis-protocol server for exercising the shared cache locally.
+
+Implements the commands ``shared_cache.RedisCache`` sends (PING, AUTH,
+SELECT, GET, SET with NX/XX/EX/PX, DEL, EXISTS, and EVAL of its lease
+release script) over RESP with an in-memory dict, so several app processes
+can share a cache without a real Redis::
+
+    python -m benchmarks.fake_redis --port 6380
+    # secrets.toml: SHARED_CACHE_URL = "redis://127.0.0.1:6380"
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+from shared_cache import RedisCache
+
+
+class FakeRedisStore:
+    """Keys with optional expiry, guarded by one lock"""
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self.values.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self.values[key]
+            return None
+        return entry
+
+    def execute(self, args):
+        command = args[0].decode('utf-8').upper()
+        now = time.monotonic()
+        with self.lock:
+            if command == 'PING':
+                return 'PONG'
+            if command in ('AUTH', 'SELECT'):
+                return 'OK'
+            if command == 'GET':
+                entry = self._live(args[1], now)
+                return None if entry is None else entry[0]
+            if command == 'SET':
+                key, value = args[1], args[2]
+                expires = None
+                only_new = only_existing = False
+                options = [arg.decode('utf-8').upper() for arg in args[3:]]
+                for i, option in enumerate(options):
+                    if option == 'NX':
+                        only_new = True
+                    elif option == 'XX':
+                        only_existing = True
+                    elif option == 'EX':
+                        expires = now + int(options[i + 1])
+                    elif option == 'PX':
+                        expires = now + int(options[i + 1]) / 1000
+                exists = self._live(key, now) is not None
+                if (only_new and exists) or (only_existing and not exists):
+                    return None
+                self.values[key] = (value, expires)
+                return 'OK'
+            if command == 'DEL':
+                return sum(self.values.pop(key, None) is not None for key in args[1:])
+            if command == 'EXISTS':
+                return sum(self._live(key, now) is not None for key in args[1:])
+            if command == 'EVAL' and args[1].decode('utf-8') == RedisCache.release_script:
+                # No Lua here: the one script the cache sends deletes KEYS[1] if it holds ARGV[1]
+                entry = self._live(args[3], now)
+                if entry is not None and entry[0] == args[4]:
+                    del self.values[args[3]]
+                    return 1
+                return 0
+        return Exception(f"ERR unknown command '{command}'")
+
+
+def _encode(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Exception):
+        return b'-%s\r\n' % str(reply).encode('utf-8')
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, str):
+        return b'+%s\r\n' % reply.encode('utf-8')
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    store = None
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if not line.startswith(b'*'):
+                self.wfile.write(b'-ERR inline commands are not supported\r\n')
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(_encode(self.store.execute(args)))
+
+
+def serve(port=6380, ready=None):
+    """Serve until the process exits; ``ready`` (a queue) receives the bound port"""
+    handler = type('FakeRedisHandler', (_RespHandler,), {'store': FakeRedisStore()})
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Redis-protocol stand-in for the shared cache')
+    parser.add_argument('--port', type=int, default=6380)
+    args = parser.parse_args()
+    print(f"Fake Redis listening on 127.0.0.1:{args.port}")
+    serve(args.port)
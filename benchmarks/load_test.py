@@ -0,0 +1,380 @@
+"""Concurrent-session load generator and capacity report for enhanced.py.
+
+Starts the app under a real Streamlit server (``benchmarks.serve_app``)
+and a local fake Groq endpoint (``benchmarks.fake_groq``) with
+configurable latency, then runs N simulated learners over the Streamlit
+websocket protocol. Learners complete lessons, take quizzes, connect a
+wallet and claim tokens with randomized think times.
+
+    python -m benchmarks.load_test --sessions 10 25 50 --duration 60
+    python -m benchmarks.load_test --sessions 25 --baseline benchmarks/results/load_baseline.json
+
+Each load level gets a fresh server. The report gives throughput,
+p50/p95/p99 interaction latency (click until the rerun it triggers has
+finished, including ``st.rerun()`` chains), server CPU and RSS per session,
+and a capacity estimate in sessions per core. Server CPU and memory are
+read from ``/proc`` and therefore need Linux.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+from benchmarks import fake_groq
+from benchmarks.rerun_latency import ROOT, git_revision
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+# How often a learner waiting for a background quiz build reruns (the app's QUIZ_JOB_POLL_SECONDS)
+QUIZ_POLL_SECONDS = 1.0
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def process_cpu_seconds(pid):
+    """User + system CPU time of a process from /proc/<pid>/stat"""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def process_rss_kb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+class StreamlitSession:
+    """Minimal Streamlit websocket client: rerun the script and click buttons"""
+
+    def __init__(self, url):
+        self.url = url
+        self.ws = None
+        self.buttons = {}
+
+    async def connect(self):
+        import websockets
+        self.ws = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self, trigger_id=None):
+        """Send one rerun request and wait until the app settles; returns False on app errors"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        if trigger_id is not None:
+            widget = msg.rerun_script.widget_states.widgets.add()
+            widget.id = trigger_id
+            widget.trigger_value = True
+        await self.ws.send(msg.SerializeToString())
+
+        buttons = {}
+        ok = True
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'button':
+                    buttons[element.button.label] = element.button.id
+                elif element_type == 'exception':
+                    ok = False
+            elif kind == 'script_finished':
+                status = forward.script_finished
+                if status == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # st.rerun(): the follow-up run is part of the same interaction
+                    buttons = {}
+                    continue
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    ok = False
+                break
+        self.buttons = buttons
+        return ok
+
+    def find(self, label_prefix):
+        return next((widget_id for label, widget_id in self.buttons.items()
+                     if label.startswith(label_prefix)), None)
+
+
+class Learner:
+    """One simulated learner driving its own session until the deadline"""
+
+    def __init__(self, learner_id, url, think_time, deadline, results):
+        self.session = StreamlitSession(url)
+        self.think_time = think_time
+        self.deadline = deadline
+        self.results = results
+        self.rng = random.Random(learner_id)
+
+    async def think(self):
+        if self.think_time > 0:
+            await asyncio.sleep(min(self.rng.expovariate(1 / self.think_time),
+                                    max(0.0, self.deadline - time.time())))
+
+    async def interact(self, name, trigger_id=None):
+        if time.time() >= self.deadline:
+            return False
+        started = time.perf_counter()
+        try:
+            ok = await self.session.rerun(trigger_id)
+        except Exception:
+            ok = False
+        self.results.append((name, (time.perf_counter() - started) * 1000, ok))
+        return ok
+
+    async def click(self, name, label_prefix):
+        widget_id = self.session.find(label_prefix)
+        if widget_id is None:
+            return False
+        return await self.interact(name, widget_id)
+
+    async def run(self):
+        try:
+            await self.session.connect()
+        except Exception:
+            self.results.append(('connect', 0.0, False))
+            return
+        try:
+            if not await self.interact('load'):
+                return
+            while time.time() < self.deadline:
+                await self.think()
+                if await self.click('complete_lesson', '🎯 Complete Lesson'):
+                    continue
+
+                if await self.click('start_quiz', '🚀 Start Quiz'):
+                    # The quiz is built in the background; poll as the browser's status fragment does
+                    while time.time() < self.deadline and self.session.find('✖️ Cancel Quiz'):
+                        await asyncio.sleep(QUIZ_POLL_SECONDS)
+                        await self.interact('poll_quiz')
+                    while time.time() < self.deadline and self.session.find('✅ Submit Answer'):
+                        await self.think()
+                        await self.click('submit_answer', '✅ Submit Answer')
+                    await self.click('finish_quiz', '🔄 Take Another Quiz')
+
+                await self.think()
+                await self.click('connect_wallet', '🦊 MetaMask')
+                if self.session.find('🎯 Claim Tokens'):
+                    await self.think()
+                    await self.click('claim_tokens', '🎯 Claim Tokens')
+        finally:
+            await self.session.close()
+
+
+def start_fake_groq(latency, jitter):
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=fake_groq.serve, args=(0, latency, jitter, ready), daemon=True)
+    process.start()
+    return process, ready.get(timeout=10)
+
+
+def start_app_server(port, workdir, keep_sleeps, timeout=60):
+    """Run the app via benchmarks.serve_app in ``workdir`` and wait for /_stcore/health"""
+    command = [sys.executable, '-m', 'benchmarks.serve_app', '--port', str(port)]
+    if keep_sleeps:
+        command.append('--keep-sleeps')
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    server = subprocess.Popen(command, cwd=workdir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.25)
+    server.terminate()
+    raise RuntimeError(f"Streamlit server did not become healthy on port {port}")
+
+
+def write_secrets(workdir, groq_port, data_dir):
+    os.makedirs(os.path.join(workdir, '.streamlit'), exist_ok=True)
+    with open(os.path.join(workdir, '.streamlit', 'secrets.toml'), 'w', encoding='utf-8') as f:
+        f.write(f'GROQ_API_KEY = "load-test-fake-key"\n'
+                f'GROQ_BASE_URL = "http://127.0.0.1:{groq_port}"\n'
+                f'METRICS_PORT = 0\n'
+                f'DATA_DIR = "{data_dir}"\n')
+
+
+async def drive(sessions, url, args, results):
+    deadline = time.time() + args.ramp_up + args.duration
+    tasks = []
+    for i in range(sessions):
+        tasks.append(asyncio.create_task(Learner(i, url, args.think_time, deadline, results).run()))
+        if args.ramp_up:
+            await asyncio.sleep(args.ramp_up / sessions)
+    await asyncio.gather(*tasks)
+
+
+async def sample_server(pid, stop, samples):
+    while not stop.is_set():
+        samples.append(process_rss_kb(pid))
+        await asyncio.sleep(0.5)
+
+
+async def run_level_async(sessions, url, pid, args):
+    results = []
+    samples = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_server(pid, stop, samples))
+    cpu_before = process_cpu_seconds(pid)
+    wall_before = time.time()
+    await drive(sessions, url, args, results)
+    wall = time.time() - wall_before
+    cpu = process_cpu_seconds(pid) - cpu_before
+    stop.set()
+    await sampler
+    return results, wall, cpu, samples
+
+
+def run_level(sessions, args, groq_port, port):
+    """Fresh server, ``sessions`` concurrent learners for ramp-up + duration seconds"""
+    with tempfile.TemporaryDirectory(prefix='crossfi-load-') as workdir:
+        write_secrets(workdir, groq_port, os.path.join(workdir, 'data'))
+        server = start_app_server(port, workdir, args.keep_sleeps)
+        try:
+            if args.warm_up == 'learner':
+                # Warm the process so imports and cached resources are not billed to the level
+                asyncio.run(Learner(-1, f'ws://127.0.0.1:{port}/_stcore/stream', 0, time.time() + 5, []).run())
+            elif args.warm_up == 'health-check':
+                # What a deploy does before routing traffic: one server-side script run primes the worker
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/script-health-check', timeout=90) as response:
+                    response.read()
+            rss_idle = process_rss_kb(server.pid)
+            results, wall, cpu, samples = asyncio.run(
+                run_level_async(sessions, f'ws://127.0.0.1:{port}/_stcore/stream', server.pid, args))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    latencies = [ms for _, ms, ok in results if ok]
+    per_interaction = {}
+    for name, ms, ok in results:
+        if ok:
+            per_interaction.setdefault(name, []).append(ms)
+    rss_peak = max(samples or [rss_idle])
+    cores_per_session = cpu / wall / sessions if wall and sessions else 0.0
+    return {
+        'sessions': sessions,
+        'wall_seconds': round(wall, 2),
+        'interactions': len(results),
+        'errors': sum(1 for _, _, ok in results if not ok),
+        'throughput_per_s': round(len(latencies) / wall, 3) if wall else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 1),
+            'p95': round(percentile(latencies, 95), 1),
+            'p99': round(percentile(latencies, 99), 1),
+            'mean': round(statistics.mean(latencies), 1) if latencies else 0.0,
+        },
+        'by_interaction_p95_ms': {name: round(percentile(values, 95), 1)
+                                  for name, values in sorted(per_interaction.items())},
+        'server_cpu_seconds': round(cpu, 2),
+        'server_cpu_cores': round(cpu / wall, 3) if wall else 0.0,
+        'server_rss_idle_kb': rss_idle,
+        'server_rss_peak_kb': rss_peak,
+        'rss_per_session_kb': round((rss_peak - rss_idle) / sessions, 1) if sessions else 0.0,
+        'sessions_per_core': round(1 / cores_per_session, 1) if cores_per_session else None,
+    }
+
+
+def capacity(levels, slo_p95_ms):
+    """Sessions per core from the busiest level that still met the p95 SLO without errors"""
+    passing = [level for level in levels
+               if level['latency_ms']['p95'] <= slo_p95_ms and not level['errors'] and level['sessions_per_core']]
+    if not passing:
+        return None
+    return max(passing, key=lambda level: level['sessions'])['sessions_per_core']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[10, 25, 50],
+                        help='Concurrent learner counts, one load level each')
+    parser.add_argument('--duration', type=float, default=60.0, help='Seconds of load per level after ramp-up')
+    parser.add_argument('--ramp-up', type=float, default=5.0, help='Seconds over which learners connect')
+    parser.add_argument('--think-time', type=float, default=3.0, help='Mean seconds between interactions')
+    parser.add_argument('--groq-latency', type=float, default=1.0, help='Fake Groq seconds per completion')
+    parser.add_argument('--groq-jitter', type=float, default=0.3)
+    parser.add_argument('--slo-p95-ms', type=float, default=1000.0, help='p95 interaction latency target')
+    parser.add_argument('--port', type=int, default=8599, help='Port for the app server under test')
+    parser.add_argument('--keep-sleeps', action='store_true', help='Keep the app\'s fixed UX pauses')
+    parser.add_argument('--warm-up', choices=('learner', 'health-check', 'none'), default='learner',
+                        help='How each fresh server is warmed before load: a full learner session (steady '
+                             'state), the deploy priming request, or nothing (a cold rolling deploy)')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'load_latest.json'))
+    parser.add_argument('--baseline', help='Earlier load report to compare capacity against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed relative capacity drop')
+    args = parser.parse_args(argv)
+
+    groq_process, groq_port = start_fake_groq(args.groq_latency, args.groq_jitter)
+    levels = []
+    try:
+        for sessions in args.sessions:
+            level = run_level(sessions, args, groq_port, args.port)
+            levels.append(level)
+            print(f"{sessions:4d} sessions  {level['throughput_per_s']:7.2f} int/s  "
+                  f"p50 {level['latency_ms']['p50']:7.1f}  p95 {level['latency_ms']['p95']:7.1f}  "
+                  f"p99 {level['latency_ms']['p99']:7.1f} ms  cpu {level['server_cpu_cores']:.2f} cores  "
+                  f"{level['rss_per_session_kb']:8.1f} KiB/session  errors {level['errors']}", flush=True)
+    finally:
+        groq_process.terminate()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'cpu_count': os.cpu_count(),
+            'duration': args.duration,
+            'think_time': args.think_time,
+            'groq_latency': args.groq_latency,
+            'slo_p95_ms': args.slo_p95_ms,
+            'keep_sleeps': args.keep_sleeps,
+            'warm_up': args.warm_up,
+        },
+        'levels': levels,
+        'sessions_per_core': capacity(levels, args.slo_p95_ms),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Capacity: {report['sessions_per_core']} sessions/core at p95 <= {args.slo_p95_ms:.0f} ms")
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            before = json.load(f).get('sessions_per_core')
+        after = report['sessions_per_core']
+        print(f"Capacity vs baseline: {before} -> {after} sessions/core")
+        if before and (after is None or after < before * (1 - args.tolerance)):
+            print("REGRESSION: capacity dropped")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""Headless rerun-latency and memory benchmarks for enhanced.py.
+
+Drives ``main()`` through Streamlit's ``AppTest`` with Groq replaced by
+``FakeGroq`` and measures representative flows for a fresh learner and a
+heavy learner with thousands of quiz scores.
+Results are written as JSON; pass ``--baseline`` to fail on regressions.
+
+    python -m benchmarks.rerun_latency --output benchmarks/results/latest.json
+    python -m benchmarks.rerun_latency --baseline benchmarks/results/baseline.json
+
+The deliberate UX pauses in enhanced.py (``time.sleep`` after an answer
+and during a claim) are skipped unless ``--keep-sleeps`` is given, so the
+numbers reflect server work rather than fixed delays. Section timings come
+from the app's own rerun profiler (``DEBUG_MODE``).
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import fake_groq
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'enhanced.py')
+
+SIZES = ('small', 'large')
+
+# Pause between reruns while a quiz is built in the background (not timed; the app polls every second)
+QUIZ_POLL_SECONDS = 0.05
+
+
+def make_user_data(size, quiz_count=5000):
+    """Seed ``user_data`` for a learner; None lets the app create a fresh profile.
+
+    Lesson completions are bounded by the curriculum, so the heavy learner
+    has finished lessons 1-4 (leaving 'Complete Lesson 5' clickable) and
+    carries a long quiz history.
+    """
+    if size == 'small':
+        return None
+    return {
+        'username': 'bench_power_user',
+        'level': 50,
+        'xp': 40000,
+        'tokens': 1200,
+        'completed_lessons': [1, 2, 3, 4],
+        'streak': 30,
+        'last_login': datetime.now().isoformat(),
+        'achievements': ['first_lesson', 'level_5', 'perfect_quiz'],
+        'quiz_scores': [float((i * 37) % 101) for i in range(quiz_count)],
+        'total_study_time': 25 * quiz_count
+    }
+
+
+def skip_app_sleeps():
+    """Make time.sleep a no-op when called from enhanced.py itself"""
+    real_sleep = time.sleep
+
+    def sleep(seconds):
+        if sys._getframe(1).f_code.co_filename == APP_PATH:
+            return
+        real_sleep(seconds)
+
+    time.sleep = sleep
+
+
+class Bench:
+    """Creates AppTest sessions and collects timed reruns plus profiler sections"""
+
+    def __init__(self, data_dir, timeout=120):
+        self.data_dir = data_dir
+        self.timeout = timeout
+        self.log_path = os.path.join(data_dir, 'rerun_profile.jsonl')
+        self.log_offset = 0
+
+    def new_app(self, user_data=None):
+        from streamlit.testing.v1 import AppTest
+        at = AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+        at.secrets['GROQ_API_KEY'] = 'benchmark-fake-key'
+        at.secrets['METRICS_PORT'] = 0
+        at.secrets['DEBUG_MODE'] = True
+        at.secrets['DATA_DIR'] = self.data_dir
+        if user_data is not None:
+            at.session_state['user_data'] = copy.deepcopy(user_data)
+        return at
+
+    def drain_sections(self):
+        """Profiler lines written since the last call"""
+        if not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path, encoding='utf-8') as f:
+            f.seek(self.log_offset)
+            lines = f.readlines()
+            self.log_offset = f.tell()
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+def timed(steps, name, action):
+    started = time.perf_counter()
+    action()
+    steps.append((name, (time.perf_counter() - started) * 1000))
+
+
+def click(at, label_prefix):
+    button = next((b for b in at.button if b.label.startswith(label_prefix)), None)
+    if button is None:
+        raise RuntimeError(f"No button starting with {label_prefix!r}")
+    return button.click().run
+
+
+def check(at):
+    if at.exception:
+        raise RuntimeError(f"App raised: {at.exception[0].value}")
+
+
+# Flows: each takes a prepared Bench and user_data, returns [(step, ms), ...]
+
+def flow_cold_load(bench, user_data):
+    import streamlit as st
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    steps = []
+    at = bench.new_app(user_data)
+    timed(steps, 'first_run', at.run)
+    check(at)
+    return steps
+
+
+def flow_primed_load(bench, user_data):
+    # A fresh process primed by one script run (the deploy's health check), then the first learner
+    import streamlit as st
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    bench.new_app().run()
+    steps = []
+    at = bench.new_app(user_data)
+    timed(steps, 'first_run', at.run)
+    check(at)
+    return steps
+
+
+def flow_open_lesson(bench, user_data):
+    # Expanders open client-side; every lesson body is rendered on each rerun
+    steps = []
+    at = bench.new_app(user_data)
+    at.run()
+    timed(steps, 'rerun', at.run)
+    check(at)
+    return steps
+
+
+def flow_complete_lesson(bench, user_data):
+    steps = []
+    at = bench.new_app(user_data)
+    at.run()
+    timed(steps, 'complete_lesson', click(at, '🎯 Complete Lesson'))
+    check(at)
+    return steps
+
+
+def flow_full_quiz(bench, user_data):
+    steps = []
+    at = bench.new_app(user_data)
+    at.run()
+    timed(steps, 'start_quiz', click(at, '🚀 Start Quiz'))
+    check(at)
+    # The quiz is built in the background; rerun as the page's status fragment would until it is ready
+    while any(b.label == '✖️ Cancel Quiz' for b in at.button):
+        time.sleep(QUIZ_POLL_SECONDS)
+        timed(steps, 'poll_quiz', at.run)
+        check(at)
+    while any(b.label == '✅ Submit Answer' for b in at.button):
+        timed(steps, 'submit_answer', click(at, '✅ Submit Answer'))
+        check(at)
+    timed(steps, 'take_another', click(at, '🔄 Take Another Quiz'))
+    check(at)
+    return steps
+
+
+def flow_wallet_connect_claim(bench, user_data):
+    steps = []
+    at = bench.new_app(user_data)
+    if user_data is None:
+        # A fresh learner needs something to claim
+        at.run()
+        at.session_state['user_data'].tokens = 100
+    at.run()
+    timed(steps, 'connect_wallet', click(at, '🦊 MetaMask'))
+    check(at)
+    timed(steps, 'claim_tokens', click(at, '🎯 Claim Tokens'))
+    check(at)
+    return steps
+
+
+def flow_progress_tab(bench, user_data):
+    # All tabs render on each rerun; the Progress share is read from the profiler
+    steps = []
+    at = bench.new_app(user_data)
+    at.run()
+    timed(steps, 'rerun', at.run)
+    check(at)
+    return steps
+
+
+FLOWS = {
+    'cold_load': flow_cold_load,
+    'primed_load': flow_primed_load,
+    'open_lesson': flow_open_lesson,
+    'complete_lesson': flow_complete_lesson,
+    'full_quiz': flow_full_quiz,
+    'wallet_connect_claim': flow_wallet_connect_claim,
+    'progress_tab': flow_progress_tab,
+}
+
+
+def summarize_sections(records):
+    per_section = {}
+    for record in records:
+        for name, ms in record['sections'].items():
+            per_section.setdefault(name, []).append(ms)
+    return {name: round(statistics.median(values), 3) for name, values in sorted(per_section.items())}
+
+
+def run_flow(bench, flow, size, repeat, warmup):
+    user_data = make_user_data(size)
+    for _ in range(warmup):
+        flow(bench, user_data)
+    bench.drain_sections()
+
+    totals = []
+    step_times = {}
+    for _ in range(repeat):
+        steps = flow(bench, user_data)
+        totals.append(sum(ms for _, ms in steps))
+        for name, ms in steps:
+            step_times.setdefault(name, []).append(ms)
+    sections = summarize_sections(bench.drain_sections())
+
+    # Separate pass for memory so tracemalloc overhead does not skew latency
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    flow(bench, user_data)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    bench.drain_sections()
+
+    return {
+        'median_ms': round(statistics.median(totals), 3),
+        'min_ms': round(min(totals), 3),
+        'max_ms': round(max(totals), 3),
+        'steps_ms': {name: round(statistics.median(values), 3) for name, values in step_times.items()},
+        'sections_ms': sections,
+        'peak_alloc_kb': round((peak - before) / 1024, 1),
+        'retained_alloc_kb': round((after - before) / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Flows whose median got slower than baseline by more than the tolerance"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get('results', {}).get(key)
+        if not previous:
+            continue
+        delta = result['median_ms'] - previous['median_ms']
+        if delta > min_delta_ms and result['median_ms'] > previous['median_ms'] * (1 + tolerance):
+            regressions.append((key, previous['median_ms'], result['median_ms']))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--flows', nargs='+', choices=sorted(FLOWS), default=list(FLOWS))
+    parser.add_argument('--sizes', nargs='+', choices=SIZES, default=list(SIZES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--groq-latency', type=float, default=0.0, help='Simulated Groq latency in seconds')
+    parser.add_argument('--keep-sleeps', action='store_true', help='Keep the app\'s fixed UX pauses')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'latest.json'))
+    parser.add_argument('--baseline', help='Earlier results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='Ignore slowdowns smaller than this')
+    args = parser.parse_args(argv)
+
+    import logging
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    fake_groq.install(latency=args.groq_latency)
+    if not args.keep_sleeps:
+        skip_app_sleeps()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='crossfi-bench-') as data_dir:
+        bench = Bench(data_dir)
+        for size in args.sizes:
+            for name in args.flows:
+                key = f'{name}/{size}'
+                results[key] = run_flow(bench, FLOWS[name], size, args.repeat, args.warmup)
+                print(f"{key:32s} median {results[key]['median_ms']:9.1f} ms   "
+                      f"peak {results[key]['peak_alloc_kb']:9.1f} KiB", flush=True)
+
+    import streamlit
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'streamlit': streamlit.__version__,
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'groq_latency': args.groq_latency,
+            'keep_sleeps': args.keep_sleeps,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: {before:.1f} ms -> {after:.1f} ms")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
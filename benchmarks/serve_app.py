@@ -0,0 +1,39 @@
+"""Launch ``streamlit run enhanced.py`` for load tests.
+
+Identical to the normal CLI except that, unless ``--keep-sleeps`` is
+given, the app's fixed UX pauses are skipped so measured latency is
+server work. Secrets are read from ``.streamlit/secrets.toml`` in the
+working directory as usual.
+
+    python -m benchmarks.serve_app --port 8501
+"""
+import argparse
+import sys
+
+from benchmarks.rerun_latency import APP_PATH, skip_app_sleeps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=8501)
+    parser.add_argument('--keep-sleeps', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not args.keep_sleeps:
+        skip_app_sleeps()
+
+    from streamlit.web import cli
+    sys.argv = [
+        'streamlit', 'run', APP_PATH,
+        '--server.headless', 'true',
+        '--server.port', str(args.port),
+        '--server.fileWatcherType', 'none',
+        '--server.scriptHealthCheckEnabled', 'true',
+        '--browser.gatherUsageStats', 'false',
+        '--logger.level', 'error',
+    ]
+    return cli.main()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Per-session memory of learner state at many concurrent sessions.
+
+Builds N sessions' worth of ``user_data``/``wallet``/``quiz_state``/``ui_state``
+in two layouts and measures the retained allocations with tracemalloc:
+
+* ``dicts``: nested dicts, with each in-quiz session holding its own parsed
+  copy of the question dicts (the layout before the slotted models)
+* ``slotted``: the ``session_models`` classes, with quiz state holding IDs
+  into one shared ``QuestionStore``
+
+    python -m benchmarks.session_memory --sessions 10000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import fake_groq
+from benchmarks.rerun_latency import ROOT, git_revision
+from question_bank import QuestionStore
+from session_models import QuizState, ScoreHistory, UiState, UserData, WalletState
+
+TOPICS = ["Blockchain Fundamentals", "CrossFi Platform", "Cosmos SDK & EVM", "DeFi Concepts",
+          "Smart Contract Development"]
+DIFFICULTIES = ["beginner", "intermediate", "advanced"]
+
+
+def quiz_payloads(distinct_quizzes):
+    """Raw Groq-style JSON for a pool of generated quizzes sessions draw from"""
+    payloads = []
+    for i in range(distinct_quizzes):
+        topic = TOPICS[i % len(TOPICS)]
+        prompt = f"Create 4 challenging multiple-choice questions about {topic} in CrossFi #{i}"
+        payloads.append((topic, DIFFICULTIES[i % len(DIFFICULTIES)], fake_groq.fake_quiz_payload(prompt, 'bench')))
+    return payloads
+
+
+def session_profile(i, quiz_count):
+    """Deterministic progress for session ``i``"""
+    return {
+        'xp': 150 * (i % 20),
+        'tokens': 25 * (i % 13),
+        'completed_lessons': list(range(1, i % 6)),
+        'achievements': ['first_lesson'] if i % 6 > 1 else [],
+        'quiz_scores': [float((i * 7 + q * 37) % 101) for q in range(quiz_count)],
+    }
+
+
+def build_dict_session(i, payload, quiz_count):
+    topic, difficulty, raw = payload
+    profile = session_profile(i, quiz_count)
+    return {
+        'user_data': {
+            'username': '',
+            'level': 1,
+            'xp': profile['xp'],
+            'tokens': profile['tokens'],
+            'completed_lessons': profile['completed_lessons'],
+            'lesson_completed_at': {},
+            'streak': 0,
+            'last_login': datetime.now().isoformat(),
+            'achievements': profile['achievements'],
+            'quiz_scores': ScoreHistory(profile['quiz_scores']),
+            'total_study_time': 0
+        },
+        'wallet': {'connected': False, 'address': '', 'network': '', 'balance': 0},
+        'quiz_state': {
+            'active': True,
+            # Every generation is parsed into fresh objects owned by the session
+            'questions': json.loads(raw)['questions'],
+            'current_q': 0,
+            'score': 0,
+            'topic': topic,
+            'difficulty': difficulty,
+            'start_time': 0.0
+        },
+        'ui_state': {'theme': 'light', 'show_advanced': False, 'is_admin': False}
+    }
+
+
+def build_slotted_session(i, payload, quiz_count, store):
+    topic, difficulty, raw = payload
+    profile = session_profile(i, quiz_count)
+    return {
+        'user_data': UserData(
+            xp=profile['xp'],
+            tokens=profile['tokens'],
+            completed_lessons=profile['completed_lessons'],
+            achievements=profile['achievements'],
+            quiz_scores=profile['quiz_scores']
+        ),
+        'wallet': WalletState(),
+        'quiz_state': QuizState(
+            active=True,
+            question_ids=store.intern_many(json.loads(raw)['questions']),
+            topic=topic,
+            difficulty=difficulty,
+            start_time=0.0
+        ),
+        'ui_state': UiState()
+    }
+
+
+def measure(build, sessions):
+    """Retained bytes after building ``sessions`` session states (and any shared store)"""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    states = build(sessions)
+    gc.collect()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del states
+    return {
+        'retained_bytes': after - before,
+        'bytes_per_session': round((after - before) / sessions, 1),
+        'peak_bytes': peak - before,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sessions', type=int, default=10_000)
+    parser.add_argument('--quiz-count', type=int, default=20, help='Quiz scores per learner')
+    parser.add_argument('--distinct-quizzes', type=int, default=500,
+                        help='Generated quizzes the sessions are spread over')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', 'session_memory.json'))
+    args = parser.parse_args(argv)
+
+    payloads = quiz_payloads(args.distinct_quizzes)
+
+    def dict_sessions(n):
+        return [build_dict_session(i, payloads[i % len(payloads)], args.quiz_count) for i in range(n)]
+
+    def slotted_sessions(n):
+        store = QuestionStore()
+        return store, [build_slotted_session(i, payloads[i % len(payloads)], args.quiz_count, store)
+                       for i in range(n)]
+
+    results = {
+        'dicts': measure(dict_sessions, args.sessions),
+        'slotted': measure(slotted_sessions, args.sessions),
+    }
+    for name, result in results.items():
+        print(f"{name:8s} {result['bytes_per_session']:9.0f} B/session   "
+              f"{result['retained_bytes'] / 2**20:8.1f} MiB for {args.sessions} sessions")
+    saving = 1 - results['slotted']['retained_bytes'] / results['dicts']['retained_bytes']
+    print(f"Slotted state uses {saving:.0%} less memory per session")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'sessions': args.sessions,
+            'quiz_count': args.quiz_count,
+            'distinct_quizzes': args.distinct_quizzes,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Bounded-size chart data for long learning histories.
+
+Heavy learners can have thousands of quizzes, so the Progress and
+profile charts never plot one mark per activity: the XP chart is
+aggregated into calendar buckets (day, then week, month, ...) and the
+score line is downsampled with Largest-Triangle-Three-Buckets. Both keep
+the point count under a fixed budget regardless of history length.
+"""
+import numpy as np
+import pandas as pd
+
+# Calendar buckets tried in order until the bar count fits the budget
+BUCKET_NAMES = ('Day', 'Week', 'Month', 'Quarter', 'Year')
+
+
+def bucket_starts(days, bucket_name):
+    """Map epoch day numbers to the first day of their bucket (as datetime64[D])"""
+    if bucket_name == 'Day':
+        return days.astype('datetime64[D]')
+    if bucket_name == 'Week':
+        # Epoch day 0 was a Thursday; weeks start on Monday
+        return (((days + 3) // 7) * 7 - 3).astype('datetime64[D]')
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    if bucket_name == 'Month':
+        return months.astype('datetime64[M]').astype('datetime64[D]')
+    if bucket_name == 'Quarter':
+        return ((months // 3) * 3).astype('datetime64[M]').astype('datetime64[D]')
+    return days.astype('datetime64[D]').astype('datetime64[Y]').astype('datetime64[D]')
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the next bucket's average, which preserves peaks and
+    dips far better than striding.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        xs = x[range_start:range_end]
+        ys = y[range_start:range_end]
+        areas = np.abs((x[a] - avg_x) * (ys - y[a]) - (x[a] - xs) * (avg_y - y[a]))
+        a = range_start + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+
+def score_progression(score_history, max_points=200):
+    """Quiz number vs score, downsampled to at most ``max_points`` rows"""
+    scores = np.frombuffer(score_history.scores, dtype=np.float32)
+    quiz_numbers = np.arange(1, len(scores) + 1)
+    keep = lttb_indices(quiz_numbers, scores, max_points)
+    return pd.DataFrame({'Quiz': quiz_numbers[keep], 'Score': scores[keep].astype(np.float64)})
+
+
+def quiz_xp(scores):
+    """XP per quiz as shown in analytics: half of the 10/20/30 token tier"""
+    tokens = 10 + 10 * (scores >= 60) + 10 * (scores >= 80)
+    return tokens // 2
+
+
+def activity_by_period(score_history, lesson_times, lesson_xp, max_buckets=60):
+    """XP per calendar bucket and activity type, with at most ``max_buckets`` periods.
+
+    ``lesson_times`` and ``lesson_xp`` are parallel sequences for completed
+    lessons. Aggregation is vectorized over the typed score arrays, so the
+    cost is a few NumPy passes however long the history. Returns the
+    aggregated frame and the bucket name ('Day', 'Week', ...).
+    """
+    quiz_scores = np.frombuffer(score_history.scores, dtype=np.float32)
+    quiz_times = np.frombuffer(score_history.timestamps, dtype=np.float64)
+    times = np.concatenate([np.asarray(lesson_times, dtype=np.float64), quiz_times])
+    xp = np.concatenate([np.asarray(lesson_xp, dtype=np.int64), quiz_xp(quiz_scores).astype(np.int64)])
+    types = np.repeat(np.array([0, 1], dtype=np.int64), [len(lesson_times), len(quiz_times)])
+    if not len(times):
+        return pd.DataFrame(columns=['Period', 'Type', 'XP', 'Activities']), 'Day'
+
+    days = np.floor(times / 86400).astype(np.int64)
+    for bucket_name in BUCKET_NAMES:
+        starts = bucket_starts(days, bucket_name)
+        if len(np.unique(starts)) <= max_buckets:
+            break
+
+    keys = starts.astype(np.int64) * 2 + types
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    return pd.DataFrame({
+        'Period': np.datetime_as_string((unique_keys // 2).astype('datetime64[D]')),
+        'Type': np.where(unique_keys % 2 == 0, 'Lesson', 'Quiz'),
+        'XP': np.bincount(inverse, weights=xp).astype(np.int64),
+        'Activities': np.bincount(inverse),
+    }), bucket_name
@@ -0,0 +1,155 @@
+"""Vectorized cohort analytics over the learning-event log.
+
+Everything here works on whole columns of an ``EventLog`` table: event,
+topic and difficulty are compared as dictionary codes, learners are
+factorized to dense integers once, and "did this learner ever do X" is a
+``bincount`` over those integers. No step loops over events or learners
+in Python, so tens of millions of events take seconds, most of it in
+factorizing learners and sorting quiz scores for the quantiles.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+
+from event_log import EVENT_TYPES
+
+# Columns the queries below read; the rest of the log is never paged in
+COLUMNS = ['learner', 'event', 'lesson', 'topic', 'difficulty', 'correct', 'score']
+
+# A completed quiz at or above this percentage counts as passed in the funnel
+PASS_SCORE = 60.0
+
+# Width of the score histogram buckets, in percentage points
+SCORE_BUCKET = 20
+
+
+def _category(column):
+    """``(codes, values)`` of a dictionary column with unified dictionaries; nulls are -1"""
+    if not column.num_chunks:
+        return np.empty(0, dtype=np.int16), []
+    codes = np.concatenate([pc.fill_null(chunk.indices, -1).to_numpy() for chunk in column.chunks])
+    return codes, column.chunk(0).dictionary.to_pylist()
+
+
+class CohortEvents:
+    """Event columns as NumPy arrays, with learners numbered 0..learners-1"""
+
+    def __init__(self, table):
+        table = table.select(COLUMNS).unify_dictionaries()
+        self.learner, _ = pd.factorize(table.column('learner').to_numpy())
+        self.learners = int(self.learner.max()) + 1 if len(self.learner) else 0
+        self.event, self._events = _category(table.column('event'))
+        self.topic, self.topics = _category(table.column('topic'))
+        self.difficulty, self.difficulties = _category(table.column('difficulty'))
+        self.lesson = table.column('lesson').to_numpy()
+        self.correct = table.column('correct').to_numpy()
+        self.score = table.column('score').to_numpy()
+        # Topic x difficulty of quiz events (-1 for other events), the key score queries group by
+        self.groups = len(self.topics) * len(self.difficulties)
+        self.quiz_group = np.where((self.topic >= 0) & (self.difficulty >= 0),
+                                   self.topic.astype(np.int32) * len(self.difficulties) + self.difficulty, -1)
+
+    def __len__(self):
+        return len(self.event)
+
+    def is_event(self, name):
+        """Boolean mask of events of type ``name``"""
+        if name not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type {name!r}")
+        if name not in self._events:
+            return np.zeros(len(self), dtype=bool)
+        return self.event == self._events.index(name)
+
+    def _reached(self, mask):
+        """Per-learner flags: did the learner have at least one event in ``mask``"""
+        return np.bincount(self.learner[mask], minlength=self.learners) > 0
+
+    def funnel(self, pass_score=PASS_SCORE):
+        """Learners reaching each step, having reached every step before it"""
+        completed = self.is_event('quiz_completed')
+        steps = [
+            ('Completed a lesson', self.is_event('lesson_completed')),
+            ('Started a quiz', self.is_event('quiz_started')),
+            ('Completed a quiz', completed),
+            (f'Passed a quiz (≥{pass_score:.0f}%)', completed & (self.score >= pass_score)),
+            ('Claimed tokens', self.is_event('tokens_claimed')),
+        ]
+        reached = np.ones(self.learners, dtype=bool)
+        rows = [{'Step': 'Active', 'Learners': self.learners}]
+        for label, mask in steps:
+            reached &= self._reached(mask)
+            rows.append({'Step': label, 'Learners': int(reached.sum())})
+        funnel = pd.DataFrame(rows)
+        start = max(self.learners, 1)
+        previous = funnel['Learners'].shift(1, fill_value=self.learners).clip(lower=1)
+        funnel['% of Active'] = (funnel['Learners'] / start * 100).round(1)
+        funnel['% of Previous'] = (funnel['Learners'] / previous * 100).round(1)
+        return funnel
+
+    def lesson_completion(self, lesson_ids):
+        """Per lesson: learners who completed it, as a share of active learners and of the previous lesson"""
+        lesson_ids = sorted(lesson_ids)
+        mask = self.is_event('lesson_completed')
+        lessons = self.lesson[mask].astype(np.int64)
+        known = np.isin(lessons, lesson_ids)
+        # reached[learner, lesson]: one byte per learner and lesson
+        reached = np.zeros((self.learners, max(lesson_ids, default=0) + 1), dtype=bool)
+        reached[self.learner[mask][known], lessons[known]] = True
+        completed = reached[:, lesson_ids].sum(axis=0)
+        # The first lesson's predecessor is simply being active
+        previous = np.concatenate([[self.learners], completed[:-1]])
+        retained = np.array([completed[0]] if lesson_ids else [], dtype=np.int64)
+        retained = np.concatenate([retained, [int((reached[:, a] & reached[:, b]).sum())
+                                              for a, b in zip(lesson_ids, lesson_ids[1:])]])
+        return pd.DataFrame({
+            'Lesson': lesson_ids,
+            'Learners': completed,
+            '% of Active': (completed / max(self.learners, 1) * 100).round(1),
+            '% of Previous Lesson': (retained / np.maximum(previous, 1) * 100).round(1),
+        })
+
+    def score_distribution(self, bucket=SCORE_BUCKET):
+        """Quiz score summary and histogram per topic and difficulty, with answer accuracy"""
+        groups = self.groups
+        rows = np.flatnonzero(self.is_event('quiz_completed') & (self.quiz_group >= 0) & ~np.isnan(self.score))
+        group, scores = self.quiz_group[rows], self.score[rows].astype(np.float64)
+        quizzes = np.bincount(group, minlength=groups)
+        mean = np.bincount(group, weights=scores, minlength=groups) / np.maximum(quizzes, 1)
+
+        # One sort by (group, score); each group's quantiles interpolate within its slice, as pandas does
+        ordered = scores[np.lexsort((scores, group))]
+        starts = np.cumsum(quizzes) - quizzes
+
+        def quantile(q):
+            if not len(ordered):
+                return np.full(groups, np.nan)
+            position = starts + q * np.maximum(quizzes - 1, 0)
+            # Empty groups point past their (empty) slice; they are blanked below
+            low = np.minimum(np.floor(position).astype(np.int64), len(ordered) - 1)
+            high = np.minimum(np.ceil(position).astype(np.int64), len(ordered) - 1)
+            return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+        last = (100 - 1) // bucket  # A score of 100 falls in the last bucket
+        buckets = np.minimum(scores // bucket, last).astype(np.int64)
+        histogram = np.bincount(group * (last + 1) + buckets, minlength=groups * (last + 1)).reshape(groups, last + 1)
+
+        rows = np.flatnonzero(self.is_event('quiz_answered') & (self.quiz_group >= 0) & (self.correct >= 0))
+        answers = np.bincount(self.quiz_group[rows], minlength=groups)
+        correct = np.bincount(self.quiz_group[rows], weights=self.correct[rows], minlength=groups)
+
+        distribution = pd.DataFrame({
+            'Topic': np.repeat(self.topics, len(self.difficulties)),
+            'Difficulty': np.tile(self.difficulties, len(self.topics)),
+            'Quizzes': quizzes,
+            'Mean': mean.round(1),
+            'p25': quantile(0.25).round(1),
+            'Median': quantile(0.5).round(1),
+            'p75': quantile(0.75).round(1),
+        })
+        for b in range(last + 1):
+            distribution[f"{b * bucket}-{100 if b == last else b * bucket + bucket - 1}%"] = histogram[:, b]
+        distribution['Answers'] = answers
+        distribution['Answer Accuracy'] = np.where(answers > 0, correct / np.maximum(answers, 1) * 100, np.nan).round(1)
+        for column in ('Mean', 'p25', 'Median', 'p75'):
+            distribution.loc[quizzes == 0, column] = np.nan
+        return distribution[(quizzes > 0) | (answers > 0)].reset_index(drop=True)
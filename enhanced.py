@@ -7,7 +7,30 @@ from datetime import datetime, timedelta
 import plotly.express as px
 import pandas as pd
 import hashlib
+import hmac
 import base64
+import os
+from lesson_questions import LessonQuestionGenerator
+from lesson_retrieval import LessonRetriever
+from cohort_analytics import COLUMNS as COHORT_COLUMNS, CohortEvents
+from event_log import EventLog
+from llm_policy import CircuitBreaker, CircuitOpenError, GenerationPolicy, ModelRouter
+from memory_report import MemoryTracer, SessionFootprints, cache_footprints, process_rss
+from question_artifact import ArtifactError, QuestionArtifact
+from question_bank import QuestionBank, QuestionStore
+from question_stats import AnswerStats, update_ability
+from question_variants import make_variant, variant_seed
+from quiz_generation import QUIZ_DIFFICULTIES, QUIZ_TOPICS, request_quiz_questions
+from quiz_jobs import DONE as QUIZ_JOB_DONE, PENDING as QUIZ_JOB_PENDING, QuizJobs
+from spaced_repetition import QUALITY_CORRECT, QUALITY_INCORRECT, QUALITY_SKIPPED, ReviewStore
+from rate_limit import RateLimited, RateLimiter
+from shared_cache import CacheError, MemoryCache, open_cache
+from session_checkpoint import CheckpointStore, SessionCheckpointer, restore_models
+from session_models import QuizState, ScoreHistory, UiState, UserData, WalletState
+from warm_up import WarmUp
+import charts
+import telemetry
+from profiling import RerunProfiler
 
 # Production-grade app configuration with enhanced styling
 st.set_page_config(
@@ -382,6 +405,91 @@ CROSSFI_TESTNET_CONFIG = {
     "blockExplorerUrls": ["https://scan.testnet.ms"]
 }
 
+# Local directory for logs, profiles and other runtime data
+DATA_DIR = st.secrets.get("DATA_DIR", ".crossfi_data")
+
+# Pre-generated question corpus written by pregenerate.py (optional)
+QUESTION_ARTIFACT = st.secrets.get("QUESTION_ARTIFACT", os.path.join(DATA_DIR, "question_bank.xfqb"))
+
+# Cache shared by all app processes: "sqlite" (file in DATA_DIR), "sqlite:<path>", "redis://host:port/db" or "memory"
+SHARED_CACHE_URL = st.secrets.get("SHARED_CACHE_URL", "sqlite")
+
+# How long every worker shows the same simulated leaderboard
+LEADERBOARD_SNAPSHOT_SECONDS = 300
+
+# Session checkpoints are compacted into one snapshot after this many diffs (see session_checkpoint)
+SESSION_CHECKPOINT_COMPACT_AFTER = 64
+
+# Learning events are buffered per worker and flushed to DATA_DIR/events this often (or every 5000 events)
+EVENT_LOG_FLUSH_SECONDS = 30
+
+# Frames kept per allocation while memory tracing runs (admin Memory tab; MEMORY_TRACING in secrets starts it with
+# the process). Each frame makes traced allocations markedly slower, so the admin can trade attribution for speed.
+MEMORY_TRACE_FRAMES = 8
+MEMORY_TRACE_FRAME_CHOICES = [1, 4, 8, 16, 32]
+
+# Token buckets in front of Groq quiz generation, shared by all workers: burst size and refill per minute.
+# Keep "global" within the Groq account's request quota.
+QUIZ_RATE_LIMITS = {
+    "user": {"burst": 3, "per_minute": 2},
+    "topic": {"burst": 10, "per_minute": 10},
+    "global": {"burst": 30, "per_minute": 30}
+}
+
+# Quiz generation policy: deadlines, hedging and circuit breaker thresholds
+QUIZ_GENERATION_POLICY = {
+    "deadline_seconds": 8.0,        # Hard cap on how long a quiz build may wait for Groq
+    "hedge_after_seconds": None,    # Send a second request if the first is this slow (None = off)
+    "breaker_window": 20,           # Recent calls considered by the breaker
+    "breaker_min_calls": 5,         # Calls needed before the breaker may trip
+    "breaker_error_rate": 0.5,      # Trip when this share of recent calls failed
+    "breaker_p95_seconds": 6.0,     # Trip when recent p95 latency reaches this
+    "breaker_cooldown_seconds": 30.0,  # Wait before a half-open probe
+    "bank_first_min_questions": 40,  # Skip Groq once a topic/difficulty has this many banked (0 = off)
+    "lesson_questions_per_quiz": 2,  # Questions generated locally from lessons; Groq writes the rest
+    "prompt_context_tokens": 300,  # Lesson excerpts retrieved into each Groq prompt (0 = topic name only)
+    "top_up_requests": 1,  # Follow-up calls for questions missing from a partly invalid reply
+    "share_concurrent_batches": True  # Starts of a quiz in flight at once, on any worker, share one Groq call
+}
+
+# Groq models available for quiz generation (latency priors in seconds, USD per 1K tokens)
+QUIZ_MODELS = {
+    "llama-3.1-8b-instant": {"expected_latency": 1.5, "cost_per_1k_tokens": 0.00008},
+    "meta-llama/llama-4-scout-17b-16e-instruct": {"expected_latency": 2.5, "cost_per_1k_tokens": 0.0002},
+    "llama-3.3-70b-versatile": {"expected_latency": 4.0, "cost_per_1k_tokens": 0.0007}
+}
+
+# Models allowed per difficulty, in order of preference; advanced quizzes stay on 70B-class quality
+QUIZ_MODEL_ROUTES = {
+    "beginner": ["llama-3.1-8b-instant", "meta-llama/llama-4-scout-17b-16e-instruct", "llama-3.3-70b-versatile"],
+    "intermediate": ["meta-llama/llama-4-scout-17b-16e-instruct", "llama-3.3-70b-versatile", "llama-3.1-8b-instant"],
+    "advanced": ["llama-3.3-70b-versatile"]
+}
+
+# Quizzes are built in background threads (one per concurrent build, like the policy's Groq pool); a session
+# polls its build every QUIZ_JOB_POLL_SECONDS and unclaimed results are dropped after QUIZ_JOB_TTL_SECONDS
+QUIZ_JOB_WORKERS = 8
+QUIZ_JOB_POLL_SECONDS = 1.0
+QUIZ_JOB_TTL_SECONDS = 600
+
+# Questions per quiz, of which up to QUIZ_REVIEW_SLOTS are spaced-repetition reviews that are due
+QUIZ_LENGTH = 4
+QUIZ_REVIEW_SLOTS = 2
+
+# Calibrated difficulty (Rasch logits, see question_stats.py) that banked quizzes aim for per level
+QUIZ_DIFFICULTY_BANDS = {
+    "beginner": (float("-inf"), -0.5),
+    "intermediate": (-0.5, 0.5),
+    "advanced": (0.5, float("inf"))
+}
+
+# Per-request latency budget by difficulty (capped by the policy deadline)
+QUIZ_LATENCY_BUDGETS = {"beginner": 3.0, "intermediate": 5.0, "advanced": 8.0}
+
+def get_policy_setting(name):
+    """Read a quiz generation policy setting, allowing overrides from secrets"""
+    return st.secrets.get(f"QUIZ_{name.upper()}", QUIZ_GENERATION_POLICY[name])
+
 # Initialize Groq client with caching
 @st.cache_resource(show_spinner="🤖 Initializing AI...")
 def init_groq():
@@ -389,45 +497,213 @@ def init_groq():
     if not api_key:
         st.error("🔑 Please configure GROQ_API_KEY in Streamlit secrets to enable AI features")
         return None
-    return Groq(api_key=api_key)
+    # Retries are handled by the generation policy so the deadline stays honest
+    # GROQ_BASE_URL points the client at a self-hosted or load-test endpoint
+    return Groq(
+        api_key=api_key,
+        base_url=st.secrets.get("GROQ_BASE_URL") or None,
+        timeout=get_policy_setting("deadline_seconds"),
+        max_retries=0
+    )
+
+@st.cache_resource
+def init_generation_policy():
+    """Shared circuit breaker and deadline/hedging policy for all sessions"""
+    breaker = CircuitBreaker(
+        window_size=get_policy_setting("breaker_window"),
+        min_calls=get_policy_setting("breaker_min_calls"),
+        error_rate_threshold=get_policy_setting("breaker_error_rate"),
+        p95_latency_threshold=get_policy_setting("breaker_p95_seconds"),
+        cooldown=get_policy_setting("breaker_cooldown_seconds")
+    )
+    return GenerationPolicy(
+        breaker,
+        deadline=get_policy_setting("deadline_seconds"),
+        hedge_after=get_policy_setting("hedge_after_seconds")
+    )
+
+@st.cache_resource
+def init_model_router():
+    """Shared per-model latency/error statistics used to route quiz requests"""
+    return ModelRouter(QUIZ_MODELS, QUIZ_MODEL_ROUTES)
+
+@st.cache_resource
+def init_metrics_server():
+    """Expose LLM telemetry at http://127.0.0.1:<METRICS_PORT>/metrics (0 disables)"""
+    port = int(st.secrets.get("METRICS_PORT", 9464))
+    return telemetry.start_metrics_server(port) if port else None
+
+@st.cache_resource
+def init_shared_cache():
+    """Cross-process cache; falls back to this process only if the backend cannot be opened"""
+    try:
+        return open_cache(SHARED_CACHE_URL, os.path.join(DATA_DIR, "shared_cache.db"))
+    except (CacheError, ValueError) as e:
+        st.warning(f"⚠️ Shared cache unavailable, using a per-process cache: {e}")
+        return MemoryCache()
+
+@st.cache_resource
+def init_rate_limiter():
+    """Per-learner, per-topic and global Groq quotas kept in the shared cache"""
+    return RateLimiter(init_shared_cache(), QUIZ_RATE_LIMITS)
+
+@st.cache_resource
+def init_checkpoint_store():
+    """Per-learner session checkpoint logs, readable by every worker sharing DATA_DIR"""
+    return CheckpointStore(os.path.join(DATA_DIR, "checkpoints"))
+
+@st.cache_resource
+def init_event_log():
+    """Process-wide buffer of learning events for cohort analytics across all workers"""
+    return EventLog(os.path.join(DATA_DIR, "events"), flush_interval=EVENT_LOG_FLUSH_SECONDS)
+
+@st.cache_resource
+def init_session_footprints():
+    """Weak registry of every live session's state, sized by the admin memory report"""
+    return SessionFootprints()
+
+@st.cache_resource
+def init_quiz_jobs():
+    """Process-wide pool that builds quizzes in the background while learners keep using the app"""
+    return QuizJobs(max_workers=QUIZ_JOB_WORKERS, ttl=QUIZ_JOB_TTL_SECONDS)
+
+@st.cache_resource
+def init_question_store():
+    """Process-wide interned questions; quiz state holds IDs into this store"""
+    return QuestionStore()
+
+@st.cache_resource
+def init_review_store():
+    """Per-learner spaced-repetition state on disk"""
+    return ReviewStore(os.path.join(DATA_DIR, "reviews"))
+
+@st.cache_resource
+def init_answer_stats():
+    """Process-wide answer counters, flushed to SQLite in batches"""
+    return AnswerStats(os.path.join(DATA_DIR, "question_stats.db"))
+
+@st.cache_resource
+def init_lesson_questions():
+    """Local question generator over the lesson Markdown"""
+    return LessonQuestionGenerator(LESSON_CONTENT, QUIZ_TOPIC_LESSONS)
+
+@st.cache_resource
+def init_lesson_retriever():
+    """BM25 index over lesson sections for grounding quiz prompts"""
+    return LessonRetriever(LESSON_CONTENT, QUIZ_TOPIC_LESSONS,
+                           budget_tokens=get_policy_setting("prompt_context_tokens"))
+
+@st.cache_resource
+def init_question_bank():
+    """Process-wide bank of generated questions, seeded from the pre-generated corpus if present"""
+    artifact = None
+    if os.path.exists(QUESTION_ARTIFACT):
+        try:
+            artifact = QuestionArtifact(QUESTION_ARTIFACT)
+        except (OSError, ArtifactError) as e:
+            st.warning(f"⚠️ Ignoring question corpus {QUESTION_ARTIFACT}: {e}")
+    return QuestionBank(init_question_store(), artifact=artifact)
 
 # Enhanced session state initialization
+SESSION_MODELS = {
+    'user_data': UserData,
+    'wallet': WalletState,
+    'quiz_state': QuizState,
+    'ui_state': UiState
+}
+
+# Models written to the session checkpoint; UI flags and profiler reports are not worth resuming
+CHECKPOINTED_MODELS = ('user_data', 'wallet', 'quiz_state')
+CHECKPOINT_SKIP = {('user_data', 'reviews')}  # Spaced-repetition state has its own store
+# Restored on resume; a resume link alone never reconnects a wallet, so the learner connects it again
+RESUMED_MODELS = ('user_data', 'quiz_state')
+
+def resume_session():
+    """Restore a checkpointed session when a fresh session's URL carries a current ?resume=<token>"""
+    token = st.query_params.get("resume")
+    if not token or 'user_data' in st.session_state:
+        return
+    store = init_checkpoint_store()
+    try:
+        learner_id = store.resume(token)
+        checkpoint = store.load(learner_id) if learner_id else None
+        # Rotate: the link just used, and any tab still on it, can no longer resume or write this learner
+        new_token = store.issue_resume(learner_id) if checkpoint else None
+    except (OSError, ValueError):
+        checkpoint = None
+    if checkpoint is None:
+        return
+    st.session_state.resume_token = new_token
+    fields, questions = checkpoint
+    question_store = init_question_store()
+    for question in questions.values():
+        question_store.intern(question)
+    models = restore_models(fields, {key: SESSION_MODELS[key] for key in RESUMED_MODELS})
+    for key, model in models.items():
+        st.session_state[key] = model
+    quiz_state = models.get('quiz_state')
+    if quiz_state is not None and quiz_state.active:
+        st.toast(f"🔄 Welcome back! Resuming your quiz at question {quiz_state.current_q + 1}.")
+    else:
+        st.toast("🔄 Welcome back! Your session was restored.")
+
+def checkpoint_session():
+    """Append what this rerun changed in the session to the learner's checkpoint log
+
+    Bare page loads (including the server's script health check) are not
+    checkpointed, so only sessions someone has interacted with get a log
+    and a resume token in their URL.
+    """
+    if st.session_state.ui_state.script_runs < 2:
+        return
+    user_data = st.session_state.user_data
+    store = init_checkpoint_store()
+    checkpointer = st.session_state.get('checkpointer')
+    try:
+        token = st.session_state.get('resume_token')
+        if token is None or token.partition('.')[0] != user_data.learner_id:
+            token = st.session_state.resume_token = store.issue_resume(user_data.learner_id)
+            st.query_params["resume"] = token
+        if checkpointer is None or checkpointer.learner_id != user_data.learner_id:
+            checkpointer = st.session_state['checkpointer'] = SessionCheckpointer(
+                store, user_data.learner_id, init_question_store(),
+                compact_after=SESSION_CHECKPOINT_COMPACT_AFTER, skip=CHECKPOINT_SKIP,
+                resume_stamp=store.resume_stamp(user_data.learner_id))
+        checkpointer.checkpoint({key: st.session_state[key] for key in CHECKPOINTED_MODELS})
+    except OSError:
+        # Nothing is marked as written, so the next rerun retries the same changes
+        pass
+
+def track_session_memory():
+    """Point this session's memory handle at its current state (the registry only holds the handle weakly)"""
+    handle = st.session_state.get('memory_handle')
+    if handle is None:
+        handle = st.session_state['memory_handle'] = init_session_footprints().attach()
+    handle.objects = {key: value for key, value in st.session_state.items() if key != 'memory_handle'}
+    handle.updated = time.time()
+
 def init_session_state():
-    defaults = {
-        'user_data': {
-            'username': '',
-            'level': 1,
-            'xp': 0,
-            'tokens': 0,
-            'completed_lessons': [],
-            'streak': 0,
-            'last_login': datetime.now().isoformat(),
-            'achievements': [],
-            'quiz_scores': [],
-            'total_study_time': 0
-        },
-        'wallet': {
-            'connected': False,
-            'address': '',
-            'network': '',
-            'balance': 0
-        },
-        'quiz_state': {
-            'active': False,
-            'questions': [],
-            'current_q': 0,
-            'score': 0,
-            'topic': ''
-        },
-        'ui_state': {
-            'theme': 'light',
-            'show_advanced': False
-        }
-    }
-    
-    for key, value in defaults.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
+    resume_session()
+    for key, model in SESSION_MODELS.items():
+        value = st.session_state.get(key)
+        if value is None:
+            st.session_state[key] = model()
+        elif isinstance(value, dict):
+            # Upgrade dict-shaped state (sessions from before a code reload, seeded tests)
+            if key == 'quiz_state' and 'questions' in value:
+                value = dict(value, question_ids=init_question_store().intern_many(value['questions']))
+            st.session_state[key] = model.from_dict(value)
+    st.session_state.ui_state.script_runs += 1
+    # Keep the resume token in the URL: a reconnect that lands on another worker resumes from the checkpoint
+    token = st.session_state.get('resume_token')
+    if token is not None and st.query_params.get("resume") != token:
+        st.query_params["resume"] = token
+
+# Point budgets that keep chart payloads flat however long a learner's history gets
+CHART_MAX_POINTS = {
+    "score_progression": 200,   # Sidebar score line (LTTB-downsampled)
+    "activity_periods": 60      # Progress tab XP bars (calendar buckets)
+}
 
 # Comprehensive lesson content
 LESSON_CONTENT = {
@@ -619,6 +895,15 @@ LESSON_CONTENT = {
     }
 }
 
+# Lessons each quiz topic's locally generated questions are drawn from
+QUIZ_TOPIC_LESSONS = {
+    "Blockchain Fundamentals": [1],
+    "CrossFi Platform": [2],
+    "Cosmos SDK & EVM": [3],
+    "DeFi Concepts": [4],
+    "Smart Contract Development": [5]
+}
+
 # Achievement system with detailed rewards
 ACHIEVEMENTS = {
     'first_lesson': {
@@ -659,50 +944,231 @@ ACHIEVEMENTS = {
     }
 }
 
-def generate_quiz_questions(topic, difficulty="intermediate"):
-    """Generate AI-powered quiz questions using Groq"""
+def get_banked_questions(topic, difficulty, reason, seed, exclude=()):
+    """Previously generated questions for this topic, or the static fallback set"""
+    # Aim for the level's calibrated difficulty band rather than the label each question was generated with
+    questions = init_question_bank().sample(topic, difficulty, exclude=exclude,
+                                            band=QUIZ_DIFFICULTY_BANDS.get(difficulty),
+                                            difficulty_of=init_answer_stats().difficulty)
+    if questions:
+        telemetry.record_fallback(topic, difficulty, reason, "bank")
+        return questions
+    questions = get_lesson_questions(topic, difficulty, QUIZ_LENGTH, seed)
+    if questions:
+        telemetry.record_fallback(topic, difficulty, reason, "lessons")
+        return questions
+    telemetry.record_fallback(topic, difficulty, reason, "static")
+    return get_fallback_questions(topic)
+
+def lesson_question_seed(topic, difficulty):
+    """Seed that varies lesson questions per learner and completed quiz"""
+    user_data = st.session_state.user_data
+    return variant_seed(user_data.variant_seed, topic, difficulty, len(user_data.quiz_scores))
+
+def get_lesson_questions(topic, difficulty, count, seed):
+    """Questions generated from the topic's lessons (``seed`` from lesson_question_seed)"""
+    return init_lesson_questions().generate(topic, difficulty, count, seed=seed)
+
+def generate_quiz_questions(topic, difficulty, learner_id, seed, exclude=()):
+    """Generate AI-powered quiz questions using Groq (banked ones avoid paraphrases of ``exclude``)
+    
+    Runs in a quiz job thread, so it reads no session state and shows nothing itself: returns
+    ``(questions, notice)``, where ``notice`` is None or a ``(kind, message)`` for the learner.
+    """
+    # A well-stocked bank (e.g. a pre-generated corpus) answers without paying LLM latency
+    bank_first_min = get_policy_setting("bank_first_min_questions")
+    if bank_first_min and init_question_bank().size(topic, difficulty) >= bank_first_min:
+        return get_banked_questions(topic, difficulty, "warm_bank", seed, exclude), None
+    
+    # Lesson questions cost no network, so Groq only writes the rest of the quiz
+    lesson_questions = get_lesson_questions(topic, difficulty, get_policy_setting("lesson_questions_per_quiz"), seed)
+    llm_count = QUIZ_LENGTH - len(lesson_questions)
+    if llm_count <= 0:
+        return lesson_questions, None
+    
     groq_client = init_groq()
     if not groq_client:
-        return get_fallback_questions(topic)
+        return lesson_questions + get_banked_questions(topic, difficulty, "no_client", seed, exclude), None
+    
+    router = init_model_router()
+    # Ground the prompt in what the lessons teach; cached per topic and difficulty
+    context = init_lesson_retriever().context(topic, difficulty) if get_policy_setting("prompt_context_tokens") else ''
+    budget = min(QUIZ_LATENCY_BUDGETS.get(difficulty, get_policy_setting("deadline_seconds")),
+                 get_policy_setting("deadline_seconds"))
+    tried_models = []
+    
+    def attempt(timeout):
+        # A hedged attempt spills over to the next model instead of repeating a slow one
+        model = router.choose(difficulty, timeout, exclude=tried_models)
+        tried_models.append(model)
+        started = time.monotonic()
+        try:
+            questions = request_quiz_questions(
+                groq_client, topic, difficulty, timeout, model=model, count=llm_count, context=context,
+                top_ups=get_policy_setting("top_up_requests"),
+                cost_per_1k_tokens=QUIZ_MODELS.get(model, {}).get("cost_per_1k_tokens", 0.0)
+            )
+        except Exception:
+            router.record(model, False, time.monotonic() - started)
+            raise
+        router.record(model, True, time.monotonic() - started)
+        return questions
+    
+    def generate():
+        return init_generation_policy().call(attempt, deadline=budget)
     
     try:
-        prompt = f"""Create 4 challenging multiple-choice questions about {topic} in CrossFi blockchain context.
-        Difficulty: {difficulty}
-        
-        Return valid JSON only:
-        {{
-            "questions": [
-                {{
-                    "question": "Clear, specific question about {topic}?",
-                    "options": ["A) Option 1", "B) Option 2", "C) Option 3", "D) Option 4"],
-                    "correct": 0,
-                    "explanation": "Detailed explanation of why this answer is correct"
-                }}
-            ]
-        }}
-        
-        Focus on practical CrossFi knowledge, DeFi concepts, and real-world applications."""
-        
-        response = groq_client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=2000
-        )
-        
-        content = response.choices[0].message.content.strip()
-        # Clean up the response to ensure valid JSON
-        if content.startswith('```json'):
-            content = content[7:-3]
-        elif content.startswith('```'):
-            content = content[3:-3]
-        
-        quiz_data = json.loads(content)
-        return quiz_data.get('questions', get_fallback_questions(topic))
+        # Every start counts against the learner's and topic's limits, even one that shares a batch
+        level = init_rate_limiter().try_acquire({"user": learner_id, "topic": topic})
+        if level:
+            raise RateLimited(level)
+        if get_policy_setting("share_concurrent_batches"):
+            # Starts of the same quiz while its Groq call is in flight, on any worker, wait for that call;
+            # nothing is reused once it returns, so later starts and retakes get fresh questions
+            questions = init_shared_cache().share_in_flight(
+                f"quiz-batch:{topic}:{difficulty}:{llm_count}", generate, lock_seconds=budget + 1, wait_seconds=budget
+            )
+        else:
+            questions = generate()
+        bank = init_question_bank()
+        qids = bank.add(topic, difficulty, questions)
+        # Paraphrases the bank rejected, or of ``exclude``, are dropped and the gap filled from the bank
+        by_id = dict(zip(qids, questions))
+        kept = [qid for qid in bank.distinct(qids, exclude=exclude) if bank.cluster_of(qid) == qid]
+        questions = [by_id[qid] for qid in kept]
+        if len(questions) < llm_count:
+            # Keep the valid questions already paid for and fill the gap from the bank
+            banked = get_banked_questions(topic, difficulty, "partial", seed, tuple(exclude) + tuple(kept))
+            return lesson_questions + questions + banked, None
+        return lesson_questions + questions, None
+    
+    except RateLimited as e:
+        if e.level == "user":
+            notice = ("toast", "🐢 You're starting quizzes quickly, serving questions from the bank")
+        else:
+            notice = ("toast", "⏳ AI generation is at capacity, serving questions from the bank")
+        banked = get_banked_questions(topic, difficulty, f"rate_limit_{e.level}", seed, exclude)
+        return lesson_questions + banked, notice
+    
+    except CircuitOpenError:
+        # Groq is degraded: answer immediately instead of waiting on it
+        notice = ("toast", "⚡ AI generation is busy, serving questions from the bank")
+        return lesson_questions + get_banked_questions(topic, difficulty, "circuit_open", seed, exclude), notice
     
     except Exception as e:
+        notice = ("error", f"AI Quiz Generation Error: {str(e)}")
+        return lesson_questions + get_banked_questions(topic, difficulty, "error", seed, exclude), notice
+
+def get_review_schedule():
+    """This learner's spaced-repetition schedule, loaded from disk on first use"""
+    user_data = st.session_state.user_data
+    if user_data.reviews is None:
+        user_data.reviews = init_review_store().load(user_data.learner_id)
+    return user_data.reviews
+
+def record_review(qid, topic, quality):
+    """Grade an answered question in the learner's schedule and persist it"""
+    schedule = get_review_schedule()
+    schedule.record(qid, topic, quality)
+    review_store = init_review_store()
+    review_store.save(st.session_state.user_data.learner_id, schedule)
+    question = init_question_store().get(qid)
+    if question is not None:
+        review_store.save_question(qid, question)
+
+def log_event(event, **fields):
+    """Record a learning event for this session's learner (see event_log.SCHEMA for ``fields``)"""
+    init_event_log().record(event, st.session_state.user_data.learner_id, **fields)
+
+def record_answer(qid, correct, skipped=False):
+    """Count an answer towards the question's calibration and update the learner's ability"""
+    quiz_state = st.session_state.quiz_state
+    user_data = st.session_state.user_data
+    stats = init_answer_stats()
+    seconds = time.time() - (quiz_state.question_started or quiz_state.start_time or time.time())
+    stats.record(qid, quiz_state.difficulty, correct, seconds, user_data.ability, skipped=skipped)
+    user_data.ability = update_ability(user_data.ability, user_data.ability_answers,
+                                       stats.difficulty(qid, quiz_state.difficulty), correct and not skipped)
+    user_data.ability_answers += 1
+    log_event('quiz_answered', topic=quiz_state.topic, difficulty=quiz_state.difficulty,
+              correct=int(correct and not skipped))
+
+def due_review_ids(topic):
+    """This learner's due review questions for ``topic`` whose bodies can still be found"""
+    store = init_question_store()
+    review_store = init_review_store()
+    review_ids = []
+    for qid in get_review_schedule().due(topic, QUIZ_REVIEW_SLOTS):
+        if store.get(qid) is None:
+            # Generated by another process or evicted since: reload the copy kept for reviews
+            question = review_store.load_question(qid)
+            if question is None:
+                # Skipped, not forgotten, so the learner's review state survives
+                continue
+            store.intern(question)
+        review_ids.append(qid)
+    return tuple(review_ids)
+
+def build_quiz(topic, difficulty, learner_id, seed, review_ids):
+    """Question IDs for a new quiz, due reviews first, then fresh questions; runs as a quiz job"""
+    questions, notice = generate_quiz_questions(topic, difficulty, learner_id, seed, exclude=review_ids)
+    # One question per paraphrase cluster; lesson and bank tiers may also overlap
+    fresh_ids = init_question_bank().distinct(init_question_store().intern_many(questions), exclude=review_ids)
+    return (review_ids + tuple(fresh_ids))[:QUIZ_LENGTH], notice
+
+def start_quiz_job(topic, difficulty):
+    """Queue a quiz build for this session; the learner keeps using the app until it is collected"""
+    # Resolved here so a missing API key is reported in this session, not in the job thread
+    init_groq()
+    user_data = st.session_state.user_data
+    job_id = init_quiz_jobs().submit(build_quiz, topic, difficulty, user_data.learner_id,
+                                     lesson_question_seed(topic, difficulty), due_review_ids(topic))
+    st.session_state.quiz_state = QuizState(topic=topic, difficulty=difficulty, job_id=job_id)
+
+def collect_quiz_job():
+    """Start this session's quiz once its build is done; never waits on a build in progress"""
+    quiz_state = st.session_state.quiz_state
+    if quiz_state.job_id is None:
+        return
+    jobs = init_quiz_jobs()
+    status = jobs.status(quiz_state.job_id)
+    if status == QUIZ_JOB_PENDING:
+        return
+    if status != QUIZ_JOB_DONE:
+        # Submitted on another worker before this session moved here, or expired: build it again
+        start_quiz_job(quiz_state.topic, quiz_state.difficulty)
+        return
+    try:
+        question_ids, notice = jobs.collect(quiz_state.job_id)
+    except Exception as e:
+        st.session_state.quiz_state = QuizState()
         st.error(f"AI Quiz Generation Error: {str(e)}")
-        return get_fallback_questions(topic)
+        return
+    if notice is not None:
+        kind, message = notice
+        if kind == "error":
+            st.error(message)
+        else:
+            st.toast(message, icon="📚")
+    st.session_state.quiz_state = QuizState(
+        active=True,
+        question_ids=question_ids,
+        topic=quiz_state.topic,
+        difficulty=quiz_state.difficulty,
+        start_time=time.time(),
+        question_started=time.time()
+    )
+    log_event('quiz_started', topic=quiz_state.topic, difficulty=quiz_state.difficulty)
+    st.toast(f"🧠 Your {quiz_state.topic} quiz is ready!", icon="✅")
+
+@st.fragment(run_every=QUIZ_JOB_POLL_SECONDS)
+def render_quiz_job_status():
+    """Shown while this session's quiz is built; polls the job alone and reruns the app once it is done"""
+    quiz_state = st.session_state.quiz_state
+    if quiz_state.job_id is None or init_quiz_jobs().status(quiz_state.job_id) != QUIZ_JOB_PENDING:
+        st.rerun()
+    st.info(f"⏳ Building your {quiz_state.difficulty} quiz on {quiz_state.topic}... "
+            "Keep reading in the 📚 Learn tab, we'll let you know when it's ready.")
 
 def get_fallback_questions(topic):
     """Fallback quiz questions organized by topic"""
@@ -735,13 +1201,41 @@ def get_fallback_questions(topic):
                 "explanation": "CrossFi focuses on bridging traditional financial systems with cryptocurrency."
             }
         ],
-        'DeFi': [
+        'Cosmos SDK & EVM': [
+            {
+                "question": "Which consensus engine does CrossFi's Cosmos SDK side use?",
+                "options": ["A) Proof of Work", "B) Tendermint BFT", "C) Proof of History", "D) Raft"],
+                "correct": 1,
+                "explanation": "The Cosmos SDK runs on Tendermint BFT consensus for fast, final blocks."
+            },
+            {
+                "question": "What does EVM compatibility let developers do on CrossFi?",
+                "options": ["A) Mine Bitcoin", "B) Deploy Solidity contracts with Ethereum tools", "C) Skip transaction fees", "D) Run only Cosmos modules"],
+                "correct": 1,
+                "explanation": "EVM compatibility means existing Solidity contracts and Ethereum tooling work on CrossFi."
+            }
+        ],
+        'DeFi Concepts': [
             {
                 "question": "What does AMM stand for in DeFi?",
                 "options": ["A) Automatic Money Maker", "B) Automated Market Maker", "C) Advanced Monetary Method", "D) Asset Management Module"],
                 "correct": 1,
                 "explanation": "Automated Market Makers enable decentralized trading without traditional order books."
             }
+        ],
+        'Smart Contract Development': [
+            {
+                "question": "Which language do you use to write smart contracts for CrossFi's EVM?",
+                "options": ["A) Solidity", "B) COBOL", "C) HTML", "D) SQL"],
+                "correct": 0,
+                "explanation": "CrossFi's EVM runs Solidity contracts, so standard Ethereum tooling applies."
+            },
+            {
+                "question": "What should you do before deploying a smart contract to mainnet?",
+                "options": ["A) Skip testing to save gas", "B) Audit it and test on testnet", "C) Remove access checks", "D) Hard-code private keys"],
+                "correct": 1,
+                "explanation": "Security audits and testnet validation catch bugs before they can cost real funds."
+            }
         ]
     }
     
@@ -762,26 +1256,27 @@ def check_and_award_achievements():
     new_achievements = []
     
     # Achievement checks
-    if len(user_data['completed_lessons']) >= 1 and 'first_lesson' not in user_data['achievements']:
+    if len(user_data.completed_lessons) >= 1 and 'first_lesson' not in user_data.achievements:
         new_achievements.append('first_lesson')
     
-    if calculate_level(user_data['xp']) >= 5 and 'level_5' not in user_data['achievements']:
+    if calculate_level(user_data.xp) >= 5 and 'level_5' not in user_data.achievements:
         new_achievements.append('level_5')
     
-    if user_data['quiz_scores'] and max(user_data['quiz_scores']) >= 100 and 'perfect_quiz' not in user_data['achievements']:
+    if user_data.quiz_scores.best >= 100 and 'perfect_quiz' not in user_data.achievements:
         new_achievements.append('perfect_quiz')
     
-    if st.session_state.wallet['connected'] and 'wallet_connected' not in user_data['achievements']:
+    if st.session_state.wallet.connected and 'wallet_connected' not in user_data.achievements:
         new_achievements.append('wallet_connected')
     
-    if len(user_data['completed_lessons']) >= len(LESSON_CONTENT) and 'all_lessons' not in user_data['achievements']:
+    if len(user_data.completed_lessons) >= len(LESSON_CONTENT) and 'all_lessons' not in user_data.achievements:
         new_achievements.append('all_lessons')
     
     # Award new achievements
     for achievement_id in new_achievements:
         achievement = ACHIEVEMENTS[achievement_id]
-        user_data['achievements'].append(achievement_id)
-        user_data['tokens'] += achievement['tokens']
+        user_data.achievements.append(achievement_id)
+        user_data.tokens += achievement['tokens']
+        log_event('achievement_unlocked', achievement=achievement_id, tokens=achievement['tokens'])
         
         # Show achievement notification with latest Streamlit features
         st.toast(f"{achievement['icon']} Achievement Unlocked: **{achievement['name']}**\n+{achievement['tokens']} XFI tokens!", icon="🏆")
@@ -792,7 +1287,7 @@ def render_wallet_connection():
     st.markdown('<div class="wallet-card">', unsafe_allow_html=True)
     st.subheader("🔗 CrossFi Testnet Wallet")
     
-    if not st.session_state.wallet['connected']:
+    if not st.session_state.wallet.connected:
         st.info("💡 Connect your wallet to claim earned tokens and interact with CrossFi testnet.")
         
         # Display testnet configuration
@@ -815,36 +1310,36 @@ Explorer: {CROSSFI_TESTNET_CONFIG['blockExplorerUrls'][0]}
         with wallet_col1:
             if st.button("🦊 MetaMask", type="primary", use_container_width=True):
                 # Simulate MetaMask connection
-                st.session_state.wallet.update({
-                    'connected': True,
-                    'address': f"0x{random.randint(10**15, 10**16-1):016x}",
-                    'network': 'CrossFi Testnet',
-                    'balance': round(random.uniform(0.1, 10.0), 4)
-                })
+                st.session_state.wallet.update(
+                    connected=True,
+                    address=f"0x{random.randint(10**15, 10**16-1):016x}",
+                    network='CrossFi Testnet',
+                    balance=round(random.uniform(0.1, 10.0), 4)
+                )
                 st.success("🎉 MetaMask connected successfully!")
                 check_and_award_achievements()
                 st.rerun()
         
         with wallet_col2:
             if st.button("🔵 Keplr Wallet", use_container_width=True):
-                st.session_state.wallet.update({
-                    'connected': True,
-                    'address': f"crossfi{random.randint(10**10, 10**11-1)}",
-                    'network': 'Cosmos Hub',
-                    'balance': round(random.uniform(0.1, 10.0), 4)
-                })
+                st.session_state.wallet.update(
+                    connected=True,
+                    address=f"crossfi{random.randint(10**10, 10**11-1)}",
+                    network='Cosmos Hub',
+                    balance=round(random.uniform(0.1, 10.0), 4)
+                )
                 st.success("🎉 Keplr connected successfully!")
                 check_and_award_achievements()
                 st.rerun()
         
         with wallet_col3:
             if st.button("⚡ CrossFi Wallet", use_container_width=True):
-                st.session_state.wallet.update({
-                    'connected': True,
-                    'address': f"xfi{random.randint(10**12, 10**13-1)}",
-                    'network': 'CrossFi Native',
-                    'balance': round(random.uniform(0.1, 10.0), 4)
-                })
+                st.session_state.wallet.update(
+                    connected=True,
+                    address=f"xfi{random.randint(10**12, 10**13-1)}",
+                    network='CrossFi Native',
+                    balance=round(random.uniform(0.1, 10.0), 4)
+                )
                 st.success("🎉 CrossFi Wallet connected successfully!")
                 check_and_award_achievements()
                 st.rerun()
@@ -861,18 +1356,18 @@ Explorer: {CROSSFI_TESTNET_CONFIG['blockExplorerUrls'][0]}
     else:
         # Display connected wallet info
         wallet = st.session_state.wallet
-        st.success(f"✅ Connected: {wallet['network']}")
+        st.success(f"✅ Connected: {wallet.network}")
         
         info_col1, info_col2 = st.columns(2)
         with info_col1:
-            st.metric("💰 Wallet Balance", f"{wallet['balance']:.4f} XFI")
+            st.metric("💰 Wallet Balance", f"{wallet.balance:.4f} XFI")
         with info_col2:
-            st.metric("🏆 Earned Tokens", f"{st.session_state.user_data['tokens']} XFI")
+            st.metric("🏆 Earned Tokens", f"{st.session_state.user_data.tokens} XFI")
         
-        st.caption(f"Address: `{wallet['address']}`")
+        st.caption(f"Address: `{wallet.address}`")
         
         # Token claiming interface
-        available_tokens = st.session_state.user_data['tokens']
+        available_tokens = st.session_state.user_data.tokens
         if available_tokens > 0:
             st.success(f"💎 **{available_tokens} XFI** tokens ready to claim!")
             
@@ -881,24 +1376,20 @@ Explorer: {CROSSFI_TESTNET_CONFIG['blockExplorerUrls'][0]}
                     time.sleep(2)  # Simulate transaction time
                 
                 # Update balances
-                st.session_state.wallet['balance'] += available_tokens * 0.001  # Convert to actual XFI
-                st.session_state.user_data['tokens'] = 0
+                st.session_state.wallet.balance += available_tokens * 0.001  # Convert to actual XFI
+                st.session_state.user_data.tokens = 0
+                log_event('tokens_claimed', tokens=available_tokens)
                 
                 st.balloons()
                 st.success(f"✅ Successfully claimed {available_tokens} XFI tokens!")
-                st.info(f"📤 Sent to: {wallet['address']}")
+                st.info(f"📤 Sent to: {wallet.address}")
                 st.rerun()
         else:
             st.info("📚 Complete lessons and quizzes to earn more tokens!")
         
         # Disconnect option
         if st.button("🔌 Disconnect Wallet", type="secondary"):
-            st.session_state.wallet = {
-                'connected': False,
-                'address': '',
-                'network': '',
-                'balance': 0
-            }
+            st.session_state.wallet = WalletState()
             st.rerun()
     
     st.markdown('</div>', unsafe_allow_html=True)
@@ -906,7 +1397,7 @@ Explorer: {CROSSFI_TESTNET_CONFIG['blockExplorerUrls'][0]}
 def render_lesson(lesson_id):
     """Enhanced lesson rendering with better UX"""
     lesson = LESSON_CONTENT[lesson_id]
-    completed = lesson_id in st.session_state.user_data['completed_lessons']
+    completed = lesson_id in st.session_state.user_data.completed_lessons
     
     st.markdown('<div class="lesson-card">', unsafe_allow_html=True)
     
@@ -921,14 +1412,14 @@ def render_lesson(lesson_id):
             st.success("✅ Completed")
         else:
             # Progress for current lesson
-            current_level = calculate_level(st.session_state.user_data['xp'])
+            current_level = calculate_level(st.session_state.user_data.xp)
             if lesson_id <= current_level or lesson_id == 1:
                 st.info("📖 Available")
             else:
                 st.warning(f"🔒 Unlock at Level {lesson_id}")
     
     # Lesson content
-    if lesson_id <= calculate_level(st.session_state.user_data['xp']) or lesson_id == 1 or completed:
+    if lesson_id <= calculate_level(st.session_state.user_data.xp) or lesson_id == 1 or completed:
         with st.container():
             st.markdown(lesson['content'])
         
@@ -939,10 +1430,12 @@ def render_lesson(lesson_id):
             with complete_col1:
                 if st.button(f"🎯 Complete Lesson {lesson_id}", type="primary", use_container_width=True):
                     # Mark lesson as completed
-                    st.session_state.user_data['completed_lessons'].append(lesson_id)
-                    st.session_state.user_data['xp'] += lesson['xp_reward']
-                    st.session_state.user_data['tokens'] += lesson['token_reward']
-                    st.session_state.user_data['total_study_time'] += lesson['duration']
+                    st.session_state.user_data.completed_lessons.append(lesson_id)
+                    st.session_state.user_data.lesson_completed_at[lesson_id] = time.time()
+                    st.session_state.user_data.xp += lesson['xp_reward']
+                    st.session_state.user_data.tokens += lesson['token_reward']
+                    st.session_state.user_data.total_study_time += lesson['duration']
+                    log_event('lesson_completed', lesson=lesson_id, tokens=lesson['token_reward'])
                     
                     # Check for achievements
                     check_and_award_achievements()
@@ -965,21 +1458,21 @@ def render_quiz_interface():
     
     quiz_state = st.session_state.quiz_state
     
-    if not quiz_state['active']:
+    if quiz_state.job_id is None and not quiz_state.active:
         # Quiz setup
         setup_col1, setup_col2 = st.columns(2)
         
         with setup_col1:
             topic = st.selectbox(
                 "📚 Select Topic:",
-                ["Blockchain Fundamentals", "CrossFi Platform", "Cosmos SDK & EVM", "DeFi Concepts", "Smart Contract Development"],
+                QUIZ_TOPICS,
                 help="Choose a topic based on completed lessons"
             )
         
         with setup_col2:
             difficulty = st.selectbox(
                 "⚙️ Difficulty Level:",
-                ["beginner", "intermediate", "advanced"],
+                QUIZ_DIFFICULTIES,
                 index=1,
                 help="Higher difficulty = more tokens!"
             )
@@ -987,29 +1480,38 @@ def render_quiz_interface():
         # Token rewards info
         token_rewards = {"beginner": "20-40", "intermediate": "30-60", "advanced": "50-100"}
         st.info(f"💰 Potential Rewards: {token_rewards[difficulty]} XFI tokens based on performance")
+        due_reviews = len(get_review_schedule().due(topic, QUIZ_REVIEW_SLOTS))
+        if due_reviews:
+            st.caption(f"🔁 {due_reviews} question(s) you missed or are due to revisit will be included")
         
         if st.button("🚀 Start Quiz", type="primary", use_container_width=True):
-            with st.spinner("🤖 Generating AI-powered quiz questions..."):
-                questions = generate_quiz_questions(topic, difficulty)
-                
-                st.session_state.quiz_state.update({
-                    'active': True,
-                    'questions': questions,
-                    'current_q': 0,
-                    'score': 0,
-                    'topic': topic,
-                    'difficulty': difficulty,
-                    'start_time': time.time()
-                })
+            start_quiz_job(topic, difficulty)
+            st.rerun()
+    
+    elif quiz_state.job_id is not None:
+        # Built in the background: only the status fragment reruns until the quiz is ready
+        render_quiz_job_status()
+        if st.button("✖️ Cancel Quiz", help="Stop waiting and choose another quiz"):
+            init_quiz_jobs().cancel(quiz_state.job_id)
+            st.session_state.quiz_state = QuizState()
             st.rerun()
     
     else:
         # Active quiz
-        questions = quiz_state['questions']
-        current_q = quiz_state['current_q']
+        questions = init_question_store().get_many(quiz_state.question_ids)
+        current_q = quiz_state.current_q
+        
+        if questions is None:
+            # The shared store evicted this quiz's questions (e.g. after a long idle)
+            st.warning("⌛ This quiz has expired. Please start a new one.")
+            st.session_state.quiz_state = QuizState()
+            st.markdown('</div>', unsafe_allow_html=True)
+            return
         
         if current_q < len(questions):
-            question = questions[current_q]
+            # Each learner and attempt sees its own shuffle and wording of the stored question
+            question = make_variant(questions[current_q], variant_seed(
+                st.session_state.user_data.variant_seed, quiz_state.question_ids[current_q], quiz_state.start_time))
             
             # Progress bar
             progress = (current_q + 1) / len(questions)
@@ -1030,30 +1532,44 @@ def render_quiz_interface():
             col1, col2 = st.columns([3, 1])
             with col1:
                 if st.button("✅ Submit Answer", type="primary", use_container_width=True):
-                    selected_index = question['options'].index(answer)
-                    is_correct = selected_index == question['correct']
-                    
-                    if is_correct:
-                        st.success("🎉 Correct!")
-                        quiz_state['score'] += 1
+                    if answer not in question['options']:
+                        # No selection, or options that changed under a stale widget key
+                        st.warning("⚠️ Please select an answer first.")
                     else:
-                        st.error("❌ Incorrect!")
-                    
-                    st.info(f"💡 **Explanation:** {question['explanation']}")
-                    
-                    quiz_state['current_q'] += 1
-                    time.sleep(2)
-                    st.rerun()
+                        is_correct = question['options'].index(answer) == question['correct']
+                        record_review(quiz_state.question_ids[current_q], quiz_state.topic,
+                                      QUALITY_CORRECT if is_correct else QUALITY_INCORRECT)
+                        record_answer(quiz_state.question_ids[current_q], is_correct)
+                        
+                        if is_correct:
+                            st.success("🎉 Correct!")
+                            quiz_state.score += 1
+                        else:
+                            st.error("❌ Incorrect!")
+                        
+                        st.info(f"💡 **Explanation:** {question.get('explanation') or 'No explanation available.'}")
+                        
+                        quiz_state.current_q += 1
+                        time.sleep(2)
+                        quiz_state.question_started = time.time()
+                        st.rerun()
             
             with col2:
                 if st.button("⏭️ Skip", help="Skip this question (no points)"):
-                    quiz_state['current_q'] += 1
+                    record_review(quiz_state.question_ids[current_q], quiz_state.topic, QUALITY_SKIPPED)
+                    record_answer(quiz_state.question_ids[current_q], False, skipped=True)
+                    quiz_state.current_q += 1
+                    quiz_state.question_started = time.time()
                     st.rerun()
         
         else:
             # Quiz completion
-            final_score = (quiz_state['score'] / len(questions)) * 100
-            time_taken = round(time.time() - quiz_state.get('start_time', time.time()))
+            final_score = (quiz_state.score / len(questions)) * 100
+            # Rewards are granted on the first rerun showing the results, not on every rerun after it
+            first_view = quiz_state.completed_at is None
+            if first_view:
+                quiz_state.completed_at = time.time()
+            time_taken = round(quiz_state.completed_at - (quiz_state.start_time or quiz_state.completed_at))
             
             st.success("🎊 Quiz Completed!")
             
@@ -1064,10 +1580,10 @@ def render_quiz_interface():
             with result_col2:
                 st.metric("⏱️ Time Taken", f"{time_taken}s")
             with result_col3:
-                st.metric("✅ Correct", f"{quiz_state['score']}/{len(questions)}")
+                st.metric("✅ Correct", f"{quiz_state.score}/{len(questions)}")
             
             # Token calculation
-            base_tokens = {"beginner": 20, "intermediate": 30, "advanced": 50}[quiz_state['difficulty']]
+            base_tokens = {"beginner": 20, "intermediate": 30, "advanced": 50}[quiz_state.difficulty]
             bonus_multiplier = 1.0
             
             if final_score >= 90:
@@ -1086,12 +1602,15 @@ def render_quiz_interface():
             tokens_earned = int(base_tokens * bonus_multiplier)
             
             # Award tokens and XP
-            st.session_state.user_data['tokens'] += tokens_earned
-            st.session_state.user_data['xp'] += tokens_earned // 2
-            st.session_state.user_data['quiz_scores'].append(final_score)
-            
-            # Check for achievements
-            check_and_award_achievements()
+            if first_view:
+                st.session_state.user_data.tokens += tokens_earned
+                st.session_state.user_data.xp += tokens_earned // 2
+                st.session_state.user_data.quiz_scores.append(final_score)
+                log_event('quiz_completed', topic=quiz_state.topic, difficulty=quiz_state.difficulty,
+                          score=final_score, tokens=tokens_earned)
+                
+                # Check for achievements
+                check_and_award_achievements()
             
             st.success(f"🎁 Earned: {tokens_earned} XFI tokens + {tokens_earned//2} XP!")
             
@@ -1099,13 +1618,7 @@ def render_quiz_interface():
             button_col1, button_col2 = st.columns(2)
             with button_col1:
                 if st.button("🔄 Take Another Quiz", type="primary"):
-                    st.session_state.quiz_state = {
-                        'active': False,
-                        'questions': [],
-                        'current_q': 0,
-                        'score': 0,
-                        'topic': ''
-                    }
+                    st.session_state.quiz_state = QuizState()
                     st.rerun()
             
             with button_col2:
@@ -1117,7 +1630,7 @@ def render_quiz_interface():
 def render_user_profile():
     """Enhanced user profile with modern Streamlit features"""
     user_data = st.session_state.user_data
-    current_level = calculate_level(user_data['xp'])
+    current_level = calculate_level(user_data.xp)
     
     # Profile header with better spacing
     st.markdown("### 👤 Your Learning Profile")
@@ -1138,19 +1651,19 @@ def render_user_profile():
         )
         st.metric(
             "⚡ Total XP", 
-            user_data['xp'],
+            user_data.xp,
             help="Experience Points from lessons and quizzes"
         )
     
     with col2:
         st.metric(
             "🏆 Available Tokens", 
-            f"{user_data['tokens']} XFI",
+            f"{user_data.tokens} XFI",
             help="Testnet tokens ready to claim"
         )
         st.metric(
             "📚 Lessons Completed", 
-            f"{len(user_data['completed_lessons'])}/{len(LESSON_CONTENT)}",
+            f"{len(user_data.completed_lessons)}/{len(LESSON_CONTENT)}",
             help="Progress through the curriculum"
         )
     
@@ -1167,7 +1680,7 @@ def render_user_profile():
         else:
             next_level_xp_req = 3000 + (current_level - 5) * 500
         
-        current_level_xp = user_data['xp']
+        current_level_xp = user_data.xp
         
         # Calculate previous level XP requirement
         if current_level == 1:
@@ -1192,12 +1705,12 @@ def render_user_profile():
         st.caption(f"Next level requires {next_level_xp_req - current_level_xp} more XP")
     
     # Achievements section with better layout
-    if user_data['achievements']:
+    if user_data.achievements:
         st.markdown("---")
         st.markdown("#### 🏆 Achievements Unlocked")
         
         # Display achievements in a cleaner format
-        for i, achievement_id in enumerate(user_data['achievements']):
+        for i, achievement_id in enumerate(user_data.achievements):
             achievement = ACHIEVEMENTS[achievement_id]
             with st.container():
                 col1, col2 = st.columns([1, 4])
@@ -1207,58 +1720,59 @@ def render_user_profile():
                     st.markdown(f"**{achievement['name']}**")
                     st.caption(achievement['description'])
                     st.caption(f"Reward: +{achievement['tokens']} XFI")
-            if i < len(user_data['achievements']) - 1:
+            if i < len(user_data.achievements) - 1:
                 st.markdown("---")
     
     # Learning statistics with better organization
-    if user_data['quiz_scores']:
+    quiz_scores = user_data.quiz_scores
+    if quiz_scores:
         st.markdown("---")
         st.markdown("#### 📊 Quiz Performance")
         
-        # Performance metrics in a clean layout
-        avg_score = sum(user_data['quiz_scores']) / len(user_data['quiz_scores'])
-        best_score = max(user_data['quiz_scores'])
+        # Performance metrics from the running aggregates, O(1) however many quizzes
+        avg_score = quiz_scores.average
+        best_score = quiz_scores.best
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("📈 Average", f"{avg_score:.1f}%")
+            recent_delta = None
+            if quiz_scores.count > ScoreHistory.RECENT_WINDOW:
+                recent_delta = f"{quiz_scores.recent_average - avg_score:+.1f}% last {ScoreHistory.RECENT_WINDOW}"
+            st.metric("📈 Average", f"{avg_score:.1f}%", delta=recent_delta)
         with col2:
             st.metric("🎯 Best", f"{best_score:.0f}%")
         with col3:
-            st.metric("📝 Total", len(user_data['quiz_scores']))
+            st.metric("📝 Total", quiz_scores.count)
         
         # Only show chart if there are multiple quiz scores
-        if len(user_data['quiz_scores']) > 1:
+        if quiz_scores.count > 1:
             st.markdown("**Score Progression:**")
-            quiz_df = pd.DataFrame({
-                'Quiz': range(1, len(user_data['quiz_scores']) + 1),
-                'Score': user_data['quiz_scores']
-            })
+            quiz_df = charts.score_progression(quiz_scores, CHART_MAX_POINTS["score_progression"])
+            if len(quiz_df) < quiz_scores.count:
+                st.caption(f"Showing {len(quiz_df)} representative points of {quiz_scores.count} quizzes")
             
-            fig = px.line(
-                quiz_df, 
-                x='Quiz', 
-                y='Score',
-                markers=True,
-                line_shape='spline'
-            )
-            fig.update_layout(
-                yaxis_title="Score (%)",
-                xaxis_title="Quiz Number",
-                showlegend=False,
-                height=200  # Smaller height for sidebar
-            )
+            fig = build_score_figure(quiz_df)
             st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
 
-def render_leaderboard():
-    """Simulated leaderboard for engagement"""
-    st.subheader("🏆 Global Leaderboard")
-    st.caption("See how you rank against other CrossFi learners!")
-    
-    # Generate simulated leaderboard data
-    current_user_score = st.session_state.user_data['xp']
-    
-    # Create realistic leaderboard
+def build_score_figure(quiz_df):
+    """Sidebar score progression line"""
+    fig = px.line(
+        quiz_df, 
+        x='Quiz', 
+        y='Score',
+        markers=len(quiz_df) <= 50,
+        line_shape='spline' if len(quiz_df) <= 50 else 'linear'
+    )
+    fig.update_layout(
+        yaxis_title="Score (%)",
+        xaxis_title="Quiz Number",
+        showlegend=False,
+        height=200  # Smaller height for sidebar
+    )
+    return fig
+
+def simulate_leaderboard():
+    """Simulated rival learners for the leaderboard"""
     leaderboard_data = []
     names = ["CryptoMaster", "DeFiExplorer", "BlockchainPro", "CrossFiGuru", "TokenTrader",
              "SmartContract", "CosmosExpert", "EVMDeveloper", "YieldFarmer", "LiquidityProvider"]
@@ -1278,6 +1792,27 @@ def render_leaderboard():
             'Level': calculate_level(score),
             'Tokens Earned': score // 10
         })
+    return leaderboard_data
+
+def style_leaderboard(df):
+    """Leaderboard table with the current user's row highlighted"""
+    def highlight_user(row):
+        if "You 👤" in str(row['Username']):
+            return ['background-color: #e1f5fe'] * len(row)
+        return [''] * len(row)
+    
+    return df.style.apply(highlight_user, axis=1)
+
+def render_leaderboard():
+    """Simulated leaderboard for engagement"""
+    st.subheader("🏆 Global Leaderboard")
+    st.caption("See how you rank against other CrossFi learners!")
+    
+    current_user_score = st.session_state.user_data.xp
+    
+    # One snapshot for every worker and rerun, refreshed every few minutes (rows are copied: ranks change below)
+    leaderboard_data = [dict(row) for row in init_shared_cache().get_or_compute(
+        "leaderboard:snapshot", simulate_leaderboard, ttl=LEADERBOARD_SNAPSHOT_SECONDS)]
     
     # Add current user
     user_rank = len([x for x in leaderboard_data if x['XP'] > current_user_score]) + 1
@@ -1297,24 +1832,260 @@ def render_leaderboard():
         entry['Rank'] = i + 1
     
     # Display leaderboard
-    df = pd.DataFrame(leaderboard_data)
-    
-    # Highlight current user
-    def highlight_user(row):
-        if "You 👤" in str(row['Username']):
-            return ['background-color: #e1f5fe'] * len(row)
-        return [''] * len(row)
-    
-    styled_df = df.style.apply(highlight_user, axis=1)
-    st.dataframe(styled_df, use_container_width=True, hide_index=True)
+    st.dataframe(style_leaderboard(pd.DataFrame(leaderboard_data)), use_container_width=True, hide_index=True)
     
     # User's position
     user_entry = next(x for x in leaderboard_data if "You 👤" in x['Username'])
     st.info(f"🎯 Your Rank: #{user_entry['Rank']} with {current_user_score} XP")
 
-def main():
-    """Main application with modern Streamlit features"""
-    init_session_state()
+def build_activity_figure(activity_df, period):
+    """Progress tab XP bars per calendar bucket"""
+    fig = px.bar(
+        activity_df, 
+        x='Period', 
+        y='XP', 
+        color='Type',
+        hover_data=['Activities'],
+        title=f"XP Earned per {period}",
+        color_discrete_map={'Lesson': '#2563eb', 'Quiz': '#7c3aed'}
+    )
+    fig.update_layout(xaxis_title=period)
+    return fig
+
+def render_progress_analytics():
+    """Learning analytics for the Progress tab"""
+    st.header("📊 Learning Analytics")
+    
+    # Overall statistics
+    user_data = st.session_state.user_data
+    
+    # Key performance indicators
+    kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
+    
+    with kpi_col1:
+        st.metric("🎯 Current Level", calculate_level(user_data.xp))
+    
+    with kpi_col2:
+        completion_rate = len(user_data.completed_lessons) / len(LESSON_CONTENT) * 100
+        st.metric("📚 Course Progress", f"{completion_rate:.0f}%")
+    
+    with kpi_col3:
+        if user_data.quiz_scores:
+            st.metric("🧠 Avg Quiz Score", f"{user_data.quiz_scores.average:.0f}%")
+        else:
+            st.metric("🧠 Avg Quiz Score", "No data")
+    
+    with kpi_col4:
+        total_tokens = sum(LESSON_CONTENT[lid]['token_reward'] for lid in user_data.completed_lessons)
+        # 10 XFI per quiz, +10 at 60% and another +10 at 80%
+        quiz_scores = user_data.quiz_scores
+        total_tokens += 10 * (quiz_scores.count + quiz_scores.count_at_least(60) + quiz_scores.count_at_least(80))
+        st.metric("💎 Total Earned", f"{total_tokens} XFI")
+    
+    # Learning journey visualization
+    if user_data.completed_lessons or user_data.quiz_scores:
+        st.subheader("📈 Your Learning Journey")
+        
+        # Lessons completed before completion times were recorded are dated to the last login
+        completed_at = user_data.lesson_completed_at
+        fallback_time = datetime.fromisoformat(user_data.last_login).timestamp()
+        lesson_times = [completed_at.get(lesson_id, fallback_time) for lesson_id in user_data.completed_lessons]
+        lesson_xp = [LESSON_CONTENT[lesson_id]['xp_reward'] for lesson_id in user_data.completed_lessons]
+        
+        # XP aggregated per day/week/... so the bar count stays bounded
+        activity_df, period = charts.activity_by_period(
+            user_data.quiz_scores, lesson_times, lesson_xp,
+            max_buckets=CHART_MAX_POINTS["activity_periods"]
+        )
+        
+        if not activity_df.empty:
+            st.plotly_chart(build_activity_figure(activity_df, period), use_container_width=True)
+    
+    # Achievement progress
+    st.subheader("🏆 Achievement Progress")
+    
+    achievement_progress = []
+    for achievement_id, achievement in ACHIEVEMENTS.items():
+        is_earned = achievement_id in user_data.achievements
+        
+        # Calculate progress for each achievement
+        if achievement_id == 'first_lesson':
+            progress = min(1.0, len(user_data.completed_lessons))
+        elif achievement_id == 'level_5':
+            progress = min(1.0, calculate_level(user_data.xp) / 5)
+        elif achievement_id == 'perfect_quiz':
+            progress = 1.0 if user_data.quiz_scores.best >= 100 else 0.0
+        elif achievement_id == 'wallet_connected':
+            progress = 1.0 if st.session_state.wallet.connected else 0.0
+        elif achievement_id == 'all_lessons':
+            progress = len(user_data.completed_lessons) / len(LESSON_CONTENT)
+        else:
+            progress = 1.0 if is_earned else 0.0
+        
+        achievement_progress.append({
+            'Achievement': achievement['name'],
+            'Progress': progress * 100,
+            'Status': '✅ Earned' if is_earned else '🔒 Locked',
+            'Reward': f"{achievement['tokens']} XFI"
+        })
+    
+    achievement_df = pd.DataFrame(achievement_progress)
+    st.dataframe(achievement_df, use_container_width=True, hide_index=True)
+
+def render_footer():
+    """Branded footer with community links"""
+    st.markdown("""
+    <div class="app-footer">
+        <h3>🚀 CrossFi Quest</h3>
+        <p>Gamified blockchain education platform</p>
+        <p><strong>Learn • Earn • Build the future of decentralized finance</strong></p>
+        <p style="margin-top: 1rem; opacity: 0.8;">
+            🌐 <a href="https://crossfi.org" style="color: #06b6d4;">CrossFi.org</a> • 
+            📚 <a href="https://docs.crossfi.org" style="color: #06b6d4;">Documentation</a> • 
+            💬 <a href="https://discord.gg/crossfi" style="color: #06b6d4;">Community</a>
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+def is_admin():
+    """Admin pages are unlocked per session with ADMIN_PASSWORD from secrets"""
+    return st.session_state.ui_state.is_admin
+
+def render_admin_login():
+    """Sidebar unlock for admin-only pages; hidden when no ADMIN_PASSWORD is configured"""
+    admin_password = st.secrets.get("ADMIN_PASSWORD", "")
+    if not admin_password:
+        return
+    
+    with st.expander("🔐 Admin", expanded=False):
+        if is_admin():
+            st.caption("Admin tools unlocked")
+            ui_state = st.session_state.ui_state
+            show_advanced = st.toggle("🐞 Performance debug panel", value=ui_state.show_advanced)
+            if show_advanced != ui_state.show_advanced:
+                ui_state.show_advanced = show_advanced
+                st.rerun()
+            if st.button("🔒 Lock Admin", use_container_width=True):
+                st.session_state.ui_state.is_admin = False
+                st.rerun()
+        else:
+            password = st.text_input("Admin password", type="password")
+            if password:
+                if hmac.compare_digest(password, admin_password):
+                    st.session_state.ui_state.is_admin = True
+                    st.rerun()
+                else:
+                    st.error("Incorrect admin password")
+
+def render_llm_dashboard():
+    """Admin-only view of Groq token usage, latency, parse failures and fallbacks"""
+    st.subheader("🤖 LLM Usage & Cost")
+    st.caption("Process-wide counters since this worker started. "
+               "Prometheus scrape endpoint: `/metrics` on the configured METRICS_PORT.")
+    
+    requests = telemetry.LLM_REQUESTS.samples()
+    latency = telemetry.LLM_LATENCY.samples()
+    prompt_tokens = telemetry.LLM_PROMPT_TOKENS.samples()
+    completion_tokens = telemetry.LLM_COMPLETION_TOKENS.samples()
+    cost = telemetry.LLM_COST.samples()
+    parses = telemetry.LLM_PARSE.samples()
+    generated = telemetry.LLM_QUESTIONS.samples()
+    
+    rows = []
+    for key, series in sorted(latency.items()):
+        calls = series['count']
+        errors = requests.get(key + ('error',), 0)
+        # A partial parse still yielded usable questions
+        parsed_ok = parses.get(key + ('ok',), 0) + parses.get(key + ('partial',), 0)
+        parsed_total = parsed_ok + parses.get(key + ('error',), 0)
+        question_outcomes = {outcome: generated.get(key + (outcome,), 0)
+                             for outcome in ('valid', 'repaired', 'rejected')}
+        rows.append({
+            'Model': key[0],
+            'Topic': key[1],
+            'Difficulty': key[2],
+            'Calls': calls,
+            'Error Rate': f"{errors / calls * 100:.0f}%" if calls else "-",
+            'p50 (s)': round(telemetry.LLM_LATENCY.quantile(0.5, series), 2),
+            'p95 (s)': round(telemetry.LLM_LATENCY.quantile(0.95, series), 2),
+            'Prompt Tokens': prompt_tokens.get(key, 0),
+            'Completion Tokens': completion_tokens.get(key, 0),
+            'Parse OK': f"{parsed_ok / parsed_total * 100:.0f}%" if parsed_total else "-",
+            'Questions Repaired': question_outcomes['repaired'],
+            'Questions Rejected': question_outcomes['rejected'],
+            'Cost (USD)': round(cost.get(key, 0.0), 4)
+        })
+    
+    if rows:
+        usage_df = pd.DataFrame(rows)
+        kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
+        with kpi_col1:
+            st.metric("📞 Groq Calls", int(usage_df['Calls'].sum()))
+        with kpi_col2:
+            st.metric("🔤 Tokens", int(usage_df['Prompt Tokens'].sum() + usage_df['Completion Tokens'].sum()))
+        with kpi_col3:
+            st.metric("💵 Est. Cost", f"${usage_df['Cost (USD)'].sum():.4f}")
+        with kpi_col4:
+            st.metric("🛟 Fallbacks", sum(telemetry.QUIZ_FALLBACKS.samples().values()))
+        st.dataframe(usage_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("No Groq calls recorded by this worker yet.")
+    
+    fallbacks = telemetry.QUIZ_FALLBACKS.samples()
+    if fallbacks:
+        st.markdown("**Fallbacks**")
+        st.dataframe(pd.DataFrame(
+            [{'Topic': t, 'Difficulty': d, 'Reason': r, 'Source': src, 'Count': n}
+             for (t, d, r, src), n in sorted(fallbacks.items())]
+        ), use_container_width=True, hide_index=True)
+    
+    policy_col1, policy_col2 = st.columns(2)
+    with policy_col1:
+        st.markdown("**Circuit Breaker**")
+        st.json(init_generation_policy().breaker.snapshot())
+    with policy_col2:
+        st.markdown("**Model Router**")
+        st.json(init_model_router().snapshot())
+    st.caption("🪣 Groq tokens available — "
+               + ", ".join(f"{level}: {tokens}" for level, tokens in init_rate_limiter().snapshot(
+                   {"user": st.session_state.user_data.learner_id}).items()))
+    warm_up = init_warm_up().status()
+    st.caption(f"🔥 Warm-up: {'ready' if warm_up['ready'] else 'running'} after {warm_up['seconds']:.1f} s — "
+               + ", ".join(f"{step['step']} {step['seconds']:.2f} s" + (" ⚠️" if step['error'] else "")
+                           for step in warm_up['steps']))
+
+    bank = init_question_bank()
+    st.caption(f"📚 Question bank: {bank.size()} banked, {bank.near_duplicates_rejected} paraphrases rejected"
+               + (f", corpus {bank.artifact.version}" if bank.artifact else ""))
+    
+    answer_stats = init_answer_stats()
+    calibration = answer_stats.summary(limit=15)
+    st.markdown("**Question Calibration**")
+    st.caption(f"{answer_stats.pending} answer(s) pending, {answer_stats.flushes} flush(es) by this worker")
+    if calibration:
+        store = init_question_store()
+        st.dataframe(pd.DataFrame([
+            {'Question': (store.get(row['qid']) or {}).get('question', row['qid']),
+             'Label': row['label'],
+             'Answers': row['exposures'],
+             'Accuracy': f"{row['accuracy']:.0%}",
+             'Mean Time (s)': None if row['mean_seconds'] is None else round(row['mean_seconds'], 1),
+             'Difficulty (logits)': None if row['difficulty'] is None else round(row['difficulty'], 2)}
+            for row in calibration
+        ]), use_container_width=True, hide_index=True)
+    else:
+        st.info("No answers flushed yet.")
+    
+    with st.expander("📄 Prometheus Exposition", expanded=False):
+        st.code(telemetry.REGISTRY.render(), language="text")
+
+def render_app(profiler):
+    """Header, sidebar and tabs, with each section timed by the rerun profiler"""
+    with profiler.section("collect_quiz_job"):
+        collect_quiz_job()
+    checkpointer = st.session_state.get('checkpointer')
+    if checkpointer is not None and checkpointer.superseded:
+        st.warning("🔀 This session was resumed in another tab or browser. Progress made here is no longer saved.")
     
     # App header with enhanced branding
     st.markdown("""
@@ -1326,7 +2097,8 @@ def main():
     
     # Sidebar with enhanced profile
     with st.sidebar:
-        render_user_profile()
+        with profiler.section("render_user_profile"):
+            render_user_profile()
         
         # Quick actions with better spacing
         st.markdown("---")
@@ -1345,30 +2117,35 @@ def main():
         st.markdown("---")
         st.markdown("#### 🔗 Wallet Status")
         
-        wallet_status = "🟢 Connected" if st.session_state.wallet['connected'] else "🔴 Not Connected"
+        wallet_status = "🟢 Connected" if st.session_state.wallet.connected else "🔴 Not Connected"
         st.info(f"**Status:** {wallet_status}")
         
-        if st.session_state.wallet['connected']:
-            st.success(f"**Balance:** {st.session_state.wallet['balance']:.4f} XFI")
-            st.caption(f"Address: {st.session_state.wallet['address'][:10]}...")
+        if st.session_state.wallet.connected:
+            st.success(f"**Balance:** {st.session_state.wallet.balance:.4f} XFI")
+            st.caption(f"Address: {st.session_state.wallet.address[:10]}...")
         else:
             st.warning("Connect your wallet to claim earned tokens!")
+        
+        render_admin_login()
     
     # Main content with tabs
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    tab_labels = [
         "📚 Learn", 
         "🧠 Quiz", 
         "💰 Wallet", 
         "🏆 Leaderboard", 
         "📊 Progress"
-    ])
+    ]
+    if is_admin():
+        tab_labels.extend(["🛠️ Admin", "📈 Cohorts", "🧮 Memory"])
+    tab1, tab2, tab3, tab4, tab5, *admin_tabs = st.tabs(tab_labels)
     
     with tab1:
         st.header("📚 CrossFi Learning Path")
         st.markdown("Complete lessons in order to unlock advanced topics and earn XFI tokens!")
         
         # Learning progress overview
-        completed = len(st.session_state.user_data['completed_lessons'])
+        completed = len(st.session_state.user_data.completed_lessons)
         total = len(LESSON_CONTENT)
         progress = completed / total
         
@@ -1382,132 +2159,312 @@ def main():
         for lesson_id in sorted(LESSON_CONTENT.keys()):
             with st.expander(
                 f"Lesson {lesson_id}: {LESSON_CONTENT[lesson_id]['title']} "
-                f"({'✅ Completed' if lesson_id in st.session_state.user_data['completed_lessons'] else '📖 Available'})",
-                expanded=lesson_id == 1 and lesson_id not in st.session_state.user_data['completed_lessons']
+                f"({'✅ Completed' if lesson_id in st.session_state.user_data.completed_lessons else '📖 Available'})",
+                expanded=lesson_id == 1 and lesson_id not in st.session_state.user_data.completed_lessons
             ):
-                render_lesson(lesson_id)
+                with profiler.section(f"render_lesson[{lesson_id}]"):
+                    render_lesson(lesson_id)
     
     with tab2:
-        render_quiz_interface()
+        with profiler.section("render_quiz_interface"):
+            render_quiz_interface()
     
     with tab3:
-        render_wallet_connection()
+        with profiler.section("render_wallet_connection"):
+            render_wallet_connection()
     
     with tab4:
-        render_leaderboard()
+        with profiler.section("render_leaderboard"):
+            render_leaderboard()
     
     with tab5:
-        st.header("📊 Learning Analytics")
-        
-        # Overall statistics
-        user_data = st.session_state.user_data
-        
-        # Key performance indicators
-        kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
-        
-        with kpi_col1:
-            st.metric("🎯 Current Level", calculate_level(user_data['xp']))
-        
-        with kpi_col2:
-            completion_rate = len(user_data['completed_lessons']) / len(LESSON_CONTENT) * 100
-            st.metric("📚 Course Progress", f"{completion_rate:.0f}%")
-        
-        with kpi_col3:
-            if user_data['quiz_scores']:
-                avg_score = sum(user_data['quiz_scores']) / len(user_data['quiz_scores'])
-                st.metric("🧠 Avg Quiz Score", f"{avg_score:.0f}%")
-            else:
-                st.metric("🧠 Avg Quiz Score", "No data")
-        
-        with kpi_col4:
-            total_tokens = sum(LESSON_CONTENT[lid]['token_reward'] for lid in user_data['completed_lessons'])
-            total_tokens += sum(30 if score >= 80 else 20 if score >= 60 else 10 for score in user_data['quiz_scores'])
-            st.metric("💎 Total Earned", f"{total_tokens} XFI")
-        
-        # Learning journey visualization
-        if user_data['completed_lessons'] or user_data['quiz_scores']:
-            st.subheader("📈 Your Learning Journey")
-            
-            # Create timeline data
-            activity_data = []
-            
-            # Add lesson completions
-            for lesson_id in user_data['completed_lessons']:
-                activity_data.append({
-                    'Activity': f"Lesson {lesson_id}",
-                    'Type': 'Lesson',
-                    'XP': LESSON_CONTENT[lesson_id]['xp_reward'],
-                    'Tokens': LESSON_CONTENT[lesson_id]['token_reward']
-                })
-            
-            # Add quiz scores
-            for i, score in enumerate(user_data['quiz_scores']):
-                tokens = 30 if score >= 80 else 20 if score >= 60 else 10
-                activity_data.append({
-                    'Activity': f"Quiz {i+1}",
-                    'Type': 'Quiz',
-                    'XP': tokens // 2,
-                    'Tokens': tokens
-                })
-            
-            if activity_data:
-                activity_df = pd.DataFrame(activity_data)
-                
-                # XP progression chart
-                fig = px.bar(
-                    activity_df, 
-                    x='Activity', 
-                    y='XP', 
-                    color='Type',
-                    title="XP Earned by Activity",
-                    color_discrete_map={'Lesson': '#2563eb', 'Quiz': '#7c3aed'}
-                )
-                st.plotly_chart(fig, use_container_width=True)
-        
-        # Achievement progress
-        st.subheader("🏆 Achievement Progress")
-        
-        achievement_progress = []
-        for achievement_id, achievement in ACHIEVEMENTS.items():
-            is_earned = achievement_id in user_data['achievements']
-            
-            # Calculate progress for each achievement
-            if achievement_id == 'first_lesson':
-                progress = min(1.0, len(user_data['completed_lessons']))
-            elif achievement_id == 'level_5':
-                progress = min(1.0, calculate_level(user_data['xp']) / 5)
-            elif achievement_id == 'perfect_quiz':
-                progress = 1.0 if user_data['quiz_scores'] and max(user_data['quiz_scores']) >= 100 else 0.0
-            elif achievement_id == 'wallet_connected':
-                progress = 1.0 if st.session_state.wallet['connected'] else 0.0
-            elif achievement_id == 'all_lessons':
-                progress = len(user_data['completed_lessons']) / len(LESSON_CONTENT)
-            else:
-                progress = 1.0 if is_earned else 0.0
-            
-            achievement_progress.append({
-                'Achievement': achievement['name'],
-                'Progress': progress * 100,
-                'Status': '✅ Earned' if is_earned else '🔒 Locked',
-                'Reward': f"{achievement['tokens']} XFI"
-            })
-        
-        achievement_df = pd.DataFrame(achievement_progress)
-        st.dataframe(achievement_df, use_container_width=True, hide_index=True)
+        with profiler.section("progress_analytics"):
+            render_progress_analytics()
+    
+    if admin_tabs:
+        with admin_tabs[0]:
+            with profiler.section("render_llm_dashboard"):
+                render_llm_dashboard()
+        with admin_tabs[1]:
+            with profiler.section("render_cohort_analytics"):
+                render_cohort_analytics()
+        with admin_tabs[2]:
+            with profiler.section("render_memory_report"):
+                render_memory_report()
+
+# Time ranges offered by the cohort view, in days (0 = everything in the log)
+COHORT_RANGES = {"Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90, "All time": 0}
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_cohort_report(days):
+    """Funnel, lesson completion and score distributions over the last ``days`` UTC days, shared by admins for a minute"""
+    since = time.strftime('%Y-%m-%d', time.gmtime(time.time() - (days - 1) * 86400)) if days else None
+    events = CohortEvents(init_event_log().read(COHORT_COLUMNS, since=since))
+    lessons = events.lesson_completion(list(LESSON_CONTENT))
+    lessons.insert(1, 'Title', [LESSON_CONTENT[lesson_id]['title'] for lesson_id in lessons['Lesson']])
+    return {
+        'events': len(events),
+        'learners': events.learners,
+        'funnel': events.funnel(),
+        'lessons': lessons,
+        'scores': events.score_distribution()
+    }
+
+def render_cohort_analytics():
+    """Admin-only funnels, lesson completion and score distributions across all learners and workers"""
+    st.subheader("📈 Cohort Analytics")
+    event_log = init_event_log()
+    range_label = st.selectbox("Time range", list(COHORT_RANGES), index=1)
+    with st.spinner("Crunching learning events..."):
+        report = load_cohort_report(COHORT_RANGES[range_label])
+    st.caption(f"{report['events']:,} events from {report['learners']:,} learners. Workers flush events every "
+               f"{EVENT_LOG_FLUSH_SECONDS} s and results are cached for a minute; "
+               f"{event_log.pending} event(s) pending on this worker.")
+    
+    if not report['events']:
+        st.info("No learning events recorded in this range yet.")
+    else:
+        st.markdown("**Learner Funnel**")
+        funnel_col1, funnel_col2 = st.columns([3, 2])
+        with funnel_col1:
+            fig = px.funnel(report['funnel'], x='Learners', y='Step')
+            fig.update_layout(height=320, margin=dict(l=0, r=0, t=10, b=0))
+            st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+        with funnel_col2:
+            st.dataframe(report['funnel'], use_container_width=True, hide_index=True)
+        
+        st.markdown("**Completion by Lesson**")
+        st.dataframe(report['lessons'], use_container_width=True, hide_index=True)
+        
+        st.markdown("**Scores by Topic & Difficulty**")
+        st.caption("Completed quizzes, with score buckets and per-answer accuracy")
+        st.dataframe(report['scores'], use_container_width=True, hide_index=True)
+    
+    partitions = event_log.partitions()
+    st.caption(f"🗂️ {len(partitions)} day partition(s), {sum(len(files) for files in partitions.values())} file(s)")
+    if st.button("🗜️ Compact Past Days", help="Merge each finished day's files into one"):
+        removed = event_log.compact()
+        if removed is None:
+            st.toast("Another worker is compacting the event log", icon="⏳")
+        else:
+            st.toast(f"Compacted event log: {removed} file(s) fewer", icon="🗜️")
+
+# tracemalloc attribution: each allocation belongs to the innermost frame in one of these files or functions
+MEMORY_SUBSYSTEMS = {
+    "Session state": ["/session_models.py", "/session_checkpoint.py", init_session_state, resume_session,
+                      checkpoint_session],
+    "Question cache": ["/question_bank.py", "/question_artifact.py", "/near_duplicates.py", "/question_variants.py",
+                       build_quiz],
+    "Groq client": ["/groq/", "/httpx/", "/httpcore/", "/h11/", "/quiz_generation.py", "/llm_policy.py",
+                    generate_quiz_questions],
+    "Lesson renders": ["/lesson_questions.py", "/lesson_retrieval.py", render_lesson],
+    "Leaderboard index": [simulate_leaderboard, style_leaderboard, render_leaderboard],
+    "Charts": ["/charts.py", build_score_figure, build_activity_figure, render_progress_analytics],
+    "Learner stores": ["/shared_cache.py", "/rate_limit.py", "/event_log.py", "/question_stats.py",
+                       "/spaced_repetition.py", "/cohort_analytics.py"],
+    "Memory report": ["/memory_report.py"]
+}
+
+@st.cache_resource
+def init_memory_tracer():
+    """Process-wide tracemalloc snapshots for the admin memory report; off unless MEMORY_TRACING is set"""
+    tracer = MemoryTracer(MEMORY_SUBSYSTEMS, frames=MEMORY_TRACE_FRAMES)
+    if st.secrets.get("MEMORY_TRACING", False):
+        tracer.start()
+    return tracer
+
+def shared_memory_objects():
+    """Process-wide stores that session state points at; sized once as caches, never per session"""
+    return {
+        "Question store": init_question_store(),
+        "Question bank": init_question_bank(),
+        "Lesson questions": init_lesson_questions(),
+        "Lesson retriever": init_lesson_retriever(),
+        "Shared cache": init_shared_cache(),
+        "Event log buffer": init_event_log(),
+        "Answer stats buffer": init_answer_stats(),
+        "Review store": init_review_store(),
+        "Checkpoint store": init_checkpoint_store()
+    }
+
+@st.cache_data(ttl=15, show_spinner=False)
+def load_memory_footprints():
+    """Session and cache sizes on this worker, measured at most every 15 s however many admins are looking"""
+    shared = shared_memory_objects()
+    return {
+        'sessions': init_session_footprints().report(exclude=shared.values()),
+        'caches': cache_footprints(shared),
+        'measured': time.time()
+    }
+
+def render_memory_report():
+    """Admin-only memory footprint of this worker: sessions, caches and allocations by subsystem"""
+    st.subheader("🧮 Memory")
+    rss, peak_rss = process_rss()
+    footprints = load_memory_footprints()
+    sessions = footprints['sessions']
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Resident Memory", f"{rss / 2**20:,.0f} MiB" if rss is not None else "n/a")
+    col2.metric("Peak Resident", f"{peak_rss / 2**20:,.0f} MiB")
+    col3.metric("Live Sessions", f"{sessions['sessions']:,}")
+    col4.metric("Avg / Max Session", f"{sessions['average'] / 1024:,.0f} / {sessions['max'] / 1024:,.0f} KiB")
+    st.caption(f"Measured {datetime.fromtimestamp(footprints['measured']):%H:%M:%S} on this worker only. "
+               "Session sizes are as of each session's last rerun and leave out the shared stores below.")
+    
+    size_col1, size_col2 = st.columns(2)
+    with size_col1:
+        st.markdown("**Session State by Key**")
+        st.dataframe(pd.DataFrame(sessions['by_key']), use_container_width=True, hide_index=True)
+    with size_col2:
+        st.markdown("**Process-Wide Caches**")
+        st.dataframe(pd.DataFrame(footprints['caches']), use_container_width=True, hide_index=True)
+    
+    st.markdown("**Allocations by Subsystem** (tracemalloc)")
+    tracer = init_memory_tracer()
+    if not tracer.tracing:
+        st.caption("Tracing is off. While on, every allocation is several times slower (more so with more frames) "
+                   "and tracemalloc uses memory of its own; only allocations made after it starts are seen. "
+                   "Start it, reproduce the reruns you suspect, take snapshots, then stop it.")
+        frames = st.selectbox("Frames per allocation", MEMORY_TRACE_FRAME_CHOICES,
+                              index=MEMORY_TRACE_FRAME_CHOICES.index(MEMORY_TRACE_FRAMES),
+                              help="Deeper tracebacks attribute more allocations to a subsystem")
+        if st.button("▶️ Start Tracing"):
+            tracer.start(frames)
+            st.rerun()
+        return
+    
+    traced, traced_peak, overhead = tracer.traced_memory()
+    st.caption(f"Tracing {tracer.frames} frame(s) deep: {traced / 2**20:,.1f} MiB traced "
+               f"(peak {traced_peak / 2**20:,.1f} MiB), tracemalloc overhead {overhead / 2**20:,.1f} MiB.")
+    trace_col1, trace_col2 = st.columns(2)
+    with trace_col1:
+        if st.button("📸 Take Snapshot", use_container_width=True,
+                     help="Each snapshot shows what grew since the previous one"):
+            with st.spinner("Grouping allocations..."):
+                tracer.take_snapshot(note=f"{len(init_session_footprints())} live sessions")
+    with trace_col2:
+        if st.button("⏹️ Stop Tracing", use_container_width=True):
+            tracer.stop()
+            st.rerun()
     
-    # Enhanced footer
-    st.markdown("""
-    <div class="app-footer">
-        <h3>🚀 CrossFi Quest</h3>
-        <p>Gamified blockchain education platform</p>
-        <p><strong>Learn • Earn • Build the future of decentralized finance</strong></p>
-        <p style="margin-top: 1rem; opacity: 0.8;">
-            🌐 <a href="https://crossfi.org" style="color: #06b6d4;">CrossFi.org</a> • 
-            📚 <a href="https://docs.crossfi.org" style="color: #06b6d4;">Documentation</a> • 
-            💬 <a href="https://discord.gg/crossfi" style="color: #06b6d4;">Community</a>
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+    report = tracer.report
+    if report is None:
+        return
+    st.caption(f"Snapshot at {datetime.fromtimestamp(report['taken']):%H:%M:%S} ({report['note']}): "
+               f"{report['traced'] / 2**20:,.1f} MiB live, grouped in {report['seconds']:.1f} s")
+    snapshot_col1, snapshot_col2 = st.columns(2)
+    with snapshot_col1:
+        st.dataframe(pd.DataFrame(report['subsystems']), use_container_width=True, hide_index=True)
+    with snapshot_col2:
+        st.dataframe(pd.DataFrame(report['sites']), use_container_width=True, hide_index=True)
+    
+    if report['growth'] is None:
+        st.caption("Take another snapshot after some reruns to see what grew in between.")
+        return
+    st.markdown(f"**Growth since {datetime.fromtimestamp(report['since']):%H:%M:%S}**")
+    growth_col1, growth_col2 = st.columns(2)
+    with growth_col1:
+        st.dataframe(pd.DataFrame(report['growth']), use_container_width=True, hide_index=True)
+    with growth_col2:
+        st.dataframe(pd.DataFrame(report['growth_sites']), use_container_width=True, hide_index=True)
+
+def is_profiling_enabled():
+    """Rerun profiling is on with DEBUG_MODE in secrets or the session's advanced toggle"""
+    return bool(st.secrets.get("DEBUG_MODE", False)) or st.session_state.ui_state.show_advanced
+
+def render_debug_panel(profiler):
+    """Per-section timings for this rerun and the last on-demand cProfile capture"""
+    ui_state = st.session_state.ui_state
+    with st.expander(f"🐞 Performance Debug: {profiler.total * 1000:.1f} ms this rerun", expanded=False):
+        breakdown = profiler.breakdown()
+        if breakdown:
+            st.dataframe(pd.DataFrame(breakdown), use_container_width=True, hide_index=True)
+        st.caption(f"Rolling log: `{profiler.log_path}`")
+        
+        if st.button("📸 Profile Next Rerun", help="Capture a cProfile report of one full rerun"):
+            ui_state.capture_cprofile = True
+            st.rerun()
+        
+        report = ui_state.last_cprofile_report
+        if report:
+            st.markdown("**Last cProfile capture** (sorted by cumulative time)")
+            if ui_state.last_cprofile_path:
+                st.caption(f"Saved to `{ui_state.last_cprofile_path}`")
+            st.code(report, language="text")
+            st.download_button("⬇️ Download pstats Report", report, file_name="rerun_profile.txt")
+
+# Process warm-up: everything a fresh worker would otherwise build on its first learners' reruns
+def warm_lesson_indexes():
+    """Lesson facts and BM25 chunks, plus the packed prompt context for every topic and difficulty"""
+    generator = init_lesson_questions()
+    retriever = init_lesson_retriever()
+    for topic in QUIZ_TOPIC_LESSONS:
+        for difficulty in QUIZ_DIFFICULTIES:
+            generator.generate(topic, difficulty, count=1)
+            retriever.context(topic, difficulty)
+
+def warm_figures():
+    """Build and serialize each chart and styled table once; Plotly and the pandas Styler import lazily"""
+    history = ScoreHistory([60.0, 80.0, 100.0])
+    build_score_figure(charts.score_progression(history, CHART_MAX_POINTS["score_progression"])).to_json()
+    activity_df, period = charts.activity_by_period(
+        history, [time.time()], [LESSON_CONTENT[1]['xp_reward']],
+        max_buckets=CHART_MAX_POINTS["activity_periods"]
+    )
+    build_activity_figure(activity_df, period).to_json()
+    style_leaderboard(pd.DataFrame(simulate_leaderboard())).to_html()
+
+@st.cache_resource
+def init_warm_up():
+    """Once-per-process warm-up; sessions arriving meanwhile wait, and /ready on the metrics port is 503 until done"""
+    warm_up = WarmUp([
+        # Without a key init_groq shows an error, which belongs in a learner's session
+        ("groq_client", lambda: init_groq() if st.secrets.get("GROQ_API_KEY") else None),
+        ("generation_policy", lambda: (init_generation_policy(), init_model_router(), init_quiz_jobs())),
+        ("shared_cache", lambda: (init_shared_cache(), init_rate_limiter())),
+        ("question_bank", init_question_bank),
+        ("learner_stores", lambda: (init_review_store(), init_answer_stats(), init_event_log())),
+        ("lesson_indexes", warm_lesson_indexes),
+        ("leaderboard", lambda: init_shared_cache().get_or_compute(
+            "leaderboard:snapshot", simulate_leaderboard, ttl=LEADERBOARD_SNAPSHOT_SECONDS)),
+        ("figures", warm_figures)
+    ])
+    telemetry.set_readiness_check(warm_up.status)
+    return warm_up.run()
+
+def main():
+    """Main application with modern Streamlit features"""
+    init_memory_tracer()
+    init_session_state()
+    init_metrics_server()
+    init_warm_up()
+    
+    ui_state = st.session_state.ui_state
+    capture_cprofile, ui_state.capture_cprofile = ui_state.capture_cprofile, False
+    profiler = RerunProfiler(
+        enabled=is_profiling_enabled(),
+        capture_cprofile=capture_cprofile,
+        log_path=os.path.join(DATA_DIR, "rerun_profile.jsonl"),
+        profile_dir=os.path.join(DATA_DIR, "profiles")
+    )
+    profiler.start()
+    try:
+        render_app(profiler)
+    finally:
+        # Also runs when a handler calls st.rerun(), which is when most state changes
+        with profiler.section("checkpoint_session"):
+            checkpoint_session()
+        track_session_memory()
+        profiler.finish()
+        if profiler.cprofile_report:
+            ui_state.last_cprofile_report = profiler.cprofile_report
+            ui_state.last_cprofile_path = profiler.cprofile_path
+    
+    if profiler.enabled:
+        render_debug_panel(profiler)
+    
+    render_footer()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
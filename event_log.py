@@ -0,0 +1,246 @@
+"""Partitioned, columnar log of learning events across all learners.
+
+Each process buffers events in memory and a background thread flushes
+them as immutable, uncompressed Arrow IPC files under
+``<directory>/day=YYYY-MM-DD/`` (UTC days). Files are written under a
+temporary name and renamed, so readers never see a partial file, and
+concurrent workers never write the same file. Readers memory-map the files,
+so column buffers are paged in from the OS cache rather than parsed.
+Queries prune partitions by day and read only the columns they need.
+``compact`` merges a finished day's many small files into one; readers
+skip the parts a compacted file lists as merged, and list a day again if
+parts vanish while it is read, so a query racing a compaction counts each
+event once.
+
+Learner IDs are stored as 64-bit hashes (``learner_key``), which is all
+cohort queries need and keeps the column fixed-width. Topic, difficulty,
+event and achievement are dictionary-encoded strings.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pyarrow as pa
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+EVENT_TYPES = ('lesson_completed', 'quiz_started', 'quiz_answered', 'quiz_completed',
+               'tokens_claimed', 'achievement_unlocked')
+
+logger = logging.getLogger('event_log')
+
+_CATEGORY = pa.dictionary(pa.int16(), pa.string())
+
+SCHEMA = pa.schema([
+    ('ts', pa.float64()),            # Epoch seconds
+    ('learner', pa.uint64()),        # learner_key(learner_id)
+    ('event', _CATEGORY),            # One of EVENT_TYPES
+    ('lesson', pa.int8()),           # Lesson ID, 0 if not a lesson event
+    ('topic', _CATEGORY),            # Quiz topic, null otherwise
+    ('difficulty', _CATEGORY),       # Quiz difficulty, null otherwise
+    ('correct', pa.int8()),          # 1/0 for answers, -1 otherwise
+    ('score', pa.float32()),         # Quiz percentage, NaN otherwise
+    ('tokens', pa.float32()),        # XFI awarded or claimed
+    ('achievement', _CATEGORY),      # Achievement ID, null otherwise
+])
+
+_DEFAULTS = {'lesson': 0, 'topic': None, 'difficulty': None, 'correct': -1, 'score': float('nan'),
+             'tokens': 0.0, 'achievement': None}
+
+
+def learner_key(learner_id):
+    """Stable 64-bit key for a learner ID"""
+    return int.from_bytes(hashlib.blake2b(learner_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _try_lock(f):
+    """Exclusively lock an open file without blocking; False if another process holds it"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except (BlockingIOError, PermissionError):
+        return False
+    return True
+
+
+def _day(ts):
+    return time.strftime('%Y-%m-%d', time.gmtime(ts))
+
+
+class EventLog:
+    """Process-wide event buffer flushed to day-partitioned Arrow IPC files"""
+
+    def __init__(self, directory, flush_every=5000, flush_interval=30.0):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self._pending = {name: [] for name in SCHEMA.names}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        threading.Thread(target=self._flush_periodically, name='event-log-flush', daemon=True).start()
+        atexit.register(self._flush_quietly)
+
+    @property
+    def pending(self):
+        return len(self._pending['ts'])
+
+    def record(self, event, learner_id, ts=None, **fields):
+        """Buffer one event; ``fields`` are the optional schema columns. Never touches disk."""
+        if event not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type {event!r}")
+        row = dict(_DEFAULTS, **fields)
+        row.update(ts=time.time() if ts is None else ts, learner=learner_key(learner_id), event=event)
+        with self._lock:
+            for name, values in self._pending.items():
+                values.append(row[name])
+            due = len(self._pending['ts']) >= self.flush_every
+        if due:
+            self._wake.set()
+
+    def flush(self):
+        """Write buffered events, one file per day they fall on; returns the number written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {name: [] for name in SCHEMA.names}
+            if not pending['ts']:
+                return 0
+            try:
+                self.write_table(pa.table(pending, schema=SCHEMA))
+            except Exception:
+                # Keep the events, ahead of anything recorded meanwhile, for the next flush
+                with self._lock:
+                    for name, values in pending.items():
+                        self._pending[name][:0] = values
+                raise
+            self.flushes += 1
+            return len(pending['ts'])
+
+    def write_table(self, table, name=None):
+        """Write a table with ``SCHEMA`` into its day partitions (also used by imports and benchmarks)
+
+        With a ``name``, each day's file is ``<name>.arrow`` and writing the
+        same table again replaces it rather than adding a copy.
+        """
+        days = (table.column('ts').to_numpy() // 86400).astype(np.int64)
+        unique_days = np.unique(days)
+        for day in unique_days:
+            part = table if len(unique_days) == 1 else table.filter(pa.array(days == day))
+            self._write_file(os.path.join(self.directory, f"day={_day(day * 86400)}"), part,
+                             name=f"{name}.arrow" if name else None)
+
+    @staticmethod
+    def _write_file(partition, table, name=None, metadata=None):
+        os.makedirs(partition, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=partition, prefix='.part-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                schema = SCHEMA.with_metadata(metadata) if metadata else SCHEMA
+                with pa.ipc.new_file(f, schema) as writer:
+                    writer.write_table(table.replace_schema_metadata(schema.metadata))
+            os.replace(tmp_path, os.path.join(partition, name or f"part-{os.getpid()}-{time.time_ns()}.arrow"))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def partitions(self, since=None, until=None):
+        """``{day: [file paths]}`` for days in [since, until] ('YYYY-MM-DD' strings, inclusive)"""
+        found = {}
+        for entry in sorted(os.listdir(self.directory)):
+            if not entry.startswith('day='):
+                continue
+            day = entry[len('day='):]
+            if (since and day < since) or (until and day > until):
+                continue
+            directory = os.path.join(self.directory, entry)
+            files = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.arrow'))
+            if files:
+                found[day] = files
+        return found
+
+    def tables(self, columns=None, since=None, until=None):
+        """Memory-mapped tables, one per file, in day order (only ``columns``, if given)"""
+        for day, files in self.partitions(since, until).items():
+            try:
+                tables = self._read_day(files, columns)
+            except FileNotFoundError:
+                # A compaction merged and removed parts since the listing; a fresh one has its file
+                tables = self._read_day(self.partitions(day, day).get(day, []), columns)
+            yield from tables
+
+    def read(self, columns=None, since=None, until=None):
+        """Events as one memory-mapped Arrow table (only ``columns``, if given)"""
+        tables = list(self.tables(columns, since, until))
+        if not tables:
+            return SCHEMA.empty_table().select(columns) if columns else SCHEMA.empty_table()
+        return pa.concat_tables(tables)
+
+    @staticmethod
+    def _read_day(files, columns=None):
+        """Tables for one day's files, skipping parts already merged into a compacted file
+
+        Raises FileNotFoundError if a listed file was removed, rather than leaving its events out.
+        """
+        tables = {}
+        covered = set()
+        # Compacted files first: a compaction that finished after listing must not be counted twice
+        for path in sorted(files, key=lambda path: not os.path.basename(path).startswith('compacted-')):
+            if os.path.basename(path) in covered:
+                continue
+            # Buffers keep the mapping alive, so the table stays valid after this returns
+            table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+            covered.update((table.schema.metadata or {}).get(b'covers', b'').decode('utf-8').split())
+            tables[path] = table.select(columns) if columns else table
+        return [table for path, table in tables.items() if os.path.basename(path) not in covered]
+
+    def compact(self, before=None):
+        """Merge each day before ``before`` (default: today, UTC) into one file; returns files removed
+
+        Returns None without doing anything while another process is compacting.
+        """
+        before = before or _day(time.time())
+        with open(os.path.join(self.directory, '.compact.lock'), 'w') as lock:
+            if not _try_lock(lock):
+                return None
+            removed = 0
+            for day, files in self.partitions(until=before).items():
+                if day >= before or len(files) < 2:
+                    continue
+                table = pa.concat_tables(self._read_day(files)).unify_dictionaries().combine_chunks()
+                covers = ' '.join(os.path.basename(path) for path in files)
+                self._write_file(os.path.dirname(files[0]), table, name=f"compacted-{time.time_ns()}.arrow",
+                                 metadata={'covers': covers})
+                for path in files:
+                    os.unlink(path)
+                removed += len(files) - 1
+            return removed
+
+    def _flush_periodically(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._flush_quietly()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            # Events stay pending and the flush thread keeps running; the next flush retries them
+            logger.exception("Event log flush failed; %d events kept for the next flush", self.pending)
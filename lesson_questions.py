@@ -0,0 +1,254 @@
+"""Multiple-choice questions generated locally from lesson Markdown.
+
+Each lesson is parsed once into facts: ``**Term**: definition`` bullets,
+plain list items, numbered steps and sentences with a bold key phrase.
+Questions are built from a few templates per difficulty, with distractors
+drawn from sibling facts (same section first, then the same lesson, then
+other lessons). Building one is a handful of list samples, so thousands per
+second come from CPU alone with no network. Output is deterministic for a
+given seed and has the same shape as Groq questions.
+"""
+import random
+import re
+from collections import namedtuple
+
+_HEADING_RE = re.compile(r'^#{2,6}\s+(.+?)\s*$')
+_BULLET_RE = re.compile(r'^[-*]\s+(.+)$')
+_STEP_RE = re.compile(r'^(\d+)\.\s+(.+)$')
+_TERM_RE = re.compile(r'^\*\*(.+?)\*\*\s*:\s*(.+)$')
+_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+# Numbered lists under these headings are ordered procedures; others are just enumerations
+_SEQUENCE_HEADING_RE = re.compile(r'\b(how|steps?|getting started|process|workflow)\b', re.IGNORECASE)
+
+# kind: 'term' (bold term + definition), 'item' (plain list entry), 'step' (ordered procedure)
+# or 'sentence' (prose with a bold key phrase); order is the step number for steps
+Fact = namedtuple('Fact', 'kind lesson section term text order')
+
+# Templates used per quiz difficulty
+DIFFICULTY_TEMPLATES = {
+    "beginner": ('define', 'name', 'listed'),
+    "intermediate": ('define', 'name', 'cloze', 'listed', 'step_number'),
+    "advanced": ('name', 'cloze', 'not_listed', 'step_number', 'step_after')
+}
+
+
+def _plain(text):
+    return _BOLD_RE.sub(r'\1', text).strip()
+
+
+def extract_facts(lesson, content):
+    """Facts from one lesson's Markdown; code blocks are skipped"""
+    facts = []
+    section = lesson
+    in_code = False
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith('```'):
+            in_code = not in_code
+            continue
+        if in_code or not line:
+            continue
+        heading = _HEADING_RE.match(line)
+        if heading:
+            section = heading.group(1).rstrip(':').strip()
+            continue
+        step = _STEP_RE.match(line)
+        bullet = _BULLET_RE.match(line)
+        if step or bullet:
+            body = step.group(2) if step else bullet.group(1)
+            term = _TERM_RE.match(body)
+            if step and _SEQUENCE_HEADING_RE.search(section):
+                kind, order = 'step', int(step.group(1))
+            else:
+                kind, order = ('term' if term else 'item'), 0
+            if term:
+                facts.append(Fact(kind, lesson, section, _plain(term.group(1)), _plain(term.group(2)), order))
+            else:
+                facts.append(Fact(kind, lesson, section, None, _plain(body), order))
+            continue
+        bold = _BOLD_RE.search(line)
+        if bold:
+            facts.append(Fact('sentence', lesson, section, bold.group(1).strip(), line, 0))
+    return facts
+
+
+def _label(fact):
+    """How a fact is named in options: its term, else its text"""
+    return fact.term or fact.text
+
+
+class LessonQuestionGenerator:
+    """Deterministic question generator over ``{lesson_id: {'title', 'content'}}``
+
+    ``topics`` maps each quiz topic to the lesson IDs its questions come from.
+    """
+
+    def __init__(self, lessons, topics):
+        self.facts = [fact for lesson in lessons.values() for fact in extract_facts(lesson['title'], lesson['content'])]
+        self._by_section = {}
+        self._by_lesson = {}
+        for fact in self.facts:
+            self._by_section.setdefault((fact.lesson, fact.section), []).append(fact)
+            self._by_lesson.setdefault(fact.lesson, []).append(fact)
+        self._templates = {
+            'define': self._define, 'name': self._name, 'cloze': self._cloze, 'listed': self._listed,
+            'not_listed': self._not_listed, 'step_number': self._step_number, 'step_after': self._step_after
+        }
+        # (template, fact) pairs that can be built, per topic and difficulty
+        self._candidates = {}
+        probe = random.Random(0)
+        for topic, lesson_ids in topics.items():
+            titles = {lessons[lesson_id]['title'] for lesson_id in lesson_ids}
+            topic_facts = [fact for fact in self.facts if fact.lesson in titles]
+            for difficulty, names in DIFFICULTY_TEMPLATES.items():
+                self._candidates[(topic, difficulty)] = [
+                    (name, fact) for name in names for fact in topic_facts
+                    if self._templates[name](probe, fact) is not None
+                ]
+
+    def candidates(self, topic, difficulty):
+        """How many distinct (template, fact) questions a topic and difficulty can produce"""
+        return len(self._candidates.get((topic, difficulty), ()))
+
+    def generate(self, topic, difficulty, count=4, seed=0):
+        """Up to ``count`` questions, each about a different fact; the same seed gives the same questions"""
+        candidates = self._candidates.get((topic, difficulty), ())
+        rng = random.Random(seed)
+        questions = []
+        used = set()
+        for name, fact in rng.sample(candidates, len(candidates)):
+            if fact in used:
+                continue
+            question = self._templates[name](rng, fact)
+            if question is not None:
+                used.add(fact)
+                questions.append(question)
+                if len(questions) == count:
+                    break
+        return questions
+
+    # Distractor pools, nearest siblings first
+
+    def _tiers(self, fact, include_own_section=True):
+        tiers = []
+        if include_own_section:
+            tiers.append(self._by_section[(fact.lesson, fact.section)])
+        tiers.append([f for f in self._by_lesson[fact.lesson] if f.section != fact.section])
+        tiers.append([f for f in self.facts if f.lesson != fact.lesson])
+        return tiers
+
+    @staticmethod
+    def _pick(rng, tiers, value, exclude, k=3):
+        """``k`` distinct values from the tiers in order, none equal to anything in ``exclude``"""
+        seen = {v.lower() for v in exclude}
+        picked = []
+        for tier in tiers:
+            for fact in rng.sample(tier, len(tier)):
+                candidate = value(fact)
+                if candidate and candidate.lower() not in seen:
+                    seen.add(candidate.lower())
+                    picked.append(candidate)
+                    if len(picked) == k:
+                        return picked
+        return None
+
+    @staticmethod
+    def _question(rng, text, answer, distractors, explanation):
+        options = distractors + [answer]
+        rng.shuffle(options)
+        return {
+            'question': text,
+            'options': [f"{label}) {option}" for label, option in zip('ABCD', options)],
+            'correct': options.index(answer),
+            'explanation': explanation
+        }
+
+    # Templates: each returns a question dict, or None if the fact does not support it
+
+    def _define(self, rng, fact):
+        if fact.kind not in ('term', 'step') or not fact.term:
+            return None
+        distractors = self._pick(rng, self._tiers(fact), lambda f: f.text if f.term else None, [fact.text])
+        if distractors is None:
+            return None
+        return self._question(rng, f'In "{fact.section}", what does {fact.term} refer to?', fact.text, distractors,
+                              f"{fact.term}: {fact.text} ({fact.lesson})")
+
+    def _name(self, rng, fact):
+        if fact.kind not in ('term', 'step') or not fact.term:
+            return None
+        distractors = self._pick(rng, self._tiers(fact), lambda f: f.term, [fact.term])
+        if distractors is None:
+            return None
+        return self._question(rng, f'Which term from "{fact.section}" means: {fact.text}?', fact.term, distractors,
+                              f"{fact.term}: {fact.text} ({fact.lesson})")
+
+    def _cloze(self, rng, fact):
+        if fact.kind != 'sentence':
+            return None
+        distractors = self._pick(rng, self._tiers(fact), lambda f: f.term, [fact.term])
+        if distractors is None:
+            return None
+        blanked = _plain(fact.text.replace(f"**{fact.term}**", "____", 1))
+        return self._question(rng, f"Fill in the blank: {blanked}", fact.term, distractors,
+                              f"{_plain(fact.text)} ({fact.lesson})")
+
+    def _listed(self, rng, fact):
+        if fact.kind == 'sentence':
+            return None
+        section = self._by_section[(fact.lesson, fact.section)]
+        own = [_label(f) for f in section]
+        distractors = self._pick(rng, self._tiers(fact, include_own_section=False),
+                                 lambda f: _label(f) if f.kind != 'sentence' else None, own)
+        if distractors is None:
+            return None
+        return self._question(rng, f'Which of these is listed under "{fact.section}" in the {fact.lesson} lesson?',
+                              _label(fact), distractors, f'"{fact.section}" covers: {", ".join(own)}.')
+
+    def _not_listed(self, rng, fact):
+        # ``fact`` is the outsider; the three listed options come from a section of the same lesson
+        if fact.kind == 'sentence':
+            return None
+        sections = [facts for (lesson, section), facts in self._by_section.items()
+                    if lesson == fact.lesson and section != fact.section
+                    and sum(f.kind != 'sentence' for f in facts) >= 3]
+        if not sections:
+            return None
+        section = rng.choice(sections)
+        own = [_label(f) for f in section if f.kind != 'sentence']
+        if _label(fact).lower() in {label.lower() for label in own}:
+            return None
+        listed = rng.sample(own, 3)
+        return self._question(rng, f'Which of these is NOT listed under "{section[0].section}" in the '
+                              f'{fact.lesson} lesson?', _label(fact), listed,
+                              f'"{section[0].section}" covers: {", ".join(own)}; {_label(fact)} is from '
+                              f'"{fact.section}".')
+
+    def _steps(self, fact):
+        return [f for f in self._by_section[(fact.lesson, fact.section)] if f.kind == 'step']
+
+    def _step_explanation(self, fact, steps):
+        return f'The steps of "{fact.section}" are: ' + ", ".join(f"{f.order}. {_label(f)}" for f in steps) + "."
+
+    def _step_number(self, rng, fact):
+        if fact.kind != 'step':
+            return None
+        steps = self._steps(fact)
+        distractors = self._pick(rng, [steps], _label, [_label(fact)])
+        if distractors is None:
+            return None
+        return self._question(rng, f'What is step {fact.order} of "{fact.section}" in the {fact.lesson} lesson?',
+                              _label(fact), distractors, self._step_explanation(fact, steps))
+
+    def _step_after(self, rng, fact):
+        if fact.kind != 'step':
+            return None
+        steps = self._steps(fact)
+        previous = [f for f in steps if f.order == fact.order - 1]
+        if not previous:
+            return None
+        distractors = self._pick(rng, [steps], _label, [_label(fact), _label(previous[0])])
+        if distractors is None:
+            return None
+        return self._question(rng, f'In "{fact.section}", which step comes right after {_label(previous[0])}?',
+                              _label(fact), distractors, self._step_explanation(fact, steps))
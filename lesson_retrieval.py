@@ -0,0 +1,141 @@
+"""BM25 retrieval of lesson chunks for grounding quiz prompts.
+
+Lesson Markdown is split into one chunk per section and indexed once. For a
+quiz request the best-scoring chunks for the topic (and words that suit the
+difficulty) are packed, in rank order, into a fixed token budget. The
+packed context is cached per (topic, difficulty), since lessons do not
+change while the app runs.
+"""
+import math
+import re
+import threading
+from collections import Counter
+
+from near_duplicates import STOPWORDS
+
+_HEADING_RE = re.compile(r'^#{1,6}\s+(.+?)\s*$')
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Extra query words per difficulty: basics for beginners, mechanics and architecture later on
+DIFFICULTY_QUERY_TERMS = {
+    "beginner": "what is overview",
+    "intermediate": "how works use cases protocols",
+    "advanced": "architecture integration consensus security"
+}
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    """Rough LLM token count (about 4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def chunk_lesson(title, content):
+    """(heading, text) per section; bold markers and unlabelled code fences such as diagrams are dropped"""
+    chunks = []
+    heading, lines = title, []
+    in_code = keep_code = False
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith('```'):
+            if not in_code:
+                # Labelled fences (e.g. ```solidity) are code worth quoting; bare ones hold ASCII art
+                keep_code = line != '```'
+            in_code = not in_code
+            if keep_code:
+                lines.append(line)
+            continue
+        if in_code and not keep_code:
+            continue
+        heading_match = None if in_code else _HEADING_RE.match(line)
+        if heading_match:
+            if lines:
+                chunks.append((heading, '\n'.join(lines)))
+            heading, lines = heading_match.group(1).rstrip(':'), []
+        elif line:
+            lines.append(line.replace('**', ''))
+    if lines:
+        chunks.append((heading, '\n'.join(lines)))
+    return [(heading, f"[{title} / {heading}]\n{text}") for heading, text in chunks]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self._frequencies = [Counter(tokenize(document)) for document in documents]
+        lengths = [sum(frequencies.values()) for frequencies in self._frequencies]
+        self._lengths = lengths
+        self._average_length = sum(lengths) / len(lengths) if lengths else 0.0
+        document_frequency = Counter(term for frequencies in self._frequencies for term in frequencies)
+        count = len(documents)
+        self._idf = {term: math.log(1 + (count - n + 0.5) / (n + 0.5)) for term, n in document_frequency.items()}
+
+    def scores(self, query):
+        terms = [term for term in set(tokenize(query)) if term in self._idf]
+        k1, b, average = self.k1, self.b, self._average_length or 1.0
+        scores = []
+        for frequencies, length in zip(self._frequencies, self._lengths):
+            score = 0.0
+            for term in terms:
+                tf = frequencies.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average))
+            scores.append(score)
+        return scores
+
+    def search(self, query, limit=None):
+        """(index, score) of matching documents, best first"""
+        ranked = sorted(((score, -i) for i, score in enumerate(self.scores(query)) if score > 0), reverse=True)
+        return [(-negative_index, score) for score, negative_index in ranked[:limit]]
+
+
+def pack_context(chunks, budget_tokens):
+    """Chunks in the given order that fit the token budget together; ones that would overflow are skipped"""
+    packed = []
+    used = 0
+    for chunk in chunks:
+        cost = estimate_tokens(chunk) + 1
+        if used + cost <= budget_tokens:
+            packed.append(chunk)
+            used += cost
+    return '\n\n'.join(packed)
+
+
+class LessonRetriever:
+    """Token-budgeted lesson context per quiz topic and difficulty
+
+    ``topics`` maps each quiz topic to its lesson IDs; their titles and
+    descriptions join the topic name in the query.
+    """
+
+    def __init__(self, lessons, topics, budget_tokens=300):
+        self.budget_tokens = budget_tokens
+        self.chunks = [text for lesson in lessons.values() for _, text in chunk_lesson(lesson['title'], lesson['content'])]
+        self.index = BM25Index(self.chunks)
+        self._queries = {
+            topic: ' '.join([topic] + [f"{lessons[i]['title']} {lessons[i].get('description', '')}" for i in lesson_ids])
+            for topic, lesson_ids in topics.items()
+        }
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def context(self, topic, difficulty):
+        """Packed lesson excerpts for a quiz prompt ('' if nothing matches)"""
+        key = (topic, difficulty)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        query = f"{self._queries.get(topic, topic)} {DIFFICULTY_QUERY_TERMS.get(difficulty, '')}"
+        ranked = [self.chunks[i] for i, _ in self.index.search(query)]
+        context = pack_context(ranked, self.budget_tokens)
+        with self._lock:
+            self._cache[key] = context
+        return context
@@ -0,0 +1,271 @@
+"""Latency-aware policy layer for LLM quiz generation.
+
+Wraps every Groq call with a per-call deadline, an optional hedged
+second request and a circuit breaker that trips on error rate or p95
+latency, so the app can fall back to banked questions instantly instead
+of blocking the script thread on a degraded API. A model router picks the
+Groq model per request and spills over when one model gets slow.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class CircuitOpenError(Exception):
+    """Raised when the breaker is open and the call was not attempted"""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when no attempt finished within the per-call deadline"""
+
+
+class RollingWindow:
+    """Fixed-size window of recent call outcomes and latencies.
+
+    With ``max_age`` set, samples older than that many seconds are ignored,
+    so a window that stops receiving traffic drifts back to empty.
+    """
+
+    def __init__(self, size=20, max_age=None, clock=time.monotonic):
+        self.samples = deque(maxlen=size)
+        self.max_age = max_age
+        self.clock = clock
+
+    def record(self, ok, latency):
+        self.samples.append((ok, latency, self.clock()))
+
+    def _live(self):
+        if self.max_age is None:
+            return list(self.samples)
+        cutoff = self.clock() - self.max_age
+        while self.samples and self.samples[0][2] < cutoff:
+            self.samples.popleft()
+        return list(self.samples)
+
+    def __len__(self):
+        return len(self._live())
+
+    def error_rate(self):
+        samples = self._live()
+        if not samples:
+            return 0.0
+        return sum(1 for ok, _, _ in samples if not ok) / len(samples)
+
+    def percentile(self, pct):
+        samples = self._live()
+        if not samples:
+            return 0.0
+        latencies = sorted(latency for _, latency, _ in samples)
+        index = min(len(latencies) - 1, int(round(pct / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def p50(self):
+        return self.percentile(50)
+
+    def p95(self):
+        return self.percentile(95)
+
+    def clear(self):
+        self.samples.clear()
+
+
+class CircuitBreaker:
+    """Closed → open on bad error rate or p95, half-open probe after cooldown"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window_size=20, min_calls=5, error_rate_threshold=0.5,
+                 p95_latency_threshold=8.0, cooldown=30.0, clock=time.monotonic):
+        self.window = RollingWindow(window_size)
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.p95_latency_threshold = p95_latency_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Return True if a call may go out now (claims the probe slot when half-open)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self, latency):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                # A slow probe is not a recovery
+                if latency <= self.p95_latency_threshold:
+                    self.window.clear()
+                    self.state = self.CLOSED
+                else:
+                    self._trip()
+                self.probe_in_flight = False
+                return
+            self.window.record(True, latency)
+            self._evaluate()
+
+    def record_failure(self, latency):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trip()
+                self.probe_in_flight = False
+                return
+            self.window.record(False, latency)
+            self._evaluate()
+
+    def _evaluate(self):
+        if self.state != self.CLOSED or len(self.window) < self.min_calls:
+            return
+        if (self.window.error_rate() >= self.error_rate_threshold
+                or self.window.p95() >= self.p95_latency_threshold):
+            self._trip()
+
+    def _trip(self):
+        self.state = self.OPEN
+        self.opened_at = self.clock()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'calls': len(self.window),
+                'error_rate': self.window.error_rate(),
+                'p95_latency': self.window.p95(),
+            }
+
+
+class GenerationPolicy:
+    """Runs a generation callable under a deadline, hedging and a circuit breaker.
+
+    ``fn`` receives the remaining time budget in seconds and should pass it
+    on as the HTTP timeout so abandoned attempts do not linger in the pool.
+    """
+
+    def __init__(self, breaker=None, deadline=10.0, hedge_after=None, max_workers=8):
+        self.breaker = breaker or CircuitBreaker()
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='quiz-gen')
+
+    def call(self, fn, deadline=None):
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("Quiz generation circuit is open")
+
+        deadline = self.deadline if deadline is None else deadline
+        started = time.monotonic()
+        pending = {self.executor.submit(fn, deadline)}
+        hedged = False
+        last_error = None
+
+        while pending:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            wait_for = remaining
+            if self.hedge_after is not None and not hedged:
+                wait_for = min(remaining, max(0.0, self.hedge_after - (time.monotonic() - started)))
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                self.breaker.record_success(time.monotonic() - started)
+                return result
+
+            # Hedge once: either the first attempt is slow or it already failed
+            if self.hedge_after is not None and not hedged:
+                elapsed = time.monotonic() - started
+                if elapsed >= self.hedge_after or not pending:
+                    hedged = True
+                    pending.add(self.executor.submit(fn, max(0.0, deadline - elapsed)))
+
+        latency = time.monotonic() - started
+        self.breaker.record_failure(latency)
+        if pending or last_error is None:
+            raise DeadlineExceeded(f"Quiz generation exceeded {deadline:.1f}s deadline")
+        raise last_error
+
+
+class ModelRouter:
+    """Chooses a Groq model per request from difficulty, budget and live stats.
+
+    ``models`` maps model name to its static profile (``expected_latency``
+    prior in seconds, ``cost_per_1k_tokens``); ``preferences`` maps each
+    difficulty to the models allowed for it, cheapest/fastest first.
+    A model is skipped while its recent error rate is high or its p95
+    latency would blow the request budget; stats expire after ``stats_ttl``
+    seconds so a skipped model is retried once things calm down.
+    """
+
+    def __init__(self, models, preferences, window_size=20, min_samples=3,
+                 max_error_rate=0.5, stats_ttl=120.0, clock=time.monotonic):
+        self.models = models
+        self.preferences = preferences
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.stats = {
+            name: RollingWindow(window_size, max_age=stats_ttl, clock=clock)
+            for name in models
+        }
+        self._lock = threading.Lock()
+
+    def candidates(self, difficulty):
+        return self.preferences.get(difficulty) or self.preferences['intermediate']
+
+    def expected_latency(self, model):
+        window = self.stats[model]
+        if len(window) < self.min_samples:
+            return self.models[model]['expected_latency']
+        return window.p95()
+
+    def healthy(self, model):
+        window = self.stats[model]
+        return len(window) < self.min_samples or window.error_rate() < self.max_error_rate
+
+    def choose(self, difficulty, budget, exclude=()):
+        """Pick the first preferred model that is healthy and fits the budget.
+
+        Falls back to the fastest healthy candidate, then to the fastest
+        candidate at all, so a request is never left without a model.
+        """
+        with self._lock:
+            options = [m for m in self.candidates(difficulty) if m not in exclude]
+            if not options:
+                options = list(self.candidates(difficulty))
+            healthy = [m for m in options if self.healthy(m)]
+            for model in healthy:
+                if self.expected_latency(model) <= budget:
+                    return model
+            return min(healthy or options, key=self.expected_latency)
+
+    def record(self, model, ok, latency):
+        with self._lock:
+            self.stats[model].record(ok, latency)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                model: {
+                    'calls': len(window),
+                    'error_rate': window.error_rate(),
+                    'p50_latency': window.p50(),
+                    'p95_latency': window.p95(),
+                }
+                for model, window in self.stats.items()
+            }
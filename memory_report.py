@@ -0,0 +1,309 @@
+"""Where this worker's memory goes: per-session state, caches and allocation sites.
+
+Three views, all computed on demand from the admin page:
+
+* ``SessionFootprints`` sizes every live session. Each session keeps a
+  small handle in its own state, and the registry holds it weakly, so a
+  closed session drops out without any cleanup hook.
+* ``deep_sizeof`` sizes a process-wide cache by walking what it references.
+  Objects already counted (or shared, and passed as ``exclude``) are
+  skipped, so sizes add up rather than overlap.
+* ``MemoryTracer`` wraps ``tracemalloc``: snapshots are grouped by
+  subsystem (the innermost frame of each allocation that matches a file or
+  function rule) and diffed against the previous snapshot to find growth
+  across reruns. Tracing makes every allocation slower, more so the more
+  frames it records, and costs memory of its own, so it only runs while
+  an admin has it on.
+"""
+import inspect
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+import weakref
+from array import array
+from collections import defaultdict, deque
+
+# Never walked into: code, modules and synchronization primitives are shared by the whole process
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+           types.CodeType, weakref.ref, type(threading.Lock()), type(threading.RLock()), threading.Thread,
+           threading.Event)
+
+_LEAVES = (str, bytes, bytearray, int, float, complex, bool, type(None), array, range)
+
+def _references(obj):
+    """Objects directly held by ``obj``; empty for leaves"""
+    if isinstance(obj, dict):
+        # Another session's thread may be mutating it; a copy is enough for sizing
+        return [*obj.keys(), *obj.values()]
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return list(obj)
+    held = []
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        for name in (slots,) if isinstance(slots, str) else slots:
+            if name not in ('__dict__', '__weakref__'):
+                held.append(getattr(obj, name, None))
+    instance_dict = getattr(obj, '__dict__', None)
+    if isinstance(instance_dict, dict):
+        held.append(instance_dict)
+    return held
+
+
+def deep_sizeof(root, exclude=(), seen=None):
+    """Approximate bytes reachable from ``root``, counting each object once
+
+    Nothing reachable only through ``exclude`` is counted. Pass the same
+    ``seen`` set to several calls to split shared objects between them
+    instead of counting them in each. DataFrames and Series report
+    ``memory_usage(deep=True)``.
+    """
+    seen = set() if seen is None else seen
+    seen.update(id(obj) for obj in exclude)
+    total = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _OPAQUE):
+            continue
+        seen.add(id(obj))
+        memory_usage = getattr(type(obj), 'memory_usage', None)
+        if memory_usage is not None and type(obj).__module__.startswith('pandas.'):
+            usage = obj.memory_usage(deep=True)
+            total += int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+            continue
+        total += sys.getsizeof(obj, 0)
+        if isinstance(obj, _LEAVES):
+            continue
+        try:
+            stack.extend(_references(obj))
+        except RuntimeError:
+            pass  # Changed size while copying; its own size is already counted
+    return total
+
+
+def process_rss():
+    """``(current, peak)`` resident set size of this process in bytes (current is None off Linux)"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak *= 1 if sys.platform == 'darwin' else 1024
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        current = None
+    return current, peak
+
+
+class SessionHandle:
+    """Kept in one session's state; ``objects`` is refreshed with that state every rerun"""
+
+    __slots__ = ('objects', 'updated', '__weakref__')
+
+    def __init__(self, objects=None):
+        self.objects = objects or {}
+        self.updated = time.time()
+
+
+class SessionFootprints:
+    """Weak registry of live sessions' state, sized on demand"""
+
+    def __init__(self):
+        self._handles = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def attach(self):
+        """A new handle to store in a session's state; the session is tracked while it holds it"""
+        handle = SessionHandle()
+        with self._lock:
+            self._handles.add(handle)
+        return handle
+
+    def __len__(self):
+        with self._lock:
+            return len(self._handles)
+
+    def report(self, exclude=()):
+        """Live sessions with their average and largest size, overall and per state key
+
+        ``exclude`` are process-wide objects sessions point at (stores,
+        caches), which would otherwise be counted once per session.
+        """
+        with self._lock:
+            handles = list(self._handles)
+        excluded = {id(obj) for obj in exclude}
+        totals = []
+        by_key = defaultdict(list)
+        for handle in handles:
+            seen = set(excluded)
+            objects = dict(handle.objects)
+            sizes = {key: deep_sizeof(value, seen=seen) for key, value in objects.items()}
+            totals.append(sum(sizes.values()))
+            for key, size in sizes.items():
+                by_key[key].append(size)
+        rows = [{'Key': key, 'Sessions': len(sizes), 'Average KiB': round(sum(sizes) / len(sizes) / 1024, 1),
+                 'Max KiB': round(max(sizes) / 1024, 1)} for key, sizes in by_key.items()]
+        rows.sort(key=lambda row: row['Average KiB'], reverse=True)
+        return {
+            'sessions': len(totals),
+            'total': sum(totals),
+            'average': sum(totals) / len(totals) if totals else 0,
+            'max': max(totals, default=0),
+            'by_key': rows,
+        }
+
+
+def cache_footprints(caches):
+    """``{name: object}`` to rows of sizes, in order; an object shared with an earlier cache counts there"""
+    seen = set()
+    rows = []
+    for name, obj in caches.items():
+        if obj is None:
+            continue
+        entries = len(obj) if hasattr(type(obj), '__len__') else None
+        rows.append({'Cache': name, 'Entries': entries, 'KiB': round(deep_sizeof(obj, seen=seen) / 1024, 1)})
+    return rows
+
+
+class SubsystemClassifier:
+    """Names the subsystem an allocation belongs to from its traceback
+
+    ``subsystems`` maps a name to rules: path fragments (``'/groq/'``,
+    ``'/session_models.py'``) or functions, matched by the lines of their body.
+    The innermost matching frame wins, so a pandas allocation made while
+    rendering the leaderboard belongs to the leaderboard.
+    """
+
+    def __init__(self, subsystems, default='Other'):
+        self.default = default
+        self._fragments = []
+        self._functions = defaultdict(list)
+        for name, rules in subsystems.items():
+            for rule in rules:
+                if isinstance(rule, str):
+                    self._fragments.append((rule, name))
+                else:
+                    function = inspect.unwrap(rule)
+                    lines, first = inspect.getsourcelines(function)
+                    # Body only: the decorator and def lines run (and allocate the function) at import
+                    body = first + 1 + next(i for i, line in enumerate(lines)
+                                            if line.lstrip().startswith(('def ', 'async def ')))
+                    self._functions[function.__code__.co_filename].append((body, first + len(lines) - 1, name))
+        self._frames = {}
+
+    def _frame(self, filename, lineno):
+        key = (filename, lineno)
+        if key not in self._frames:
+            match = next((name for first, last, name in self._functions.get(filename, ())
+                          if first <= lineno <= last), None)
+            if match is None:
+                match = next((name for fragment, name in self._fragments if fragment in filename), None)
+            self._frames[key] = match
+        return self._frames[key]
+
+    def classify(self, traceback):
+        # Tracebacks are ordered oldest frame first
+        for frame in reversed(traceback):
+            match = self._frame(frame.filename, frame.lineno)
+            if match is not None:
+                return match
+        return self.default
+
+
+def _site(frame):
+    return f"{os.path.basename(frame.filename)}:{frame.lineno}"
+
+
+class MemoryTracer:
+    """tracemalloc snapshots grouped by subsystem, each diffed against the one before"""
+
+    def __init__(self, subsystems, frames=8, top=15):
+        self.classifier = SubsystemClassifier(subsystems)
+        self.frames = frames
+        self.top = top
+        self.started = None
+        self.report = None
+        self._previous = None
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=None):
+        """Trace allocations with ``frames`` frames each (default: the tracer's); deeper attributes more, slower"""
+        if tracemalloc.is_tracing():
+            # Already started, e.g. with PYTHONTRACEMALLOC
+            self.frames = tracemalloc.get_traceback_limit()
+            return
+        self.frames = frames or self.frames
+        tracemalloc.start(self.frames)
+        self.started = time.time()
+
+    def stop(self):
+        """Stop tracing and drop snapshots (their traces are meaningless once tracing restarts)"""
+        with self._lock:
+            tracemalloc.stop()
+            self.started = None
+            self.report = None
+            self._previous = None
+
+    def traced_memory(self):
+        """``(current, peak, overhead)`` bytes: traced allocations and tracemalloc's own usage"""
+        current, peak = tracemalloc.get_traced_memory()
+        return current, peak, tracemalloc.get_tracemalloc_memory()
+
+    def _by_subsystem(self, statistics, diff=False):
+        sizes = defaultdict(lambda: [0, 0])
+        for stat in statistics:
+            group = sizes[self.classifier.classify(stat.traceback)]
+            group[0] += stat.size_diff if diff else stat.size
+            group[1] += stat.count_diff if diff else stat.count
+        size, count = ('Δ KiB', 'Δ Blocks') if diff else ('KiB', 'Blocks')
+        rows = [{'Subsystem': name, size: round(total / 1024, 1), count: blocks}
+                for name, (total, blocks) in sizes.items()]
+        rows.sort(key=lambda row: row[size], reverse=True)
+        return rows
+
+    def _sites(self, statistics, diff=False):
+        rows = []
+        for stat in statistics[:self.top]:
+            row = {'Site': _site(stat.traceback[-1]), 'Subsystem': self.classifier.classify(stat.traceback)}
+            if diff:
+                row.update({'Δ KiB': round(stat.size_diff / 1024, 1), 'Δ Blocks': stat.count_diff,
+                            'KiB': round(stat.size / 1024, 1)})
+            else:
+                row.update({'KiB': round(stat.size / 1024, 1), 'Blocks': stat.count})
+            rows.append(row)
+        return rows
+
+    def take_snapshot(self, note=None):
+        """Snapshot live allocations and build the report (growth since the previous snapshot, if any)"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("Memory tracing is not running")
+            started = time.perf_counter()
+            snapshot = tracemalloc.take_snapshot()
+            # Sites group by the allocating line; subsystems need the whole traceback
+            report = {
+                'taken': time.time(),
+                'note': note,
+                'traced': tracemalloc.get_traced_memory()[0],
+                'subsystems': self._by_subsystem(snapshot.statistics('traceback')),
+                'sites': self._sites(snapshot.statistics('lineno')),
+                'growth': None,
+                'growth_sites': None,
+            }
+            previous = self._previous
+            if previous is not None:
+                report.update(
+                    since=previous.report['taken'],
+                    growth=self._by_subsystem(snapshot.compare_to(previous.snapshot, 'traceback'), diff=True),
+                    growth_sites=self._sites(snapshot.compare_to(previous.snapshot, 'lineno'), diff=True),
+                )
+            report['seconds'] = time.perf_counter() - started
+            self._previous = types.SimpleNamespace(snapshot=snapshot, report=report)
+            self.report = report
+            return report
@@ -0,0 +1,119 @@
+"""MinHash/LSH detection of paraphrased quiz questions.
+
+Exact content hashes miss an LLM rewording the same question, so each
+question is reduced to a set of word and word-pair shingles over its
+normalised stem and option texts, summarised as a MinHash signature and
+bucketed with banded LSH. Inserting or querying one question costs a few
+tens of microseconds and only compares signatures that share a band.
+"""
+import re
+import zlib
+
+import numpy as np
+
+from question_variants import strip_label
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    'a an and are as at be by can do does for from how in is it its of on or that the this to '
+    'what when which who why will with'.split()
+)
+
+
+def _normalise(token):
+    # Fold simple plurals so "record"/"records" and "cost"/"costs" match
+    return token[:-1] if len(token) > 4 and token.endswith('s') and not token.endswith('ss') else token
+
+
+def shingles(question):
+    """Content words and adjacent word pairs from the stem and options"""
+    options = ' '.join(strip_label(option) for option in question.get('options', ()))
+    tokens = [_normalise(token) for token in _TOKEN_RE.findall(f"{question['question']} {options}".lower())
+              if token not in STOPWORDS]
+    return set(tokens) | {f'{a} {b}' for a, b in zip(tokens, tokens[1:])}
+
+
+class NearDuplicateIndex:
+    """Clusters questions whose estimated Jaccard similarity reaches ``threshold``
+
+    ``bands * rows`` hash functions are used; with the defaults (24 x 3) a
+    pair at similarity 0.4 shares a band about 80% of the time, one at 0.5
+    about 96%, and an unrelated pair at 0.1 under 3%. Candidates are then
+    confirmed against the full signature. Reworded questions with the same
+    options typically score 0.4-0.6; unrelated ones stay below 0.1.
+    """
+
+    def __init__(self, threshold=0.4, bands=24, rows=3, seed=1):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=bands * rows, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=bands * rows, dtype=np.uint64)
+        self._buckets = {}
+        self._signatures = {}
+        self._clusters = {}
+
+    def signature(self, question):
+        tokens = shingles(question) or {''}
+        hashes = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens),
+                             dtype=np.uint64, count=len(tokens))
+        return ((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME).min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        # One int per band: the band number above the row hashes packed as bytes
+        rows = self.rows
+        return [(band << (32 * rows)) | int.from_bytes(signature[band * rows:(band + 1) * rows].tobytes(), 'little')
+                for band in range(self.bands)]
+
+    def similarity(self, first, second):
+        """Estimated Jaccard similarity of two indexed keys"""
+        return float(np.mean(self._signatures[first] == self._signatures[second]))
+
+    def match(self, question, signature=None):
+        """(key, similarity) of the closest indexed near-duplicate, or None"""
+        signature = self.signature(question) if signature is None else signature
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        best = None
+        for key in candidates:
+            score = float(np.mean(self._signatures[key] == signature))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+    def add(self, key, question):
+        """Index ``question`` under ``key``; returns the cluster it joined (``key`` if new)"""
+        if key in self._clusters:
+            return self._clusters[key]
+        signature = self.signature(question)
+        found = self.match(question, signature)
+        cluster = self._clusters[found[0]] if found else key
+        self._signatures[key] = signature
+        self._clusters[key] = cluster
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+        return cluster
+
+    def remove(self, key):
+        """Forget ``key``; questions clustered with it keep its cluster ID"""
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        del self._clusters[key]
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets[band_key]
+            bucket.remove(key)
+            if not bucket:
+                del self._buckets[band_key]
+
+    def cluster_of(self, key):
+        return self._clusters.get(key, key)
+
+    def __contains__(self, key):
+        return key in self._clusters
+
+    def __len__(self):
+        return len(self._clusters)
@@ -0,0 +1,227 @@
+"""Pre-generate a quiz question corpus for every topic and difficulty.
+
+Requests batches of questions from Groq for each (topic, difficulty) cell
+of the quiz selectbox, validates them, drops exact and near-duplicate (paraphrased) questions, and writes a compressed
+artifact the app memory-maps at startup (see ``question_artifact.py``)::
+
+    GROQ_API_KEY=... python pregenerate.py --per-cell 200 --concurrency 4 --rpm 30
+
+Requests run on a bounded worker pool paced to ``--rpm`` and back off on
+429s. Every accepted batch is appended to a checkpoint file, so an
+interrupted run resumes where it stopped; the artifact is rewritten from
+the checkpoint at the end. ``GROQ_BASE_URL`` (or ``--base-url``) points
+at any OpenAI-compatible endpoint, e.g. ``python -m benchmarks.fake_groq``.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from question_artifact import write_artifact
+from near_duplicates import NearDuplicateIndex
+from question_bank import question_id
+from quiz_generation import DEFAULT_MODEL, QUIZ_DIFFICULTIES, QUIZ_TOPICS, repair_question, request_quiz_questions
+
+logger = logging.getLogger('pregenerate')
+
+DEFAULT_OUTPUT = os.path.join('.crossfi_data', 'question_bank.xfqb')
+
+
+class RatePacer:
+    """Spaces request starts evenly across all workers; a 429 pauses everyone"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self.next_at)
+            self.next_at = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.next_at = max(self.next_at, time.monotonic() + seconds)
+
+
+def _stem_key(question):
+    """Normalised stem used to catch the same question with cosmetic differences"""
+    return re.sub(r'[^a-z0-9]+', ' ', question['question'].lower()).strip()
+
+
+class Corpus:
+    """Validated, deduped questions per cell, persisted to an append-only checkpoint"""
+
+    def __init__(self, checkpoint_path):
+        self.checkpoint_path = checkpoint_path
+        self.cells = {}
+        self._seen = set()
+        self._near_duplicates = NearDuplicateIndex()
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.duplicates = 0
+        self.paraphrases = 0
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn last line from an interrupted run
+                        continue
+                    self._accept(record['topic'], record['difficulty'], record['questions'])
+
+    def _accept(self, topic, difficulty, questions):
+        accepted = []
+        cell = self.cells.setdefault((topic, difficulty), [])
+        for question in questions:
+            question = repair_question(question)
+            if question is None:
+                self.rejected += 1
+                continue
+            keys = (question_id(question), _stem_key(question))
+            if keys[0] in self._seen or keys[1] in self._seen:
+                self.duplicates += 1
+                continue
+            if self._near_duplicates.add(keys[0], question) != keys[0]:
+                self._near_duplicates.remove(keys[0])
+                self.paraphrases += 1
+                continue
+            self._seen.update(keys)
+            cell.append(question)
+            accepted.append(question)
+        return accepted
+
+    def add(self, topic, difficulty, questions):
+        """Keep the new valid questions and checkpoint them; returns how many were kept"""
+        with self._lock:
+            accepted = self._accept(topic, difficulty, questions)
+            if accepted:
+                with open(self.checkpoint_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'topic': topic, 'difficulty': difficulty, 'questions': accepted},
+                                       ensure_ascii=False) + '\n')
+            return len(accepted)
+
+    def count(self, topic, difficulty):
+        with self._lock:
+            return len(self.cells.get((topic, difficulty), ()))
+
+
+def _retry_after(error):
+    """Seconds to wait if ``error`` is a rate-limit response, else None"""
+    if getattr(error, 'status_code', None) != 429:
+        return None
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after', 0)) or None
+    except (TypeError, ValueError):
+        return None
+
+
+def generate_batch(client, pacer, topic, difficulty, args):
+    """One paced request with rate-limit backoff; returns the raw questions"""
+    for attempt in range(args.retries + 1):
+        pacer.wait()
+        try:
+            return request_quiz_questions(client, topic, difficulty, args.timeout,
+                                          model=args.model, count=args.batch_size,
+                                          temperature=args.temperature)
+        except Exception as e:
+            if attempt == args.retries:
+                raise
+            delay = _retry_after(e) or min(60.0, 2.0 ** attempt)
+            if getattr(e, 'status_code', None) == 429:
+                pacer.pause(delay)
+            logger.warning("%s/%s attempt %d failed (%s); retrying in %.1fs", topic, difficulty, attempt + 1, e, delay)
+            time.sleep(delay)
+
+
+def run(client, corpus, cells, args):
+    """Request batches round by round until every cell reaches its target"""
+    pacer = RatePacer(args.rpm)
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for round_number in range(1, args.max_rounds + 1):
+            jobs = []
+            for topic, difficulty in cells:
+                missing = args.per_cell - corpus.count(topic, difficulty)
+                jobs.extend([(topic, difficulty)] * math.ceil(max(0, missing) / args.batch_size))
+            if not jobs:
+                return True
+            logger.info("Round %d: %d requests for %d cells", round_number, len(jobs), len({*jobs}))
+            futures = {pool.submit(generate_batch, client, pacer, topic, difficulty, args): (topic, difficulty)
+                       for topic, difficulty in jobs}
+            for future in as_completed(futures):
+                topic, difficulty = futures[future]
+                try:
+                    kept = corpus.add(topic, difficulty, future.result())
+                except Exception as e:
+                    logger.error("%s/%s batch failed: %s", topic, difficulty, e)
+                    continue
+                logger.info("%s/%s +%d (%d/%d)", topic, difficulty, kept,
+                            corpus.count(topic, difficulty), args.per_cell)
+    return all(corpus.count(*cell) >= args.per_cell for cell in cells)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--per-cell', type=int, default=200, help='Questions per topic/difficulty')
+    parser.add_argument('--batch-size', type=int, default=8, help='Questions asked for per request')
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight at once')
+    parser.add_argument('--rpm', type=float, default=30.0, help='Request starts per minute (0 = unpaced)')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds')
+    parser.add_argument('--max-rounds', type=int, default=5, help='Passes over cells still short of --per-cell')
+    parser.add_argument('--topics', nargs='+', default=QUIZ_TOPICS)
+    parser.add_argument('--difficulties', nargs='+', choices=QUIZ_DIFFICULTIES, default=QUIZ_DIFFICULTIES)
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--temperature', type=float, default=0.9, help='Higher than live quizzes for variety')
+    parser.add_argument('--api-key', default=os.environ.get('GROQ_API_KEY'))
+    parser.add_argument('--base-url', default=os.environ.get('GROQ_BASE_URL'))
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--checkpoint', help='Resumable progress file (default: <output>.checkpoint.jsonl)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    if not args.api_key:
+        parser.error('set GROQ_API_KEY or pass --api-key')
+
+    from groq import Groq
+    client = Groq(api_key=args.api_key, base_url=args.base_url or None, timeout=args.timeout, max_retries=0)
+
+    checkpoint = args.checkpoint or f'{args.output}.checkpoint.jsonl'
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint)), exist_ok=True)
+    corpus = Corpus(checkpoint)
+    cells = [(topic, difficulty) for topic in args.topics for difficulty in args.difficulties]
+    if any(corpus.cells.values()):
+        logger.info("Resuming from %s with %d questions", checkpoint, sum(map(len, corpus.cells.values())))
+
+    complete = run(client, corpus, cells, args)
+
+    version = write_artifact(
+        args.output,
+        {cell: questions for cell, questions in corpus.cells.items() if questions},
+        metadata={'model': args.model, 'per_cell': args.per_cell}
+    )
+    total = sum(map(len, corpus.cells.values()))
+    print(f"Wrote {total} questions in {sum(1 for q in corpus.cells.values() if q)} cells "
+          f"to {args.output} (version {version}); rejected {corpus.rejected}, duplicates {corpus.duplicates}, "
+          f"paraphrases {corpus.paraphrases}")
+    if not complete:
+        short = [f"{t}/{d} ({corpus.count(t, d)})" for t, d in cells if corpus.count(t, d) < args.per_cell]
+        print(f"Incomplete cells, rerun to resume: {', '.join(short)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
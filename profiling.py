@@ -0,0 +1,108 @@
+"""Opt-in per-rerun timing of app sections with on-demand cProfile capture.
+
+A ``RerunProfiler`` is created at the top of every script run. Sections
+are timed with ``profiler.section(name)``; when the run ends the breakdown
+is appended as one JSON line to a size-rotated log. Disabled profilers
+cost a single attribute check per section.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+_rerun_loggers = {}
+
+
+def get_rerun_log(path, max_bytes=1_000_000, backup_count=5):
+    """Process-wide rotating JSONL logger for rerun timings"""
+    logger = _rerun_loggers.get(path)
+    if logger is None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        logger = logging.getLogger(f'crossfi.rerun_profile.{path}')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        _rerun_loggers[path] = logger
+    return logger
+
+
+class RerunProfiler:
+    """Collects wall-clock section timings for one script run"""
+
+    def __init__(self, enabled=False, capture_cprofile=False, log_path=None, profile_dir=None):
+        self.enabled = enabled or capture_cprofile
+        self.capture_cprofile = capture_cprofile
+        self.log_path = log_path
+        self.profile_dir = profile_dir
+        self.sections = []
+        self.started = None
+        self.total = 0.0
+        self.cprofile_report = None
+        self.cprofile_path = None
+        self._profile = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.started = time.perf_counter()
+        if self.capture_cprofile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    @contextmanager
+    def section(self, name):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections.append((name, time.perf_counter() - started))
+
+    def finish(self):
+        """Stop timing, write the log line and build the cProfile report if one was requested"""
+        if not self.enabled or self.started is None:
+            return
+        self.total = time.perf_counter() - self.started
+        if self._profile is not None:
+            self._profile.disable()
+            self.cprofile_report = self._format_stats(self._profile)
+            if self.profile_dir:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                self.cprofile_path = os.path.join(self.profile_dir, f"rerun-{int(time.time() * 1000)}.prof")
+                self._profile.dump_stats(self.cprofile_path)
+            self._profile = None
+        if self.log_path:
+            get_rerun_log(self.log_path).info(json.dumps({
+                'ts': time.time(),
+                'total_ms': round(self.total * 1000, 3),
+                'sections': {name: round(elapsed * 1000, 3) for name, elapsed in self.sections}
+            }))
+
+    def breakdown(self):
+        """Rows of (section, ms, share of run) with untimed work reported as 'other'"""
+        total = self.total or sum(elapsed for _, elapsed in self.sections)
+        rows = [
+            {'Section': name, 'Time (ms)': round(elapsed * 1000, 2),
+             'Share': f"{elapsed / total * 100:.0f}%" if total else "-"}
+            for name, elapsed in self.sections
+        ]
+        other = total - sum(elapsed for _, elapsed in self.sections)
+        if self.total and other > 0:
+            rows.append({'Section': 'other', 'Time (ms)': round(other * 1000, 2),
+                         'Share': f"{other / total * 100:.0f}%"})
+        return rows
+
+    @staticmethod
+    def _format_stats(profile, limit=40):
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
@@ -0,0 +1,495 @@
+"""Streaming bulk export and import of learner progress and learning events.
+
+Progress is what a learner's session checkpoint holds (see
+``session_checkpoint.py``): profile, XP, tokens, lessons, achievements,
+quiz score history and the linked wallet, as one flat record per learner.
+Events are the rows of the learning-event log (``event_log.py``), which is
+also the ledger of tokens awarded and claimed. Both move as JSONL or CSV
+(picked by file extension), one record per line::
+
+    python progress_transfer.py export backup/progress.jsonl
+    python progress_transfer.py import classroom.csv --workers 4
+    python progress_transfer.py export events.csv --kind events --since 2026-09-01
+
+Memory use does not grow with the file. Exports walk the checkpoint
+directory and the event files a batch at a time. Imports read
+``--chunk-size`` lines at a time: worker processes parse and validate
+chunks in parallel while this process writes them in input order. Each
+learner's snapshot is replaced atomically. Each chunk of events is written
+under a name derived from its input offset, so writing a chunk again is
+harmless. After every chunk its end offset is saved to a state file, and
+an interrupted import rerun with the same arguments continues from there,
+redoing at most one chunk. Invalid records go to a rejects file with their
+byte offset and the reason.
+
+Imported progress replaces the learner's checkpoint, so the learner picks
+it up by opening the app with ``?resume=<token>``. ``resume-links`` issues
+a new token for every learner with a checkpoint, revoking their earlier
+links, and writes them as CSV::
+
+    python progress_transfer.py resume-links links.csv
+
+Import learners who are not in the middle of a session.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+import uuid
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+
+from event_log import EVENT_TYPES, SCHEMA, EventLog, learner_key
+from session_checkpoint import CheckpointStore, ScoreTail
+
+DEFAULT_DATA_DIR = '.crossfi_data'
+
+_LEARNER_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')  # What CheckpointStore accepts as a file name
+_ADDRESS = re.compile(r'^[0-9A-Za-z]{1,90}$')  # 0x hex, bech32 and the app's own testnet wallets
+_CONTROL = re.compile(r'[\x00-\x1f\x7f]')
+
+
+# Field parsers: accept JSON values or CSV text, return the stored value or raise ValueError
+def _int(minimum=0, maximum=2**63 - 1):
+    def parse(value):
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f"not an integer: {value!r}")
+        value = int(value.strip() if isinstance(value, str) else value)
+        if not minimum <= value <= maximum:
+            raise ValueError(f"{value} is outside [{minimum}, {maximum}]")
+        return value
+    return parse
+
+
+def _float(minimum=-math.inf, maximum=math.inf):
+    def parse(value):
+        if isinstance(value, bool):
+            raise ValueError(f"not a number: {value!r}")
+        value = float(value)
+        if not math.isfinite(value):
+            # float() accepts 'inf' and 'nan', and JSON numbers like 1e400 overflow to inf
+            raise ValueError(f"not a finite number: {value!r}")
+        if not minimum <= value <= maximum:
+            raise ValueError(f"{value} is outside [{minimum}, {maximum}]")
+        return value
+    return parse
+
+
+def _text(limit=200, pattern=None):
+    def parse(value):
+        if not isinstance(value, str) or len(value) > limit or _CONTROL.search(value):
+            raise ValueError(f"not a single-line string of up to {limit} characters")
+        if pattern and value and not pattern.match(value):
+            raise ValueError(f"malformed value {value!r}")
+        return value
+    return parse
+
+
+def _bool(value):
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false', '1', '0'):
+        return value.strip().lower() in ('true', '1')
+    if not isinstance(value, bool):
+        raise ValueError(f"not a boolean: {value!r}")
+    return value
+
+
+def _list(item, limit=100_000):
+    def parse(value):
+        if isinstance(value, str):
+            value = json.loads(value)
+        if not isinstance(value, list) or len(value) > limit:
+            raise ValueError(f"not a list of up to {limit} items")
+        return [item(v) for v in value]
+    return parse
+
+
+def _lesson_times(value):
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, dict):
+        raise ValueError("not an object of lesson: timestamp")
+    return {_int(1, 127)(lesson): _timestamp(ts) for lesson, ts in value.items()}
+
+
+_timestamp = _float(0, 2**33)
+
+# Progress record fields: user_data slots, the score history split in two, then wallet slots
+USER_FIELDS = {
+    'learner_id': _text(64, _LEARNER_ID),
+    'username': _text(),
+    'level': _int(1, 1000),
+    'xp': _int(),
+    'tokens': _int(),
+    'streak': _int(),
+    'last_login': _text(40),
+    'total_study_time': _int(),
+    'variant_seed': _int(0, 2**32 - 1),
+    'ability': _float(-20.0, 20.0),
+    'ability_answers': _int(),
+    'completed_lessons': _list(_int(1, 127), limit=127),
+    'lesson_completed_at': _lesson_times,
+    'achievements': _list(_text(64), limit=1000),
+}
+SCORE_FIELDS = {
+    'quiz_scores': _list(_float(0.0, 100.0)),
+    'quiz_score_times': _list(_timestamp),
+}
+WALLET_FIELDS = {
+    'wallet_connected': ('connected', _bool),
+    'wallet_address': ('address', _text(90, _ADDRESS)),
+    'wallet_network': ('network', _text(64)),
+    'wallet_balance': ('balance', _float(0.0)),
+}
+PROGRESS_FIELDS = tuple(USER_FIELDS) + tuple(SCORE_FIELDS) + tuple(WALLET_FIELDS)
+
+_CATEGORY = _text(64)
+EVENT_FIELDS = {
+    'ts': _timestamp,
+    'learner': _int(0, 2**64 - 1),
+    'event': _text(32),
+    'lesson': _int(0, 127),
+    'topic': _CATEGORY,
+    'difficulty': _CATEGORY,
+    'correct': _int(-1, 1),
+    'score': _float(0.0, 100.0),
+    'tokens': _float(),
+    'achievement': _CATEGORY,
+}
+_EVENT_DEFAULTS = {'lesson': 0, 'topic': None, 'difficulty': None, 'correct': -1, 'score': math.nan,
+                   'tokens': 0.0, 'achievement': None}
+
+
+def _present(raw, name):
+    """Whether a record sets ``name``; empty CSV cells and JSON nulls do not"""
+    return raw.get(name) not in (None, '')
+
+
+def _parse_fields(raw, parsers, record):
+    """Parse each field of ``raw`` that is set into ``record``, naming the field in any error"""
+    for name, parse in parsers.items():
+        if _present(raw, name):
+            try:
+                record[name] = parse(raw[name])
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"{name}: {e}") from None
+    return record
+
+
+def validate_progress(raw):
+    """Normalised progress record from a parsed JSON object or CSV row; raises ValueError"""
+    record = _parse_fields(raw, {**USER_FIELDS, **SCORE_FIELDS}, {})
+    _parse_fields(raw, {name: parse for name, (_, parse) in WALLET_FIELDS.items()}, record)
+    if record.get('wallet_address') and 'wallet_connected' not in record:
+        record['wallet_connected'] = True  # A roster that links an address means a connected wallet
+    if 'learner_id' not in record:
+        raise ValueError("learner_id is required")
+    times = record.get('quiz_score_times')
+    if times is not None and len(times) != len(record.get('quiz_scores', ())):
+        raise ValueError("quiz_score_times must have one entry per quiz score")
+    return record
+
+
+def validate_event(raw):
+    """Normalised event row; ``learner_id`` is accepted in place of the hashed ``learner``"""
+    row = dict(_EVENT_DEFAULTS)
+    if _present(raw, 'learner_id') and not _present(raw, 'learner'):
+        row['learner'] = learner_key(_text(64, _LEARNER_ID)(raw['learner_id']))
+    _parse_fields(raw, EVENT_FIELDS, row)
+    for name in ('ts', 'learner', 'event'):
+        if name not in row:
+            raise ValueError(f"{name} is required")
+    if row['event'] not in EVENT_TYPES:
+        raise ValueError(f"event: unknown type {row['event']!r}")
+    return row
+
+
+def progress_snapshot(record):
+    """Checkpoint record that restores a validated progress record (see ``SessionCheckpointer``)"""
+    fields = {('user_data', name): value for name, value in record.items() if name in USER_FIELDS}
+    if 'quiz_scores' in record:
+        scores = record['quiz_scores']
+        # Imported scores without times are dated to the import
+        times = record.get('quiz_score_times') or [time.time()] * len(scores)
+        fields[('user_data', 'quiz_scores')] = ScoreTail(0, array('f', scores), array('d', times))
+    for name, (slot, _) in WALLET_FIELDS.items():
+        if name in record:
+            fields[('wallet', slot)] = record[name]
+    return {'fields': fields, 'snapshot': True}
+
+
+def progress_record(fields):
+    """Flat progress record from ``CheckpointStore.load`` fields"""
+    record = {}
+    for (model, name), value in fields.items():
+        if model == 'user_data' and name in USER_FIELDS:
+            record[name] = value
+        elif model == 'user_data' and name == 'quiz_scores':
+            record['quiz_scores'] = [round(score, 2) for score in value.scores]
+            record['quiz_score_times'] = list(value.timestamps)
+    for name, (slot, _) in WALLET_FIELDS.items():
+        if ('wallet', slot) in fields:
+            record[name] = fields[('wallet', slot)]
+    return record
+
+
+def _csv_cell(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, separators=(',', ':'))
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return '' if value is None else value
+
+
+class RecordWriter:
+    """Writes records as JSONL lines or CSV rows with a fixed header"""
+
+    def __init__(self, out, fmt, fields):
+        self.out = out
+        self.count = 0
+        self._csv = csv.DictWriter(out, fieldnames=fields, extrasaction='ignore') if fmt == 'csv' else None
+        if self._csv:
+            self._csv.writeheader()
+
+    def write(self, record):
+        if self._csv:
+            self._csv.writerow({name: _csv_cell(value) for name, value in record.items()})
+        else:
+            self.out.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.count += 1
+
+
+def export_progress(store, out, fmt):
+    """Stream every learner's checkpointed progress to ``out``; returns the number of learners"""
+    writer = RecordWriter(out, fmt, PROGRESS_FIELDS)
+    for learner_id in store.learner_ids():
+        loaded = store.load(learner_id)
+        if loaded is not None:
+            writer.write(progress_record(loaded[0]))
+    return writer.count
+
+
+def write_resume_links(store, out):
+    """Issue a new resume token for every learner in ``store`` as ``learner_id,resume`` CSV; returns the count"""
+    writer = csv.writer(out)
+    writer.writerow(['learner_id', 'resume'])
+    count = 0
+    for learner_id in store.learner_ids():
+        writer.writerow([learner_id, store.issue_resume(learner_id)])
+        count += 1
+    return count
+
+
+def export_events(event_log, out, fmt, since=None, until=None, batch_rows=10_000):
+    """Stream logged events to ``out``, ``batch_rows`` at a time; returns the number of events"""
+    writer = RecordWriter(out, fmt, SCHEMA.names)
+    for table in event_log.tables(since=since, until=until):
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            for row in batch.to_pylist():
+                if math.isnan(row['score']):
+                    row['score'] = None  # NaN is not valid JSON
+                writer.write(row)
+    return writer.count
+
+
+def read_chunks(path, offset, chunk_size):
+    """``(start, end, lines)`` chunks of raw lines, from byte ``offset`` to the end of the file"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        start, lines = offset, []
+        for line in f:
+            lines.append(line)
+            offset += len(line)
+            if len(lines) >= chunk_size:
+                yield start, offset, lines
+                start, lines = offset, []
+        if lines:
+            yield start, offset, lines
+
+
+def parse_chunk(kind, fmt, header, start, lines):
+    """``(records, rejects)`` for one chunk of lines; runs in a worker process"""
+    validate = validate_progress if kind == 'progress' else validate_event
+    records, rejects = [], []
+    offset = start
+    for line in lines:
+        text = None
+        try:
+            text = line.decode('utf-8').rstrip('\r\n')
+            if text.strip():
+                raw = json.loads(text) if fmt == 'jsonl' else dict(zip(header, next(csv.reader([text]))))
+                if not isinstance(raw, dict):
+                    raise ValueError("not a JSON object")
+                records.append(validate(raw))
+        except (ValueError, csv.Error) as e:
+            rejects.append({'offset': offset, 'error': str(e), 'line': (text or repr(line))[:500]})
+        offset += len(line)
+    return records, rejects
+
+
+def _parsed_chunks(chunks, kind, fmt, header, workers):
+    """``(end, records, rejects)`` per chunk in input order, parsed by up to ``workers`` processes"""
+    if workers <= 1:
+        for start, end, lines in chunks:
+            yield (end,) + parse_chunk(kind, fmt, header, start, lines)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # A bounded window keeps memory flat: at most 2 chunks per worker are read ahead
+        pending = deque()
+        for start, end, lines in chunks:
+            pending.append((end, pool.submit(parse_chunk, kind, fmt, header, start, lines)))
+            if len(pending) >= workers * 2:
+                end, future = pending.popleft()
+                yield (end,) + future.result()
+        while pending:
+            end, future = pending.popleft()
+            yield (end,) + future.result()
+
+
+def _save_state(path, state):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.import-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def import_file(path, kind, target, fmt=None, chunk_size=5000, workers=1, state_path=None, rejects_path=None,
+                restart=False, skip_existing=False, on_chunk=None):
+    """Import ``path`` into ``target`` (a CheckpointStore or EventLog); returns the import state
+
+    The state (offset, imported, skipped, rejected) is saved after every
+    chunk to ``state_path``; calling again with the same arguments resumes
+    after the last saved chunk. Raises ValueError if the input file changed
+    since the state was saved; pass ``restart=True`` to start over.
+    """
+    fmt = fmt or _format(path)
+    state_path = state_path or f"{path}.import-state.json"
+    rejects_path = rejects_path or f"{path}.rejects.jsonl"
+    stat = os.stat(path)
+    state = None
+    if not restart and os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as f:
+            state = json.load(f)
+        if (state['size'], state['mtime_ns'], state['kind']) != (stat.st_size, stat.st_mtime_ns, kind):
+            raise ValueError(f"{path} changed since {state_path} was saved; pass --restart to import it again")
+    if state is None:
+        state = {'run': uuid.uuid4().hex[:12], 'kind': kind, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                 'offset': 0, 'imported': 0, 'skipped': 0, 'rejected': 0, 'done': False}
+        if os.path.exists(rejects_path):
+            os.unlink(rejects_path)
+
+    header = None
+    if fmt == 'csv':
+        with open(path, 'rb') as f:
+            first = f.readline()
+        header = next(csv.reader([first.decode('utf-8-sig').rstrip('\r\n')]), [])
+        state['offset'] = max(state['offset'], len(first))
+
+    chunks = read_chunks(path, state['offset'], chunk_size)
+    with open(rejects_path, 'a', encoding='utf-8') as rejects_file:
+        for end, records, rejects in _parsed_chunks(chunks, kind, fmt, header, workers):
+            if kind == 'progress':
+                for record in records:
+                    if skip_existing and target.exists(record['learner_id']):
+                        state['skipped'] += 1
+                    else:
+                        target.replace(record['learner_id'], progress_snapshot(record))
+                        state['imported'] += 1
+            elif records:
+                columns = {name: [row[name] for row in records] for name in SCHEMA.names}
+                # Named by run and offset: redoing this chunk after a crash replaces its files
+                target.write_table(pa.table(columns, schema=SCHEMA), name=f"import-{state['run']}-{end}")
+                state['imported'] += len(records)
+            for reject in rejects:
+                rejects_file.write(json.dumps(reject) + '\n')
+            rejects_file.flush()
+            state['rejected'] += len(rejects)
+            state['offset'] = end
+            _save_state(state_path, state)
+            if on_chunk:
+                on_chunk(state)
+    state['done'] = True
+    _save_state(state_path, state)
+    return state
+
+
+def _format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('command', choices=['export', 'import', 'resume-links'])
+    parser.add_argument('path', help="JSONL or CSV file; '-' exports to stdout")
+    parser.add_argument('--kind', choices=['progress', 'events'], default='progress')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='Default: from the file extension')
+    parser.add_argument('--data-dir', default=os.environ.get('DATA_DIR', DEFAULT_DATA_DIR),
+                        help="The app's DATA_DIR")
+    parser.add_argument('--since', help='Events export: first UTC day (YYYY-MM-DD)')
+    parser.add_argument('--until', help='Events export: last UTC day (YYYY-MM-DD)')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Lines validated and written per batch')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Validation processes')
+    parser.add_argument('--state', help='Resumable import state (default: <path>.import-state.json)')
+    parser.add_argument('--rejects', help='Invalid records (default: <path>.rejects.jsonl)')
+    parser.add_argument('--restart', action='store_true', help='Ignore saved import state')
+    parser.add_argument('--skip-existing', action='store_true', help="Keep learners' existing progress")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or _format(args.path)
+    noun = 'event' if args.kind == 'events' else 'progress'
+    started = time.perf_counter()
+    if args.kind == 'progress':
+        target = CheckpointStore(os.path.join(args.data_dir, 'checkpoints'))
+    else:
+        target = EventLog(os.path.join(args.data_dir, 'events'))
+
+    if args.command == 'resume-links':
+        if args.kind != 'progress':
+            parser.error("resume-links applies to progress")
+        out = sys.stdout if args.path == '-' else open(args.path, 'w', encoding='utf-8', newline='')
+        try:
+            count = write_resume_links(target, out)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"Issued {count} resume tokens in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+        return 0
+
+    if args.command == 'export':
+        out = sys.stdout if args.path == '-' else open(args.path, 'w', encoding='utf-8', newline='')
+        try:
+            if args.kind == 'progress':
+                count = export_progress(target, out, fmt)
+            else:
+                count = export_events(target, out, fmt, args.since, args.until)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"Exported {count} {noun} records in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+        return 0
+
+    def report(state):
+        print(f"\r{state['offset'] / max(state['size'], 1):6.1%}  imported {state['imported']}  "
+              f"skipped {state['skipped']}  rejected {state['rejected']}", end='', file=sys.stderr)
+
+    try:
+        state = import_file(args.path, args.kind, target, fmt=fmt, chunk_size=args.chunk_size, workers=args.workers,
+                            state_path=args.state, rejects_path=args.rejects, restart=args.restart,
+                            skip_existing=args.skip_existing, on_chunk=report)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"\nImported {state['imported']} {noun} records in {time.perf_counter() - started:.1f} s"
+          + (f"; {state['rejected']} rejected, see {args.rejects or args.path + '.rejects.jsonl'}"
+             if state['rejected'] else ""), file=sys.stderr)
+    return 1 if state['rejected'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
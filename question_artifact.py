@@ -0,0 +1,105 @@
+"""Compressed, versioned question corpus read through a memory map.
+
+Layout (little-endian)::
+
+    b'XFQB' | uint16 format version | uint32 index length | index JSON | blocks
+
+The index records the corpus version, creation metadata and, per
+(topic, difficulty) cell, the offset, length and question count of a
+zlib-compressed JSON array of questions. Readers map the file and only
+decompress a cell when it is first asked for, so opening a large corpus
+at app startup costs one header parse.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from datetime import datetime
+
+MAGIC = b'XFQB'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHI')
+
+
+class ArtifactError(ValueError):
+    """The file is not a question artifact this code can read"""
+
+
+def write_artifact(path, cells, metadata=None):
+    """Atomically write ``{(topic, difficulty): [question, ...]}``; returns the corpus version"""
+    blocks = []
+    digest = hashlib.sha256()
+    for (topic, difficulty), questions in sorted(cells.items()):
+        payload = json.dumps(questions, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest.update(f'{topic}|{difficulty}|'.encode('utf-8') + payload)
+        blocks.append((topic, difficulty, len(questions), zlib.compress(payload, 9)))
+    version = digest.hexdigest()[:16]
+
+    # Block offsets depend on the index size, so lay out until the index length settles
+    index = dict(metadata or {}, version=version, created=datetime.now().isoformat(timespec='seconds'))
+    index_length = 0
+    while True:
+        offset = _HEADER.size + index_length
+        index['cells'] = []
+        for topic, difficulty, count, block in blocks:
+            index['cells'].append({'topic': topic, 'difficulty': difficulty, 'count': count,
+                                   'offset': offset, 'length': len(block)})
+            offset += len(block)
+        index_bytes = json.dumps(index).encode('utf-8')
+        if len(index_bytes) == index_length:
+            break
+        index_length = len(index_bytes)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.question-artifact-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(index_bytes)))
+            f.write(index_bytes)
+            for _, _, _, block in blocks:
+                f.write(block)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return version
+
+
+class QuestionArtifact:
+    """Read-only, memory-mapped view of a question artifact"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, format_version, index_length = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ArtifactError(f"{path} is not a question artifact")
+            if format_version != FORMAT_VERSION:
+                raise ArtifactError(f"{path} has format version {format_version}, expected {FORMAT_VERSION}")
+            self.index = json.loads(self._map[_HEADER.size:_HEADER.size + index_length])
+        except (ArtifactError, struct.error, ValueError):
+            self._map.close()
+            raise
+        self.version = self.index['version']
+        self.cells = {(cell['topic'], cell['difficulty']): cell for cell in self.index['cells']}
+
+    def count(self, topic, difficulty):
+        cell = self.cells.get((topic, difficulty))
+        return cell['count'] if cell else 0
+
+    def questions(self, topic, difficulty):
+        """Decompress one cell's questions (empty if the artifact has none)"""
+        cell = self.cells.get((topic, difficulty))
+        if cell is None:
+            return []
+        block = self._map[cell['offset']:cell['offset'] + cell['length']]
+        return json.loads(zlib.decompress(block))
+
+    def close(self):
+        self._map.close()
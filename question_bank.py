@@ -0,0 +1,206 @@
+"""In-process store and bank of quiz questions shared by all sessions.
+
+``QuestionStore`` interns every question the app serves under a stable
+content-hash ID, so sessions keep short ID tuples in their quiz state
+instead of private copies of the question text, options and explanation.
+Questions that Groq returns, or that ``pregenerate.py`` produced ahead of
+time, are banked per (topic, difficulty) so the app can serve a quiz
+instantly when live generation is unavailable, slow or not needed.
+"""
+import hashlib
+import json
+import random
+import threading
+from collections import OrderedDict, deque
+
+from near_duplicates import NearDuplicateIndex
+
+
+def question_id(question):
+    """Stable ID derived from the question's content"""
+    key = json.dumps([question['question'], list(question['options']), question['correct']],
+                     ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class QuestionStore:
+    """Thread-safe, LRU-capped map of question ID to one shared, read-only question"""
+
+    def __init__(self, max_size=50_000):
+        self.max_size = max_size
+        self._questions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def intern(self, question):
+        """Store a question once and return its canonical ID string"""
+        qid = question_id(question)
+        with self._lock:
+            existing = self._questions.get(qid)
+            if existing is not None:
+                self._questions.move_to_end(qid)
+                return existing[0]
+            frozen = {
+                'question': question['question'],
+                'options': tuple(question['options']),
+                'correct': question['correct'],
+                'explanation': question.get('explanation', '')
+            }
+            # Keep the ID object with the question so every session shares one string
+            self._questions[qid] = (qid, frozen)
+            while len(self._questions) > self.max_size:
+                self._questions.popitem(last=False)
+        return qid
+
+    def intern_many(self, questions):
+        return tuple(self.intern(question) for question in questions)
+
+    def get(self, qid):
+        with self._lock:
+            entry = self._questions.get(qid)
+            if entry is None:
+                return None
+            self._questions.move_to_end(qid)
+            return entry[1]
+
+    def get_many(self, qids):
+        """Questions for the given IDs, or None if any has been evicted"""
+        questions = [self.get(qid) for qid in qids]
+        return None if any(question is None for question in questions) else questions
+
+    def __len__(self):
+        return len(self._questions)
+
+
+class QuestionBank:
+    """Thread-safe, capped bank of generated question IDs per (topic, difficulty)
+
+    With an ``artifact`` (a pre-generated ``QuestionArtifact``), each bucket
+    is seeded from the matching corpus cell the first time it is used, and
+    is sized to hold that whole cell plus live additions up to ``max_per_key``.
+    Paraphrases of an already banked question are clustered with it by a
+    ``NearDuplicateIndex`` and kept out of the bank; the last ``max_rejected``
+    of them remember that cluster, so a rejected paraphrase is still
+    recognised when generation returns it again.
+    """
+
+    def __init__(self, store, max_per_key=200, artifact=None, near_duplicates=None, max_rejected=10_000):
+        self.store = store
+        self.max_per_key = max_per_key
+        self.artifact = artifact
+        self.near_duplicates = near_duplicates if near_duplicates is not None else NearDuplicateIndex()
+        self.near_duplicates_rejected = 0
+        self.max_rejected = max_rejected
+        self._rejected = OrderedDict()
+        self._questions = {}
+        self._lock = threading.Lock()
+
+    def _admit(self, bucket, qid, question):
+        """Append unless ``qid`` or a paraphrase of it is already banked; call under the lock"""
+        index = self.near_duplicates
+        if qid in index or qid in self._rejected:
+            return
+        cluster = index.add(qid, question)
+        if cluster != qid:
+            # Only banked questions stay indexed, so the index is bounded by the bank
+            index.remove(qid)
+            self.near_duplicates_rejected += 1
+            self._rejected[qid] = cluster
+            if len(self._rejected) > self.max_rejected:
+                self._rejected.popitem(last=False)
+            return
+        if len(bucket) == bucket.maxlen:
+            index.remove(bucket[0])
+        bucket.append(qid)
+
+    def _bucket(self, key):
+        """Bucket for ``key``, created (and seeded from the artifact) on first use; call under the lock"""
+        bucket = self._questions.get(key)
+        if bucket is None:
+            seeded = self.artifact.questions(*key) if self.artifact is not None else []
+            bucket = self._questions[key] = deque(maxlen=len(seeded) + self.max_per_key)
+            for qid, question in zip(self.store.intern_many(seeded), seeded):
+                self._admit(bucket, qid, question)
+        return bucket
+
+    def _artifact_keys(self, topic):
+        if self.artifact is None:
+            return []
+        return [key for key in self.artifact.cells if key[0] == topic]
+
+    def add(self, topic, difficulty, questions):
+        qids = self.store.intern_many(questions)
+        with self._lock:
+            bucket = self._bucket((topic, difficulty))
+            for qid, question in zip(qids, questions):
+                self._admit(bucket, qid, question)
+        return qids
+
+    def _cluster_of(self, qid):
+        """Cluster of a banked or rejected question (its own ID if unknown); call under the lock"""
+        cluster = self._rejected.get(qid)
+        return cluster if cluster is not None else self.near_duplicates.cluster_of(qid)
+
+    def cluster_of(self, qid):
+        """Representative ID shared by a question and its known paraphrases"""
+        with self._lock:
+            return self._cluster_of(qid)
+
+    def distinct(self, qids, exclude=()):
+        """``qids`` in order, keeping one per paraphrase cluster and none clustered with ``exclude``"""
+        with self._lock:
+            used_clusters = {self._cluster_of(qid) for qid in exclude}
+            picked = []
+            for qid in qids:
+                cluster = self._cluster_of(qid)
+                if cluster not in used_clusters:
+                    used_clusters.add(cluster)
+                    picked.append(qid)
+        return picked
+
+    def sample(self, topic, difficulty, count=4, rng=random, exclude=(), band=None, difficulty_of=None):
+        """Return up to ``count`` banked questions, preferring the exact difficulty
+
+        At most one question per paraphrase cluster is returned, and clusters
+        of the question IDs in ``exclude`` (e.g. ones the learner just saw) are skipped.
+        With a ``band`` of (low, high) calibrated difficulty and a
+        ``difficulty_of(qid, label)`` estimator, questions of this topic from
+        any bucket whose estimate falls in the band come first.
+        """
+        with self._lock:
+            exact = list(self._bucket((topic, difficulty)))
+            others = []
+            if len(exact) < count or band is not None:
+                for key in self._artifact_keys(topic):
+                    self._bucket(key)
+                for (other_topic, other_difficulty), bucket in self._questions.items():
+                    if other_topic == topic and other_difficulty != difficulty:
+                        others.extend((qid, other_difficulty) for qid in bucket)
+            ordered = rng.sample(exact, len(exact)) + [qid for qid, _ in rng.sample(others, len(others))]
+            if band is not None:
+                low, high = band
+                labelled = [(qid, difficulty) for qid in exact] + others
+                in_band = [qid for qid, label in labelled if low <= difficulty_of(qid, label) < high]
+                # Top up from the usual order when too few questions are calibrated into the band
+                ordered = rng.sample(in_band, len(in_band)) + ordered
+            cluster_of = self._cluster_of
+            used_clusters = {cluster_of(qid) for qid in exclude}
+            # Resolve only what is needed; IDs the store has evicted are skipped
+            picked = []
+            for qid in ordered:
+                cluster = cluster_of(qid)
+                if cluster not in used_clusters:
+                    used_clusters.add(cluster)
+                    picked.append(qid)
+                    if len(picked) == count * 2:
+                        break
+        questions = [q for q in (self.store.get(qid) for qid in picked) if q is not None]
+        return questions[:count]
+
+    def size(self, topic=None, difficulty=None):
+        with self._lock:
+            if topic is not None and difficulty is not None:
+                return len(self._bucket((topic, difficulty)))
+            return sum(
+                len(bucket) for (t, d), bucket in self._questions.items()
+                if (topic is None or t == topic) and (difficulty is None or d == difficulty)
+            )
@@ -0,0 +1,234 @@
+"""Per-question answer statistics and Rasch-style difficulty calibration.
+
+Answers are accumulated in memory and flushed to SQLite as one batched
+upsert every ``flush_every`` answers or ``flush_interval`` seconds, so a
+click never waits on disk. Each question's difficulty is estimated on the
+logit scale of a one-parameter (Rasch) IRT model: ``P(correct) =
+sigmoid(ability - difficulty)``. The estimate combines the smoothed
+proportion correct with the mean ability of the learners who answered it
+(a PROX-style approximation), shrunk towards a prior set by the question's
+generation label until enough answers arrive.
+
+Every worker process shares the database. After each background flush a
+worker also loads the difficulties other workers have written since its
+last refresh, so calibrations spread without a restart.
+"""
+import atexit
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+# Prior difficulty (logits) by the label a question was generated for
+LABEL_PRIORS = {"beginner": -1.0, "intermediate": 0.0, "advanced": 1.0}
+PRIOR_WEIGHT = 4.0
+
+# Refreshes re-read this many seconds before the last one, for flushes that committed late
+REFRESH_OVERLAP_SECONDS = 60.0
+
+logger = logging.getLogger('question_stats')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS question_stats (
+    qid TEXT PRIMARY KEY,
+    label TEXT NOT NULL,
+    exposures INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    answer_seconds REAL NOT NULL,
+    ability_sum REAL NOT NULL,
+    difficulty REAL,
+    updated_at REAL NOT NULL
+)
+"""
+
+_INDEX = "CREATE INDEX IF NOT EXISTS question_stats_updated_at ON question_stats (updated_at)"
+
+_UPSERT = """
+INSERT INTO question_stats (qid, label, exposures, correct, skipped, answer_seconds, ability_sum, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(qid) DO UPDATE SET
+    exposures = exposures + excluded.exposures,
+    correct = correct + excluded.correct,
+    skipped = skipped + excluded.skipped,
+    answer_seconds = answer_seconds + excluded.answer_seconds,
+    ability_sum = ability_sum + excluded.ability_sum,
+    updated_at = excluded.updated_at
+"""
+
+
+def sigmoid(x):
+    return 1.0 / (1.0 + math.exp(-x))
+
+
+def calibrate(label, exposures, correct, ability_sum, prior_weight=PRIOR_WEIGHT):
+    """Difficulty in logits; equals the label prior until answers arrive"""
+    prior = LABEL_PRIORS.get(label, 0.0)
+    mean_ability = ability_sum / exposures if exposures else 0.0
+    p = (correct + prior_weight * sigmoid(mean_ability - prior)) / (exposures + prior_weight)
+    return mean_ability - math.log(p / (1.0 - p))
+
+
+def update_ability(ability, answers, difficulty, correct):
+    """Elo-style step of a learner's ability after one answer; the step shrinks with experience"""
+    step = max(0.15, 1.0 / (1.0 + 0.2 * answers))
+    return ability + step * ((1.0 if correct else 0.0) - sigmoid(ability - difficulty))
+
+
+class AnswerStats:
+    """Process-wide answer accumulator with periodic batched flushes to SQLite"""
+
+    def __init__(self, path, flush_every=100, flush_interval=30.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self._pending = {}
+        self._pending_answers = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(_SCHEMA)
+            conn.execute(_INDEX)
+            self._refreshed_at = time.time()
+            self.difficulties = dict(conn.execute(
+                "SELECT qid, difficulty FROM question_stats WHERE difficulty IS NOT NULL"))
+        finally:
+            conn.close()
+        threading.Thread(target=self._flush_periodically, name='answer-stats-flush', daemon=True).start()
+        atexit.register(self._flush_quietly)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def record(self, qid, label, correct, seconds, ability, skipped=False):
+        """Count one answer (a skip counts as incorrect, without a time); never touches disk"""
+        with self._lock:
+            self._merge(qid, [label, 1, int(correct and not skipped), int(skipped),
+                              0.0 if skipped else seconds, ability])
+            self._pending_answers += 1
+            due = self._pending_answers >= self.flush_every
+        if due:
+            # Full batches are written by the flush thread, off the request path
+            self._wake.set()
+
+    def _merge(self, qid, counts):
+        """Add (label, exposures, correct, skipped, seconds, ability) to the pending row; call under the lock"""
+        row = self._pending.get(qid)
+        if row is None:
+            self._pending[qid] = list(counts)
+            return
+        for i in range(1, len(row)):
+            row[i] += counts[i]
+
+    def difficulty(self, qid, label):
+        """Calibrated difficulty from flushed answers, else the label prior"""
+        calibrated = self.difficulties.get(qid)
+        return calibrated if calibrated is not None else LABEL_PRIORS.get(label, 0.0)
+
+    @property
+    def pending(self):
+        return self._pending_answers
+
+    def flush(self):
+        """Write pending answers as one transaction and recalibrate the questions they touched"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_answers = 0
+            if not pending:
+                return 0
+            now = time.time()
+            try:
+                conn = self._connect()
+            except Exception:
+                self._requeue(pending)
+                raise
+            try:
+                with conn:
+                    conn.executemany(_UPSERT, [(qid, *row, now) for qid, row in pending.items()])
+                    qids = list(pending)
+                    rows = []
+                    # Stay under SQLite's bound-parameter limit
+                    for start in range(0, len(qids), 500):
+                        chunk = qids[start:start + 500]
+                        rows.extend(conn.execute(
+                            f"SELECT qid, label, exposures, correct, ability_sum FROM question_stats "
+                            f"WHERE qid IN ({','.join('?' * len(chunk))})", chunk))
+                    updates = [(calibrate(label, exposures, correct, ability_sum), qid)
+                               for qid, label, exposures, correct, ability_sum in rows]
+                    conn.executemany("UPDATE question_stats SET difficulty = ? WHERE qid = ?", updates)
+            except Exception:
+                # The transaction rolled back; keep the answers for the next flush
+                self._requeue(pending)
+                raise
+            finally:
+                conn.close()
+            self.difficulties.update((qid, difficulty) for difficulty, qid in updates)
+            self.flushes += 1
+            return len(pending)
+
+    def refresh(self):
+        """Load difficulties calibrated (by any process) since the last refresh"""
+        started = time.time()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT qid, difficulty FROM question_stats WHERE difficulty IS NOT NULL AND updated_at >= ?",
+                (self._refreshed_at - REFRESH_OVERLAP_SECONDS,)).fetchall()
+        finally:
+            conn.close()
+        self.difficulties.update(rows)
+        self._refreshed_at = started
+        return len(rows)
+
+    def _requeue(self, pending):
+        with self._lock:
+            for qid, counts in pending.items():
+                self._merge(qid, counts)
+                self._pending_answers += counts[1]
+
+    def _flush_periodically(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            self._flush_quietly()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+            self.refresh()
+        except Exception:
+            # Answers stay pending and the flush thread keeps running; the next flush retries them
+            logger.exception("Answer stats flush failed; %d answers kept for the next flush", self.pending)
+
+    def summary(self, limit=10):
+        """Most-answered questions with accuracy, mean answer time and difficulty"""
+        conn = self._connect()
+        try:
+            return [
+                {'qid': qid, 'label': label, 'exposures': exposures,
+                 'accuracy': correct / exposures if exposures else 0.0,
+                 'mean_seconds': answer_seconds / (exposures - skipped) if exposures > skipped else None,
+                 'difficulty': difficulty}
+                for qid, label, exposures, correct, skipped, answer_seconds, difficulty in conn.execute(
+                    "SELECT qid, label, exposures, correct, skipped, answer_seconds, difficulty "
+                    "FROM question_stats ORDER BY exposures DESC LIMIT ?", (limit,))
+            ]
+        finally:
+            conn.close()
+
+    def close(self):
+        self._stopped.set()
+        self._wake.set()
+        self.flush()
@@ -0,0 +1,92 @@
+"""Cheap, seeded presentation variants of stored quiz questions.
+
+One stored question can be shown many ways: its options are shuffled (with
+the ``correct`` index, the "A)"-style labels and letter references in the
+explanation remapped to match) and its stem is reworded from a small set of
+meaning-preserving templates. Variants are a pure function of the question
+and a seed, so a learner sees the same variant on every rerun of one quiz
+attempt while different learners and attempts get different ones.
+"""
+import hashlib
+import random
+import re
+
+OPTION_LABELS = 'ABCDEFGH'
+
+_LABEL_RE = re.compile(r'^\s*\(?([A-H])[\)\.:]\s*')
+# Letter references in explanations: "B)", "(B)", "Option B", "answer B"
+_REFERENCE_RE = re.compile(r'\b(?:(?<=[Oo]ption )|(?<=[Aa]nswer ))([A-H])\b|\b([A-H])\)')
+# Options that only make sense in their original position
+_ANCHORED_RE = re.compile(r'^(all|none|both) of the (above|options)|^(a|b) and (b|c)\b', re.IGNORECASE)
+
+# (pattern, replacement) rewrites of the whole stem; the first that matches is eligible
+STEM_REWRITES = [
+    (re.compile(r'^What is the (.+)\?$'), r'Which of the following best describes the \1?'),
+    (re.compile(r'^What does (\S+) stand for(.*)\?$'), r'What is the correct expansion of \1\2?'),
+    (re.compile(r'^What makes (.+)\?$'), r'Which option explains what makes \1?'),
+    (re.compile(r'^What are the (.+)\?$'), r'Which of the following are the \1?'),
+]
+
+# Neutral lead-ins that leave the stem itself untouched
+STEM_PREFIXES = ['', 'Choose the best answer: ', 'Select one: ', 'Quick check: ']
+
+
+def variant_seed(*parts):
+    """Stable 64-bit seed from user, question and attempt identifiers"""
+    key = '|'.join(str(part) for part in parts).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big')
+
+
+def strip_label(option):
+    return _LABEL_RE.sub('', option, count=1)
+
+
+def reword_stem(stem, rng):
+    """Template rewrite or neutral prefix, chosen by ``rng``"""
+    choices = list(STEM_PREFIXES)
+    rewrite = next(((pattern, replacement) for pattern, replacement in STEM_REWRITES if pattern.match(stem)), None)
+    if rewrite is not None:
+        choices.append(rewrite)
+    choice = rng.choice(choices)
+    if isinstance(choice, tuple):
+        pattern, replacement = choice
+        return pattern.sub(replacement, stem)
+    return choice + stem
+
+
+def permute_options(options, correct, rng):
+    """Shuffled options with fresh labels, the new correct index and an old->new label map"""
+    bodies = [strip_label(option) for option in options]
+    movable = [i for i, body in enumerate(bodies) if not _ANCHORED_RE.match(body)]
+    shuffled = movable[:]
+    rng.shuffle(shuffled)
+    order = list(range(len(bodies)))
+    for slot, source in zip(movable, shuffled):
+        order[slot] = source
+    labelled = any(_LABEL_RE.match(option) for option in options)
+    new_options = [
+        f"{OPTION_LABELS[i]}) {bodies[source]}" if labelled else bodies[source]
+        for i, source in enumerate(order)
+    ]
+    relabel = {OPTION_LABELS[source]: OPTION_LABELS[i] for i, source in enumerate(order)}
+    return new_options, order.index(correct), relabel
+
+
+def _relabel_explanation(explanation, relabel):
+    def swap(match):
+        letter = match.group(1) or match.group(2)
+        new = relabel.get(letter, letter)
+        return new if match.group(1) else f"{new})"
+    return _REFERENCE_RE.sub(swap, explanation)
+
+
+def make_variant(question, seed, reword=True):
+    """A new question dict presenting ``question`` differently; the input is not modified"""
+    rng = random.Random(seed)
+    options, correct, relabel = permute_options(list(question['options']), question['correct'], rng)
+    return {
+        'question': reword_stem(question['question'], rng) if reword else question['question'],
+        'options': options,
+        'correct': correct,
+        'explanation': _relabel_explanation(question.get('explanation', ''), relabel)
+    }
@@ -0,0 +1,245 @@
+"""Groq quiz prompts, requests and response validation without Streamlit.
+
+Shared by the app and the offline ``pregenerate`` CLI so both ask for,
+parse and validate questions the same way.
+"""
+import json
+import re
+import time
+
+import telemetry
+
+QUIZ_TOPICS = ["Blockchain Fundamentals", "CrossFi Platform", "Cosmos SDK & EVM", "DeFi Concepts",
+               "Smart Contract Development"]
+QUIZ_DIFFICULTIES = ["beginner", "intermediate", "advanced"]
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+# Completion budget per requested question; grounded prompts get terse, on-topic answers
+MAX_TOKENS_PER_QUESTION = 500
+GROUNDED_MAX_TOKENS_PER_QUESTION = 300
+
+# A top-up request for missing questions is only sent with at least this much of the timeout left
+MIN_TOP_UP_SECONDS = 1.0
+
+_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)(?:```|$)', re.DOTALL | re.IGNORECASE)
+_OPTION_LABEL_RE = re.compile(r'^\s*\(?[A-Da-d](?:\)|[.:](?=\s))\s*')
+_ANSWER_LETTER_RE = re.compile(r'^\s*\(?([A-Da-d])\s*[).:]?\s*$')
+_DECODER = json.JSONDecoder()
+
+
+def build_quiz_prompt(topic, difficulty, count=4, context='', avoid=()):
+    """Quiz prompt; with lesson ``context`` the questions must stick to that material
+
+    ``avoid`` lists question texts already received, for top-up requests.
+    """
+    avoid_block = ''.join(f"\n- {text}" for text in avoid)
+    if avoid_block:
+        avoid_block = f"\nDo not repeat these questions:{avoid_block}\n"
+    if context:
+        return f"""Create {count} multiple-choice questions about {topic} in CrossFi blockchain context.
+Difficulty: {difficulty}
+Use only facts from this lesson material:
+{context}
+{avoid_block}
+Return valid JSON only, with exactly 4 options per question and "correct" as the 0-based index:
+{{"questions": [{{"question": "...?", "options": ["A) ...", "B) ...", "C) ...", "D) ..."], "correct": 0, "explanation": "One sentence citing the material"}}]}}"""
+    return f"""Create {count} challenging multiple-choice questions about {topic} in CrossFi blockchain context.
+    Difficulty: {difficulty}
+
+    Return valid JSON only:
+    {{
+        "questions": [
+            {{
+                "question": "Clear, specific question about {topic}?",
+                "options": ["A) Option 1", "B) Option 2", "C) Option 3", "D) Option 4"],
+                "correct": 0,
+                "explanation": "Detailed explanation of why this answer is correct"
+            }}
+        ]
+    }}
+
+    Focus on practical CrossFi knowledge, DeFi concepts, and real-world applications.{avoid_block}"""
+
+
+def _salvage_array(content, start):
+    """Complete objects at the start of a truncated JSON array of questions"""
+    array_start = content.find('[', start)
+    if array_start < 0:
+        return []
+    items = []
+    position = array_start + 1
+    while True:
+        while position < len(content) and content[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(content) or content[position] != '{':
+            return items
+        try:
+            item, position = _DECODER.raw_decode(content, position)
+        except ValueError:
+            return items
+        items.append(item)
+
+
+def parse_quiz_response(content):
+    """Raw question objects from a model reply
+
+    Tolerates a Markdown code fence, prose around the JSON and a reply cut
+    off mid-array (the complete questions before the cut are kept).
+    """
+    fenced = _FENCE_RE.search(content)
+    if fenced:
+        content = fenced.group(1)
+    starts = [i for i in (content.find('{'), content.find('[')) if i >= 0]
+    if not starts:
+        raise ValueError("AI response contained no JSON")
+    start = min(starts)
+    try:
+        data, _ = _DECODER.raw_decode(content, start)
+    except ValueError:
+        data = _salvage_array(content, start)
+    if isinstance(data, dict):
+        data = data.get('questions', [data] if 'question' in data else [])
+    if not isinstance(data, list) or not data:
+        raise ValueError("AI response contained no questions")
+    return data
+
+
+def _answer_index(value, option_texts):
+    """0-based answer index from an int, digit string, letter ("B", "b)") or the option text"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if 0 <= value < len(option_texts) else None
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return _answer_index(int(value), option_texts)
+    letter = _ANSWER_LETTER_RE.match(value)
+    if letter:
+        return 'abcd'.index(letter.group(1).lower())
+    text = _OPTION_LABEL_RE.sub('', value, count=1).strip().lower()
+    lowered = [option.lower() for option in option_texts]
+    return lowered.index(text) if text in lowered else None
+
+
+def repair_question(question):
+    """A valid question built from ``question`` with common model defects fixed, or None
+
+    Fixes options given as a dict or without "A) " labels, a letter, digit
+    string or option text as the answer (or an ``answer`` key instead of
+    ``correct``), stray whitespace and a missing explanation. A question
+    without four distinct options or a resolvable answer is rejected.
+    """
+    if not isinstance(question, dict):
+        return None
+    text = question.get('question')
+    options = question.get('options')
+    if isinstance(options, dict):
+        options = [options[key] for key in sorted(options)]
+    if not isinstance(text, str) or not text.strip() or not isinstance(options, list) or len(options) != 4:
+        return None
+    if not all(isinstance(option, (str, int, float)) and not isinstance(option, bool) for option in options):
+        return None
+    option_texts = [_OPTION_LABEL_RE.sub('', str(option), count=1).strip() for option in options]
+    if not all(option_texts) or len({option.lower() for option in option_texts}) != 4:
+        return None
+    correct = _answer_index(question.get('correct', question.get('answer')), option_texts)
+    if correct is None:
+        return None
+    explanation = question.get('explanation')
+    return {
+        'question': text.strip(),
+        'options': [f"{label}) {option}" for label, option in zip('ABCD', option_texts)],
+        'correct': correct,
+        'explanation': explanation.strip() if isinstance(explanation, str) else ''
+    }
+
+
+def validate_questions(raw_questions):
+    """(valid questions, how many needed repair, how many were rejected)"""
+    valid = []
+    repaired = rejected = 0
+    for raw in raw_questions:
+        question = repair_question(raw)
+        if question is None:
+            rejected += 1
+            continue
+        if any(raw.get(key) != value for key, value in question.items()):
+            repaired += 1
+        valid.append(question)
+    return valid, repaired, rejected
+
+
+def _request_once(groq_client, topic, difficulty, timeout, model, count, cost_per_1k_tokens, temperature,
+                  context, avoid):
+    """One Groq call; returns the valid (possibly repaired) questions it produced"""
+    started = time.monotonic()
+    if context:
+        max_tokens = GROUNDED_MAX_TOKENS_PER_QUESTION * count
+    else:
+        max_tokens = max(2000, MAX_TOKENS_PER_QUESTION * count)
+    try:
+        response = groq_client.chat.completions.create(
+            messages=[{"role": "user", "content": build_quiz_prompt(topic, difficulty, count, context, avoid)}],
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout
+        )
+    except Exception:
+        telemetry.record_llm_call(model, topic, difficulty, "error", time.monotonic() - started)
+        raise
+    telemetry.record_llm_call(
+        model, topic, difficulty, "success", time.monotonic() - started,
+        usage=getattr(response, "usage", None),
+        cost_per_1k_tokens=cost_per_1k_tokens
+    )
+
+    try:
+        raw_questions = parse_quiz_response(response.choices[0].message.content)
+    except Exception:
+        telemetry.record_parse(model, topic, difficulty, "error")
+        raise
+    questions, repaired, rejected = validate_questions(raw_questions)
+    telemetry.record_questions(model, topic, difficulty, len(questions) - repaired, repaired, rejected)
+    if not questions:
+        telemetry.record_parse(model, topic, difficulty, "error")
+        raise ValueError("AI response contained no valid questions")
+    telemetry.record_parse(model, topic, difficulty, "partial" if rejected else "ok")
+    return questions
+
+
+def request_quiz_questions(groq_client, topic, difficulty, timeout, model=DEFAULT_MODEL, count=4,
+                           cost_per_1k_tokens=0.0, temperature=0.3, context='', top_ups=0):
+    """Up to ``count`` valid questions from Groq; raises if none could be had
+
+    Valid questions from a partly malformed reply are kept. While time is
+    left in ``timeout``, up to ``top_ups`` follow-up requests ask only for
+    the missing ones; if a follow-up fails, the questions already paid for
+    are returned.
+    """
+    started = time.monotonic()
+    questions = []
+    seen = set()
+    for attempt in range(top_ups + 1):
+        remaining = timeout - (time.monotonic() - started)
+        if attempt and remaining < MIN_TOP_UP_SECONDS:
+            break
+        try:
+            batch = _request_once(groq_client, topic, difficulty, remaining, model, count - len(questions),
+                                  cost_per_1k_tokens, temperature, context,
+                                  [question['question'] for question in questions])
+        except Exception:
+            if questions:
+                break
+            raise
+        for question in batch:
+            key = question['question'].lower()
+            if key not in seen:
+                seen.add(key)
+                questions.append(question)
+        if len(questions) >= count:
+            break
+    return questions[:count]
@@ -0,0 +1,70 @@
+"""Background quiz generation jobs, so no script run waits on Groq.
+
+Start Quiz submits a job to a process-wide thread pool and keeps only its
+ID in the session's quiz state. Reruns ask for the job's ``status``, which
+never blocks, and ``collect`` the result once it is done. Finished jobs
+are kept until their session collects them or ``ttl`` seconds pass, so a
+learner who closes the tab mid-build does not leak the result. Jobs live
+in one process: a session resumed on another worker finds its job
+``UNKNOWN`` and submits it again there.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = 'pending'
+DONE = 'done'
+UNKNOWN = 'unknown'
+
+
+class QuizJobs:
+    """Thread pool of quiz builds, addressed by job ID"""
+
+    def __init__(self, max_workers=8, ttl=600.0):
+        self.ttl = ttl
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='quiz-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the pool; returns the job ID"""
+        job_id = uuid.uuid4().hex
+        future = self.executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._expire()
+            self._jobs[job_id] = (future, time.monotonic())
+        return job_id
+
+    def status(self, job_id):
+        """PENDING, DONE or UNKNOWN (another process's job, collected, cancelled or expired)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return UNKNOWN
+        return DONE if job[0].done() else PENDING
+
+    def collect(self, job_id):
+        """A finished job's result, forgetting the job; raises what the job raised"""
+        with self._lock:
+            future, _ = self._jobs.pop(job_id)
+        return future.result(timeout=0)
+
+    def cancel(self, job_id):
+        """Forget a job; it stops only if it has not started, and its result is dropped"""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job[0].cancel()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return sum(not future.done() for future, _ in self._jobs.values())
+
+    def _expire(self):
+        """Drop finished jobs nobody collected within ``ttl``; call under the lock"""
+        cutoff = time.monotonic() - self.ttl
+        for job_id in [job_id for job_id, (future, submitted) in self._jobs.items()
+                       if submitted < cutoff and future.done()]:
+            del self._jobs[job_id]
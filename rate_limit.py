@@ -0,0 +1,81 @@
+"""Hierarchical token-bucket rate limiting shared across app processes.
+
+A request must take a token from every level's bucket, e.g. the learner's,
+the topic's and the global one, or it takes none. Bucket states live in a
+``shared_cache.SharedCache`` and are read and written under one
+cross-process lease, so all workers draw from the same buckets. Buckets
+refill continuously at ``per_minute`` up to ``burst``; an idle bucket
+expires from the cache once it would be full again.
+
+If the cache is unavailable or the lease is contended past
+``wait_seconds``, requests are allowed: the limiter protects the Groq
+quota, and should not itself take quizzes down.
+"""
+import time
+
+from shared_cache import CacheError
+
+
+class RateLimited(Exception):
+    """A bucket at ``level`` had no token for the request"""
+
+    def __init__(self, level):
+        super().__init__(f"Rate limit reached ({level})")
+        self.level = level
+
+
+class RateLimiter:
+    """Token buckets per level, e.g. ``{"user": {"burst": 3, "per_minute": 2}, "global": {...}}``"""
+
+    def __init__(self, cache, limits, prefix='ratelimit', lock_seconds=2.0, wait_seconds=0.5):
+        self.cache = cache
+        self.limits = limits
+        self.prefix = prefix
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+
+    def _bucket_key(self, level, identifier):
+        return f"{self.prefix}:{level}:{identifier}"
+
+    @staticmethod
+    def _tokens(state, limit, now):
+        if state is None:
+            return float(limit['burst'])
+        tokens, updated = state
+        return min(float(limit['burst']), tokens + max(0.0, now - updated) * limit['per_minute'] / 60.0)
+
+    def try_acquire(self, keys, cost=1.0):
+        """Take ``cost`` tokens at every level; returns None, or the first level whose bucket is short
+
+        ``keys`` maps levels to identifiers (a learner ID, a topic); levels
+        without one, like "global", share a single bucket.
+        """
+        now = time.time()
+        buckets = {level: self._bucket_key(level, keys.get(level, '*')) for level in self.limits}
+        try:
+            with self.cache.lock(self.prefix, self.lock_seconds, self.wait_seconds) as held:
+                if not held:
+                    return None
+                available = {}
+                for level, limit in self.limits.items():
+                    available[level] = self._tokens(self.cache.get(buckets[level]), limit, now)
+                    if available[level] < cost:
+                        return level
+                for level, limit in self.limits.items():
+                    tokens = available[level] - cost
+                    refill_seconds = (limit['burst'] - tokens) * 60.0 / limit['per_minute']
+                    self.cache.set(buckets[level], (tokens, now), ttl=refill_seconds + 1.0)
+                return None
+        except CacheError:
+            return None
+
+    def snapshot(self, keys=None):
+        """Tokens currently available per level (for the admin dashboard)"""
+        keys = keys or {}
+        now = time.time()
+        try:
+            return {level: round(self._tokens(self.cache.get(self._bucket_key(level, keys.get(level, '*'))),
+                                              limit, now), 2)
+                    for level, limit in self.limits.items()}
+        except CacheError:
+            return {}
@@ -0,0 +1,295 @@
+"""Incremental session checkpoints so a learner can resume on another worker.
+
+Streamlit keeps session state in the worker's memory, so a crashed or
+redeployed worker loses every learner's quiz in progress. After each rerun
+a ``SessionCheckpointer`` compares the session models with what it last
+wrote and appends only the changed fields to the learner's log: usually a
+couple of scalars such as ``current_q`` and ``score``. Score histories
+contribute only their new entries. Question bodies are included when a
+quiz starts, because question IDs point into a per-process store. After
+``compact_after`` appends the log is replaced by one full snapshot, and
+loading replays the snapshot plus the diffs after it.
+
+Records are length-prefixed pickles, each written with a single
+``os.write`` to an ``O_APPEND`` file and not fsynced. That survives the
+worker process dying, which is the failure this guards against, but not
+the host losing power. A record torn by a crash mid-write is ignored on
+load. As with the shared cache, only point ``DATA_DIR`` at trusted storage.
+
+A session resumes with a resume token, ``<learner_id>.<secret>``, not the
+learner ID alone. Only a hash of the secret is stored, next to the log,
+and ``issue_resume`` replaces it, so each new token revokes the previous
+one. A checkpointer given the token's ``resume_stamp`` stops writing once
+another session has been issued a newer token for the same learner.
+"""
+import hashlib
+import hmac
+import os
+import pickle
+import re
+import secrets
+import struct
+import tempfile
+from array import array
+from collections import namedtuple
+
+from session_models import ScoreHistory
+
+_HEADER = struct.Struct('<I')
+
+# Score history entries from index ``start`` on; replaying truncates to ``start`` first
+ScoreTail = namedtuple('ScoreTail', 'start scores timestamps')
+
+
+def _copy(value):
+    """Detached copy of a field value, so later in-place edits show up as changes"""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+class CheckpointStore:
+    """One append-only checkpoint log per learner under ``directory``"""
+
+    _SAFE_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, learner_id):
+        if not self._SAFE_ID.match(learner_id):
+            raise ValueError(f"Invalid learner id {learner_id!r}")
+        return os.path.join(self.directory, f"{learner_id}.ckpt")
+
+    @staticmethod
+    def _encode(record):
+        payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        return _HEADER.pack(len(payload)) + payload
+
+    def append(self, learner_id, record):
+        """Append one record; returns the bytes written"""
+        data = self._encode(record)
+        fd = os.open(self._path(learner_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        return len(data)
+
+    def replace(self, learner_id, record):
+        """Atomically replace the learner's log with a single record; returns the bytes written"""
+        data = self._encode(record)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.ckpt-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(learner_id))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return len(data)
+
+    def records(self, learner_id):
+        """Records in the log, oldest first; stops at a truncated or unreadable record"""
+        try:
+            with open(self._path(learner_id), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        records = []
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            (length,) = _HEADER.unpack_from(data, offset)
+            start = offset + _HEADER.size
+            if start + length > len(data):
+                break
+            try:
+                records.append(pickle.loads(data[start:start + length]))
+            except Exception:
+                break
+            offset = start + length
+        return records
+
+    def load(self, learner_id):
+        """``(fields, questions)`` replayed from the log, or None if there is none
+
+        ``fields`` maps ``(model, field)`` to its latest value, with score
+        histories rebuilt as ``ScoreHistory``; ``questions`` maps question
+        IDs to question dicts.
+        """
+        records = self.records(learner_id)
+        if not records:
+            return None
+        fields, histories, questions = {}, {}, {}
+        for record in records:
+            if record.get('snapshot'):
+                fields, histories, questions = {}, {}, {}
+            for key, value in record['fields'].items():
+                if isinstance(value, ScoreTail):
+                    scores, timestamps = histories.setdefault(key, (array('f'), array('d')))
+                    del scores[value.start:], timestamps[value.start:]
+                    scores.extend(value.scores)
+                    timestamps.extend(value.timestamps)
+                else:
+                    fields[key] = value
+            questions.update(record.get('questions', {}))
+        for key, (scores, timestamps) in histories.items():
+            fields[key] = ScoreHistory(scores, timestamps)
+        return fields, questions
+
+    def exists(self, learner_id):
+        return os.path.exists(self._path(learner_id))
+
+    def _resume_path(self, learner_id):
+        return self._path(learner_id)[:-len('.ckpt')] + '.resume'
+
+    def issue_resume(self, learner_id):
+        """A new resume token for the learner, revoking any earlier one"""
+        secret = secrets.token_urlsafe(24)
+        digest = hashlib.sha256(secret.encode('ascii')).hexdigest()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.resume-')
+        try:
+            with os.fdopen(fd, 'w', encoding='ascii') as f:
+                f.write(digest)
+            os.replace(tmp_path, self._resume_path(learner_id))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return f"{learner_id}.{secret}"
+
+    def resume(self, token):
+        """Learner ID of a current resume token, or None for a malformed, revoked or unknown one"""
+        learner_id, _, secret = (token or '').partition('.')
+        if not secret or not self._SAFE_ID.match(learner_id):
+            return None
+        try:
+            with open(self._resume_path(learner_id), encoding='ascii') as f:
+                expected = f.read()
+        except FileNotFoundError:
+            return None
+        digest = hashlib.sha256(secret.encode('utf-8', 'replace')).hexdigest()
+        return learner_id if hmac.compare_digest(digest, expected) else None
+
+    def resume_stamp(self, learner_id):
+        """Changes whenever a resume token is issued for the learner; None before the first"""
+        try:
+            stat = os.stat(self._resume_path(learner_id))
+        except FileNotFoundError:
+            return None
+        # Each token is a new file; mtimes alone can tie within the clock's granularity
+        return stat.st_ino, stat.st_mtime_ns
+
+    def learner_ids(self):
+        """IDs of every learner with a log, streamed from the directory listing"""
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith('.ckpt') and self._SAFE_ID.match(entry.name[:-len('.ckpt')]):
+                    yield entry.name[:-len('.ckpt')]
+
+    def delete(self, learner_id):
+        for path in (self._path(learner_id), self._resume_path(learner_id)):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+class SessionCheckpointer:
+    """Tracks what one session last wrote and appends only the fields changed since
+
+    Fields named ``question_ids`` carry their question bodies from
+    ``question_store``, so another worker can rebuild the quiz. With a
+    ``resume_stamp``, the session is ``superseded`` and writes nothing more
+    once the learner's resume token has been reissued, e.g. to another tab.
+    """
+
+    def __init__(self, store, learner_id, question_store, compact_after=64, skip=(), resume_stamp=None):
+        self.store = store
+        self.learner_id = learner_id
+        self.question_store = question_store
+        self.compact_after = compact_after
+        self.skip = frozenset(skip)
+        self.resume_stamp = resume_stamp
+        self.superseded = False
+        self.appended = 0
+        self.snapshots = 0
+        self._written = {}
+        # Score histories are append-only: remember which object and how many entries were written
+        self._score_marks = {}
+
+    def _changes(self, models, full):
+        changed = {}
+        written = {}
+        marks = {}
+        for model_key, model in models.items():
+            for name in model.__slots__:
+                key = (model_key, name)
+                if key in self.skip:
+                    continue
+                value = getattr(model, name)
+                if isinstance(value, ScoreHistory):
+                    mark = self._score_marks.get(key)
+                    count = value.count
+                    if full or mark is None or mark[0] != id(value) or mark[1] > count:
+                        start = 0
+                    elif mark[1] == count:
+                        continue
+                    else:
+                        start = mark[1]
+                    changed[key] = ScoreTail(start, value.scores[start:], value.timestamps[start:])
+                    marks[key] = (id(value), count)
+                elif full or key not in self._written or self._written[key] != value:
+                    changed[key] = value
+                    written[key] = _copy(value)
+        return changed, written, marks
+
+    def checkpoint(self, models):
+        """Write this rerun's changes of ``models`` ({key: SlottedState}); returns the bytes written
+
+        The first checkpoint of a session, and every ``compact_after``-th
+        one after it, replaces the log with a full snapshot. If the write
+        fails nothing is marked as written, so the next call retries.
+        """
+        if self.resume_stamp is not None and not self.superseded:
+            self.superseded = self.store.resume_stamp(self.learner_id) != self.resume_stamp
+        if self.superseded:
+            return 0
+        full = not self._written or self.appended >= self.compact_after
+        changed, written, marks = self._changes(models, full)
+        if not changed:
+            return 0
+        record = {'fields': changed}
+        question_ids = [qid for (_, name), value in changed.items() if name == 'question_ids' for qid in value]
+        if question_ids:
+            questions = {qid: self.question_store.get(qid) for qid in question_ids}
+            record['questions'] = {qid: question for qid, question in questions.items() if question is not None}
+        if full:
+            record['snapshot'] = True
+            size = self.store.replace(self.learner_id, record)
+            self.appended = 0
+            self.snapshots += 1
+        else:
+            size = self.store.append(self.learner_id, record)
+            self.appended += 1
+        self._written.update(written)
+        self._score_marks.update(marks)
+        return size
+
+
+def restore_models(fields, model_classes):
+    """Session models rebuilt from ``CheckpointStore.load`` fields; models without fields are left out"""
+    data = {}
+    for (model_key, name), value in fields.items():
+        data.setdefault(model_key, {})[name] = value
+    return {key: model.from_dict(data[key]) for key, model in model_classes.items() if key in data}
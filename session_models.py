@@ -0,0 +1,199 @@
+"""Compact models for per-session learner state.
+
+Session state lives for as long as a learner keeps the tab open, and a
+Streamlit process holds every active session at once, so these models
+favour fixed-size typed storage and incrementally maintained aggregates
+over plain lists that are rescanned on every rerun. The state objects use
+``__slots__`` instead of per-instance dicts, and quiz state keeps question
+IDs into the shared ``QuestionStore`` rather than its own copies.
+"""
+import random
+import time
+import uuid
+from array import array
+from datetime import datetime
+
+
+class ScoreHistory:
+    """Quiz score history with O(1) count, sum, best and recent-window stats.
+
+    Scores are percentages in [0, 100] stored as float32 in a typed array
+    (4 bytes each instead of a boxed float per list slot), with a parallel
+    array of completion times in epoch seconds for charting. A 101-bucket
+    histogram of floored scores answers "how many quizzes scored at least
+    N%" without touching the history. Iterating, ``len()`` and truthiness
+    behave like the list this replaces.
+    """
+
+    __slots__ = ('scores', 'timestamps', 'total', 'best', 'histogram')
+
+    RECENT_WINDOW = 10
+
+    def __init__(self, scores=(), timestamps=None):
+        self.scores = array('f')
+        self.timestamps = array('d')
+        self.total = 0.0
+        self.best = 0.0
+        self.histogram = array('I', [0] * 101)
+        # Scores without recorded times are dated to when they were loaded
+        loaded_at = time.time()
+        if timestamps is None:
+            for score in scores:
+                self.append(score, loaded_at)
+        else:
+            for score, timestamp in zip(scores, timestamps):
+                self.append(score, timestamp)
+
+    def append(self, score, timestamp=None):
+        score = float(score)
+        self.scores.append(score)
+        self.timestamps.append(time.time() if timestamp is None else float(timestamp))
+        self.total += score
+        if len(self.scores) == 1 or score > self.best:
+            self.best = score
+        self.histogram[min(100, max(0, int(score)))] += 1
+
+    @property
+    def count(self):
+        return len(self.scores)
+
+    @property
+    def average(self):
+        return self.total / len(self.scores) if self.scores else 0.0
+
+    @property
+    def recent_average(self):
+        # The window is a fixed-size tail slice, so this stays O(1) in history length
+        recent = self.scores[-self.RECENT_WINDOW:]
+        return sum(recent) / len(recent) if recent else 0.0
+
+    def count_at_least(self, threshold):
+        """Number of scores >= an integer percentage threshold"""
+        return sum(self.histogram[max(0, int(threshold)):])
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __bool__(self):
+        return bool(self.scores)
+
+    def __iter__(self):
+        return iter(self.scores)
+
+    def __getitem__(self, index):
+        return self.scores[index]
+
+    def __repr__(self):
+        return f"ScoreHistory(count={self.count}, average={self.average:.1f}, best={self.best:.1f})"
+
+
+class SlottedState:
+    """Base for fixed-field session models that round-trip through plain dicts"""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from a dict, ignoring keys that are no longer part of the model"""
+        return cls(**{name: value for name, value in data.items() if name in cls.__slots__})
+
+    def update(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class UserData(SlottedState):
+    """Learner profile, progress and rewards"""
+
+    __slots__ = ('username', 'level', 'xp', 'tokens', 'completed_lessons', 'lesson_completed_at',
+                 'streak', 'last_login', 'achievements', 'quiz_scores', 'total_study_time', 'variant_seed',
+                 'learner_id', 'reviews', 'ability', 'ability_answers')
+
+    def __init__(self, username='', level=1, xp=0, tokens=0, completed_lessons=None,
+                 lesson_completed_at=None, streak=0, last_login=None, achievements=None,
+                 quiz_scores=None, total_study_time=0, variant_seed=None, learner_id=None, reviews=None,
+                 ability=0.0, ability_answers=0):
+        self.username = username
+        self.level = level
+        self.xp = xp
+        self.tokens = tokens
+        self.completed_lessons = list(completed_lessons or ())
+        self.lesson_completed_at = dict(lesson_completed_at or {})
+        self.streak = streak
+        self.last_login = last_login or datetime.now().isoformat()
+        self.achievements = list(achievements or ())
+        # Plain score lists (older sessions, imports) become the compact history
+        if not isinstance(quiz_scores, ScoreHistory):
+            quiz_scores = ScoreHistory(quiz_scores or ())
+        self.quiz_scores = quiz_scores
+        self.total_study_time = total_study_time
+        # Seeds this learner's question variants (see question_variants)
+        self.variant_seed = random.getrandbits(32) if variant_seed is None else variant_seed
+        # Keys this learner's on-disk state, e.g. the spaced-repetition schedule
+        self.learner_id = learner_id or uuid.uuid4().hex
+        # spaced_repetition.ReviewSchedule, loaded on first use
+        self.reviews = reviews
+        # Rasch ability estimate (logits) from quiz answers, see question_stats.update_ability
+        self.ability = ability
+        self.ability_answers = ability_answers
+
+
+class WalletState(SlottedState):
+    """Simulated testnet wallet connection"""
+
+    __slots__ = ('connected', 'address', 'network', 'balance')
+
+    def __init__(self, connected=False, address='', network='', balance=0):
+        self.connected = connected
+        self.address = address
+        self.network = network
+        self.balance = balance
+
+
+class QuizState(SlottedState):
+    """Progress through one quiz; questions are IDs into the shared QuestionStore"""
+
+    __slots__ = ('active', 'question_ids', 'current_q', 'score', 'topic', 'difficulty', 'start_time',
+                 'question_started', 'completed_at', 'job_id')
+
+    def __init__(self, active=False, question_ids=(), current_q=0, score=0, topic='',
+                 difficulty='intermediate', start_time=None, question_started=None, completed_at=None,
+                 job_id=None):
+        self.active = active
+        self.question_ids = tuple(question_ids)
+        self.current_q = current_q
+        self.score = score
+        self.topic = topic
+        self.difficulty = difficulty
+        self.start_time = start_time
+        self.question_started = question_started
+        self.completed_at = completed_at  # Set when the results are first shown and rewards granted
+        self.job_id = job_id  # Background build of the next quiz (see quiz_jobs), until it is collected
+
+
+class UiState(SlottedState):
+    """Per-session UI flags and the last captured profile"""
+
+    __slots__ = ('theme', 'show_advanced', 'is_admin', 'capture_cprofile',
+                 'last_cprofile_report', 'last_cprofile_path', 'script_runs')
+
+    def __init__(self, theme='light', show_advanced=False, is_admin=False, capture_cprofile=False,
+                 last_cprofile_report=None, last_cprofile_path=None, script_runs=0):
+        self.theme = theme
+        self.show_advanced = show_advanced
+        self.is_admin = is_admin
+        self.capture_cprofile = capture_cprofile
+        self.last_cprofile_report = last_cprofile_report
+        self.last_cprofile_path = last_cprofile_path
+        # Runs of the whole script in this session; only the first is a bare page load
+        self.script_runs = script_runs
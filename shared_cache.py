@@ -0,0 +1,419 @@
+"""Cache shared by every app process on a host (or, with Redis, a fleet).
+
+``st.cache_resource`` is per process, so each worker behind a load balancer
+would otherwise regenerate the same entries. Backends implement a few
+primitives (get, set, delete and a lease-style lock); ``get_or_compute``
+builds single-flight semantics on them: the first worker to miss takes the
+lock and computes, and the others wait for its result instead of computing
+it too. If the holder fails or its lease expires, a waiter takes over.
+``share_in_flight`` merges only calls that overlap: nothing is cached once
+the computation ends, so a later call always computes afresh.
+
+``open_cache`` picks a backend from a URL-ish setting:
+
+- ``sqlite`` (default) or ``sqlite:<path>``: a WAL-mode SQLite file, shared
+  by local processes
+- ``redis://[:password@]host[:port][/db]``: any server speaking the Redis
+  protocol, e.g. ``python -m benchmarks.fake_redis``
+- ``memory``: this process only (tests, single-worker setups)
+
+Values are pickled, so only point the Redis backend at a trusted server.
+"""
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import unquote, urlparse
+
+_MISSING = object()
+
+
+class CacheError(Exception):
+    """The cache backend could not be reached or answered with an error"""
+
+
+class SharedCache:
+    """Base class; backends implement _get, set, delete, _acquire, _release and _holder"""
+
+    poll_interval = 0.05
+
+    def get(self, key, default=None):
+        value = self._get(key)
+        return default if value is _MISSING else value
+
+    def get_or_compute(self, key, compute, ttl=None, lock_seconds=30.0, wait_seconds=None):
+        """Cached value for ``key``, computing and storing it at most once across processes
+
+        ``lock_seconds`` bounds how long a crashed holder can block others;
+        waiters give up after ``wait_seconds`` (default ``lock_seconds``) and
+        compute locally. Exceptions from ``compute`` propagate and nothing is
+        cached. If the backend is unavailable the value is simply computed.
+        """
+        try:
+            value = self._get(key)
+            if value is not _MISSING:
+                return value
+            token = uuid.uuid4().hex
+            deadline = time.monotonic() + (lock_seconds if wait_seconds is None else wait_seconds)
+            while not self._acquire(key, token, lock_seconds):
+                # Another process is computing this entry; wait for its result
+                time.sleep(self.poll_interval)
+                value = self._get(key)
+                if value is not _MISSING:
+                    return value
+                if time.monotonic() >= deadline:
+                    return compute()
+        except CacheError:
+            return compute()
+        try:
+            # The previous holder may have stored the value just before we got the lock
+            try:
+                value = self._get(key)
+            except CacheError:
+                value = _MISSING
+            if value is _MISSING:
+                value = compute()
+                try:
+                    self.set(key, value, ttl)
+                except CacheError:
+                    pass
+            return value
+        finally:
+            try:
+                self._release(key, token)
+            except CacheError:
+                pass
+
+    def share_in_flight(self, key, compute, lock_seconds=30.0, wait_seconds=None):
+        """Result of ``compute``, shared only with callers that ask for ``key`` while it is running
+
+        The first caller takes a lease on ``key`` and publishes its result
+        under the lease's token, which only callers that saw that lease held
+        look up; whoever arrives after the lease is released computes again.
+        ``wait_seconds`` (default ``lock_seconds``) is each caller's budget:
+        the token carries when the holder's runs out, and a waiter gives up at
+        that moment, or at the end of its own budget if sooner, and computes
+        locally. A late joiner thus waits only for what is left of the holder's
+        budget. Callers also compute locally if the backend is unavailable.
+        """
+        budget = lock_seconds if wait_seconds is None else wait_seconds
+        deadline = time.monotonic() + budget
+        try:
+            watched = None
+            while True:
+                # Holders publish before releasing, so read the holder first and its result second
+                holder = self._holder(key)
+                for owner in {watched, holder} - {None}:
+                    value = self._get(f'{key}@{owner}')
+                    if value is not _MISSING:
+                        return value
+                if holder is None:
+                    token = f'{uuid.uuid4().hex}-{time.time() + budget:.3f}'
+                    if self._acquire(key, token, lock_seconds):
+                        break
+                elif holder != watched:
+                    try:
+                        remaining = float(holder.rpartition('-')[2]) - time.time()
+                    except ValueError:
+                        remaining = budget
+                    deadline = min(deadline, time.monotonic() + remaining)
+                watched = holder
+                if time.monotonic() >= deadline:
+                    return compute()
+                time.sleep(self.poll_interval)
+        except CacheError:
+            return compute()
+        try:
+            value = compute()
+            try:
+                # Kept only as long as a waiter can still be waiting for it
+                self.set(f'{key}@{token}', value, lock_seconds)
+            except CacheError:
+                pass
+            return value
+        finally:
+            try:
+                self._release(key, token)
+            except CacheError:
+                pass
+
+    @contextmanager
+    def lock(self, key, lock_seconds=5.0, wait_seconds=1.0):
+        """Hold a cross-process lease on ``key``; yields False if it was not free within ``wait_seconds``"""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait_seconds
+        while not self._acquire(key, token, lock_seconds):
+            if time.monotonic() >= deadline:
+                yield False
+                return
+            time.sleep(self.poll_interval)
+        try:
+            yield True
+        finally:
+            try:
+                self._release(key, token)
+            except CacheError:
+                pass
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def _acquire(self, key, token, lock_seconds):
+        raise NotImplementedError
+
+    def _release(self, key, token):
+        raise NotImplementedError
+
+    def _holder(self, key):
+        """Token of the live lease on ``key``, or None"""
+        raise NotImplementedError
+
+
+class MemoryCache(SharedCache):
+    """Process-local backend with the same semantics"""
+
+    def __init__(self):
+        self._values = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            value, expires = self._values.get(key, (_MISSING, None))
+            if expires is not None and expires <= time.time():
+                del self._values[key]
+                return _MISSING
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def _acquire(self, key, token, lock_seconds):
+        now = time.time()
+        with self._lock:
+            holder = self._locks.get(key)
+            if holder is not None and holder[1] > now:
+                return False
+            self._locks[key] = (token, now + lock_seconds)
+            return True
+
+    def _release(self, key, token):
+        with self._lock:
+            if self._locks.get(key, (None,))[0] == token:
+                del self._locks[key]
+
+    def _holder(self, key):
+        with self._lock:
+            holder = self._locks.get(key)
+        return holder[0] if holder is not None and holder[1] > time.time() else None
+
+
+_SQLITE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)",
+    "CREATE TABLE IF NOT EXISTS cache_locks (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+)
+
+
+class SQLiteCache(SharedCache):
+    """Backend on a WAL-mode SQLite file; one connection per thread"""
+
+    purge_every = 200
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        try:
+            for statement in _SQLITE_SCHEMA:
+                conn.execute(statement)
+        except sqlite3.Error as e:
+            raise CacheError(f"Cannot initialise cache {path}: {e}") from e
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.Error as e:
+                raise CacheError(f"Cannot open cache {self.path}: {e}") from e
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql, params=()):
+        try:
+            return self._conn().execute(sql, params)
+        except sqlite3.Error as e:
+            raise CacheError(str(e)) from e
+
+    def _get(self, key):
+        row = self._execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return _MISSING
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        self._execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                      (key, sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)), now + ttl if ttl else None))
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self._execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,))
+
+    def delete(self, key):
+        self._execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _acquire(self, key, token, lock_seconds):
+        now = time.time()
+        # Insert the lease, or take it over if the current one has expired; rowcount says which happened
+        cursor = self._execute(
+            "INSERT INTO cache_locks (key, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE cache_locks.expires <= ?",
+            (key, token, now + lock_seconds, now))
+        return cursor.rowcount == 1
+
+    def _release(self, key, token):
+        self._execute("DELETE FROM cache_locks WHERE key = ? AND owner = ?", (key, token))
+
+    def _holder(self, key):
+        row = self._execute("SELECT owner FROM cache_locks WHERE key = ? AND expires > ?",
+                            (key, time.time())).fetchone()
+        return None if row is None else row[0]
+
+
+class RedisCache(SharedCache):
+    """Backend speaking the Redis protocol (RESP) over one socket per thread
+
+    Uses only GET, SET (NX/PX), DEL, AUTH, SELECT and one EVAL script (an
+    atomic compare-and-delete of a lease), so small stand-ins work as well
+    as Redis itself.
+    """
+
+    # Deletes a lease only while it still holds our token, so a lease that
+    # expired and was taken over by another worker is left alone
+    release_script = ("if redis.call('GET', KEYS[1]) == ARGV[1] then "
+                      "return redis.call('DEL', KEYS[1]) else return 0 end")
+
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None, timeout=2.0, prefix='crossfi:'):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.prefix = prefix
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            connection = self._local.connection = (sock, sock.makefile('rb'))
+            if self.password:
+                self._command('AUTH', self.password)
+            if self.db:
+                self._command('SELECT', self.db)
+        return connection
+
+    def _command(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        try:
+            sock, reader = self._connection()
+            sock.sendall(b''.join(parts))
+            return self._read_reply(reader)
+        except OSError as e:
+            self._disconnect()
+            raise CacheError(f"Redis at {self.host}:{self.port} unavailable: {e}") from e
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode('utf-8')
+        if kind == b'-':
+            raise CacheError(payload.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            return None if length < 0 else [self._read_reply(reader) for _ in range(length)]
+        raise CacheError(f"Unexpected Redis reply {line!r}")
+
+    def _disconnect(self):
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            connection[1].close()
+            connection[0].close()
+
+    def _get(self, key):
+        data = self._command('GET', self.prefix + key)
+        return _MISSING if data is None else pickle.loads(data)
+
+    def set(self, key, value, ttl=None):
+        args = ['SET', self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)]
+        if ttl:
+            args += ['PX', int(ttl * 1000)]
+        self._command(*args)
+
+    def delete(self, key):
+        self._command('DEL', self.prefix + key)
+
+    def _acquire(self, key, token, lock_seconds):
+        return self._command('SET', f'{self.prefix}lock:{key}', token, 'NX', 'PX', int(lock_seconds * 1000)) == 'OK'
+
+    def _release(self, key, token):
+        self._command('EVAL', self.release_script, 1, f'{self.prefix}lock:{key}', token)
+
+    def _holder(self, key):
+        token = self._command('GET', f'{self.prefix}lock:{key}')
+        return None if token is None else token.decode('utf-8')
+
+
+def open_cache(url, default_path):
+    """Backend for a ``SHARED_CACHE_URL`` setting; ``default_path`` is the SQLite file for plain ``sqlite``"""
+    url = (url or 'sqlite').strip()
+    if url == 'memory':
+        return MemoryCache()
+    if url == 'sqlite':
+        return SQLiteCache(default_path)
+    if url.startswith('sqlite:'):
+        return SQLiteCache(url[len('sqlite:'):])
+    if url.startswith('redis://'):
+        parsed = urlparse(url)
+        return RedisCache(
+            host=parsed.hostname or '127.0.0.1',
+            port=parsed.port or 6379,
+            db=int(parsed.path.strip('/') or 0),
+            password=unquote(parsed.password) if parsed.password else None
+        )
+    raise ValueError(f"Unsupported shared cache URL {url!r}")
@@ -0,0 +1,289 @@
+"""Per-learner SM-2 spaced repetition over banked quiz questions.
+
+Each answered question becomes a ``ReviewItem`` with the classic SM-2
+easiness factor, interval and repetition count. Items are grouped into
+decks (quiz topics), each with a min-heap keyed by due time, so "next N
+due" pops at most N live entries plus any stale ones instead of scanning
+the learner's history. Rescheduling pushes a new heap entry and leaves the
+old one to be skipped lazily; heaps are rebuilt when stale entries outnumber
+live ones.
+
+``ReviewSchedule.to_bytes()`` packs the state into 29 bytes per item for the
+on-disk ``ReviewStore``. Saving after an answer appends only the items it
+changed to the learner's log, and every ``compact_after`` records the
+snapshot is rewritten and the log emptied, so a save costs the same however
+long the learner's history is. The store also keeps one JSON copy of each reviewed
+question, shared by all learners, so a review can be served by a process
+whose in-memory question store never saw it.
+"""
+import heapq
+import json
+import os
+import re
+import struct
+import tempfile
+import time
+
+DAY = 86400.0
+
+# SM-2 answer quality (0-5) for quiz outcomes
+QUALITY_CORRECT = 4
+QUALITY_INCORRECT = 1
+QUALITY_SKIPPED = 0
+
+_MAGIC = b'XFSR'
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHH')
+_DECK_NAME = struct.Struct('<H')
+_ITEM_COUNT = struct.Struct('<I')
+# question ID (8 raw bytes), deck index, easiness, interval days, repetitions, lapses, due (epoch seconds)
+_ITEM = struct.Struct('<8sBffHHd')
+# Appended after the snapshot: an item as above, with its deck name (length, then UTF-8 bytes) for the index
+_LOG_ITEM = struct.Struct('<8sffHHdH')
+
+
+class ReviewItem:
+    """SM-2 state for one question"""
+
+    __slots__ = ('qid', 'deck', 'easiness', 'interval', 'repetitions', 'lapses', 'due')
+
+    def __init__(self, qid, deck, easiness=2.5, interval=0.0, repetitions=0, lapses=0, due=0.0):
+        self.qid = qid
+        self.deck = deck
+        self.easiness = easiness
+        self.interval = interval
+        self.repetitions = repetitions
+        self.lapses = lapses
+        self.due = due
+
+    def review(self, quality, now):
+        """Apply one graded answer (0-5) per SM-2 and set the next due time"""
+        if quality >= 3:
+            if self.repetitions == 0:
+                self.interval = 1.0
+            elif self.repetitions == 1:
+                self.interval = 6.0
+            else:
+                self.interval = round(self.interval * self.easiness, 2)
+            self.repetitions += 1
+        else:
+            self.repetitions = 0
+            self.interval = 1.0
+            self.lapses += 1
+        self.easiness = max(1.3, self.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        self.due = now + self.interval * DAY
+
+
+class ReviewSchedule:
+    """One learner's review items with a due-time heap per deck"""
+
+    __slots__ = ('items', '_heaps', '_stale', 'changed', 'logged')
+
+    def __init__(self):
+        self.items = {}
+        self._heaps = {}
+        self._stale = 0
+        # IDs of items changed since the last save, and records in the store's log after its snapshot
+        self.changed = set()
+        self.logged = 0
+
+    def record(self, qid, deck, quality, now=None):
+        """Grade an answer to ``qid`` and reschedule it"""
+        now = time.time() if now is None else now
+        item = self.items.get(qid)
+        if item is None:
+            item = self.items[qid] = ReviewItem(qid, deck)
+        else:
+            self._stale += 1
+        item.review(quality, now)
+        self._push(item)
+        self.changed.add(qid)
+        if self._stale > len(self.items):
+            self._rebuild()
+
+    def _push(self, item):
+        heapq.heappush(self._heaps.setdefault(item.deck, []), (item.due, item.qid))
+
+    def _rebuild(self):
+        self._heaps = {}
+        for item in self.items.values():
+            self._heaps.setdefault(item.deck, []).append((item.due, item.qid))
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+        self._stale = 0
+
+    def due(self, deck, count, now=None):
+        """Up to ``count`` question IDs in ``deck`` that are due, most overdue first"""
+        now = time.time() if now is None else now
+        heap = self._heaps.get(deck)
+        if not heap:
+            return []
+        live = []
+        while heap and len(live) < count and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            item = self.items.get(entry[1])
+            if item is not None and item.due == entry[0]:
+                live.append(entry)
+            else:
+                self._stale -= 1
+        # Due items stay scheduled until they are answered
+        for entry in live:
+            heapq.heappush(heap, entry)
+        return [qid for _, qid in live]
+
+    @property
+    def dirty(self):
+        return bool(self.changed)
+
+    def __len__(self):
+        return len(self.items)
+
+    def to_bytes(self):
+        decks = sorted({item.deck for item in self.items.values()})
+        deck_index = {deck: i for i, deck in enumerate(decks)}
+        parts = [_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(decks))]
+        for deck in decks:
+            name = deck.encode('utf-8')
+            parts.append(_DECK_NAME.pack(len(name)) + name)
+        parts.append(_ITEM_COUNT.pack(len(self.items)))
+        for item in self.items.values():
+            parts.append(_ITEM.pack(bytes.fromhex(item.qid), deck_index[item.deck], item.easiness,
+                                    item.interval, item.repetitions, item.lapses, item.due))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, deck_count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError("Unsupported review schedule format")
+        offset = _HEADER.size
+        decks = []
+        for _ in range(deck_count):
+            (length,) = _DECK_NAME.unpack_from(data, offset)
+            offset += _DECK_NAME.size
+            decks.append(data[offset:offset + length].decode('utf-8'))
+            offset += length
+        (item_count,) = _ITEM_COUNT.unpack_from(data, offset)
+        offset += _ITEM_COUNT.size
+        schedule = cls()
+        for qid, deck, easiness, interval, repetitions, lapses, due in _ITEM.iter_unpack(
+                data[offset:offset + item_count * _ITEM.size]):
+            item = ReviewItem(qid.hex(), decks[deck], easiness, interval, repetitions, lapses, due)
+            schedule.items[item.qid] = item
+        schedule._rebuild()
+        return schedule
+
+
+def _pack_log_item(item):
+    deck = item.deck.encode('utf-8')
+    return _LOG_ITEM.pack(bytes.fromhex(item.qid), item.easiness, item.interval, item.repetitions,
+                          item.lapses, item.due, len(deck)) + deck
+
+
+class ReviewStore:
+    """A snapshot and an append-only log of review state per learner, plus the bodies of reviewed questions"""
+
+    _SAFE_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+    _QUESTION_ID = re.compile(r'^[0-9a-f]{16}$')
+
+    def __init__(self, directory, compact_after=64):
+        self.directory = directory
+        self.compact_after = compact_after
+
+    def _path(self, learner_id):
+        if not self._SAFE_ID.match(learner_id):
+            raise ValueError(f"Invalid learner id {learner_id!r}")
+        return os.path.join(self.directory, f"{learner_id}.srs")
+
+    def _question_path(self, qid):
+        if not self._QUESTION_ID.match(qid):
+            raise ValueError(f"Invalid question id {qid!r}")
+        return os.path.join(self.directory, 'questions', f"{qid}.json")
+
+    def save_question(self, qid, question):
+        """Keep a reviewed question's body; IDs are content hashes, so each is written once"""
+        path = self._question_path(qid)
+        if os.path.exists(path):
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.question-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(dict(question), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load_question(self, qid):
+        """A question saved with ``save_question``, or None"""
+        try:
+            with open(self._question_path(qid), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def load(self, learner_id):
+        """Saved schedule for a learner (snapshot plus log), or an empty one"""
+        path = self._path(learner_id)
+        try:
+            with open(path, 'rb') as f:
+                schedule = ReviewSchedule.from_bytes(f.read())
+        except FileNotFoundError:
+            schedule = ReviewSchedule()
+        try:
+            with open(path + '.log', 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return schedule
+        offset = 0
+        # Later records replace earlier ones; a record torn by a crash mid-append ends the log
+        while offset + _LOG_ITEM.size <= len(data):
+            qid, easiness, interval, repetitions, lapses, due, deck_length = _LOG_ITEM.unpack_from(data, offset)
+            start = offset + _LOG_ITEM.size
+            if start + deck_length > len(data):
+                break
+            deck = data[start:start + deck_length].decode('utf-8')
+            item = ReviewItem(qid.hex(), deck, easiness, interval, repetitions, lapses, due)
+            schedule.items[item.qid] = item
+            schedule.logged += 1
+            offset = start + deck_length
+        schedule._rebuild()
+        return schedule
+
+    def save(self, learner_id, schedule):
+        """Persist the items changed since the schedule was loaded or saved
+
+        Appends them to the learner's log, or rewrites the snapshot and empties the
+        log once it would hold more than ``compact_after`` records.
+        """
+        if not schedule.changed:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(learner_id)
+        if schedule.logged + len(schedule.changed) > self.compact_after:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.srs-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(schedule.to_bytes())
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            # A crash before this leaves log records that repeat what the snapshot already holds
+            try:
+                os.unlink(path + '.log')
+            except FileNotFoundError:
+                pass
+            schedule.logged = 0
+        else:
+            data = b''.join(_pack_log_item(schedule.items[qid]) for qid in schedule.changed)
+            # One write to an O_APPEND file, as in session_checkpoint
+            fd = os.open(path + '.log', os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            schedule.logged += len(schedule.changed)
+        schedule.changed.clear()
@@ -0,0 +1,241 @@
+"""Process-wide metrics for LLM calls with Prometheus text export.
+
+Counters and histograms live in a module-level registry so every session
+in the Streamlit process reports into the same series. ``start_metrics_server``
+serves them at ``/metrics`` on localhost for a Prometheus scraper, and the
+process readiness check (see ``set_readiness_check``) at ``/ready``.
+"""
+import bisect
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return dict(self.values)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self.samples().items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def samples(self):
+        with self._lock:
+            return {key: {'counts': list(s['counts']), 'sum': s['sum'], 'count': s['count']}
+                    for key, s in self.series.items()}
+
+    def quantile(self, q, series):
+        """Estimate a quantile from one series' bucket counts (linear within a bucket)"""
+        if not series['count']:
+            return 0.0
+        rank = q * series['count']
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets + (float('inf'),), series['counts']):
+            if count and seen + count >= rank:
+                if upper == float('inf'):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for key, series in sorted(self.samples().items()):
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float('inf'),), series['counts']):
+                cumulative += count
+                le = '+Inf' if upper == float('inf') else repr(upper)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {series["sum"]}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {series["count"]}')
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+LLM_LABELS = ('model', 'topic', 'difficulty')
+
+LLM_REQUESTS = REGISTRY.counter(
+    'crossfi_llm_requests_total', 'Groq chat completion calls by outcome', LLM_LABELS + ('outcome',))
+LLM_LATENCY = REGISTRY.histogram(
+    'crossfi_llm_request_latency_seconds', 'Groq chat completion latency', LLM_LABELS)
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    'crossfi_llm_prompt_tokens_total', 'Prompt tokens reported by Groq usage', LLM_LABELS)
+LLM_COMPLETION_TOKENS = REGISTRY.counter(
+    'crossfi_llm_completion_tokens_total', 'Completion tokens reported by Groq usage', LLM_LABELS)
+LLM_COST = REGISTRY.counter(
+    'crossfi_llm_cost_usd_total', 'Estimated Groq spend from token usage', LLM_LABELS)
+LLM_PARSE = REGISTRY.counter(
+    'crossfi_llm_parse_total', 'Quiz JSON parse attempts by result (ok, partial, error)', LLM_LABELS + ('result',))
+LLM_QUESTIONS = REGISTRY.counter(
+    'crossfi_llm_questions_total', 'Generated questions by validation outcome', LLM_LABELS + ('outcome',))
+QUIZ_FALLBACKS = REGISTRY.counter(
+    'crossfi_quiz_fallback_total', 'Quizzes not served by a live Groq call',
+    ('topic', 'difficulty', 'reason', 'source'))
+
+
+def record_llm_call(model, topic, difficulty, outcome, latency, usage=None, cost_per_1k_tokens=0.0):
+    """Record one Groq call: outcome, latency and token usage if the response had any"""
+    labels = {'model': model, 'topic': topic, 'difficulty': difficulty}
+    LLM_REQUESTS.inc(outcome=outcome, **labels)
+    LLM_LATENCY.observe(latency, **labels)
+    if usage is not None:
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        LLM_PROMPT_TOKENS.inc(prompt_tokens, **labels)
+        LLM_COMPLETION_TOKENS.inc(completion_tokens, **labels)
+        LLM_COST.inc((prompt_tokens + completion_tokens) / 1000 * cost_per_1k_tokens, **labels)
+
+
+def record_parse(model, topic, difficulty, result):
+    LLM_PARSE.inc(model=model, topic=topic, difficulty=difficulty, result=result)
+
+
+def record_questions(model, topic, difficulty, valid, repaired, rejected):
+    """Count a reply's questions that were valid as sent, repaired or rejected"""
+    labels = {'model': model, 'topic': topic, 'difficulty': difficulty}
+    for outcome, count in (('valid', valid), ('repaired', repaired), ('rejected', rejected)):
+        if count:
+            LLM_QUESTIONS.inc(count, outcome=outcome, **labels)
+
+
+def record_fallback(topic, difficulty, reason, source):
+    QUIZ_FALLBACKS.inc(topic=topic, difficulty=difficulty, reason=reason, source=source)
+
+
+_readiness_check = None
+
+
+def set_readiness_check(check):
+    """Register a callable returning ``{'ready': bool, ...}`` for this process"""
+    global _readiness_check
+    _readiness_check = check
+
+
+def readiness():
+    """Process readiness; not ready until a check has been registered"""
+    check = _readiness_check
+    return check() if check is not None else {'ready': False, 'pending': ['startup']}
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/metrics':
+            self._send(200, 'text/plain; version=0.0.4; charset=utf-8', self.registry.render())
+        elif path == '/ready':
+            status = readiness()
+            # 503 keeps load balancers from routing to a worker that is still warming up
+            self._send(200 if status['ready'] else 503, 'application/json', json.dumps(status))
+        else:
+            self.send_error(404)
+
+    def _send(self, code, content_type, text):
+        body = text.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve ``/metrics`` and ``/ready`` from a daemon thread; returns None if the port is taken"""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,110 @@
+"""Event log flushing, partitioning and compaction"""
+import os
+import time
+
+import pytest
+
+from event_log import EventLog, _try_lock, learner_key
+
+DAY = 86400.0
+DAY_ONE = 1_700_006_400.0  # 2023-11-15 00:00 UTC
+
+
+@pytest.fixture
+def log(tmp_path):
+    return EventLog(str(tmp_path / 'events'), flush_interval=3600)
+
+
+def record_flushes(log, flushes, per_flush=3, day=DAY_ONE):
+    for i in range(flushes):
+        for j in range(per_flush):
+            log.record('quiz_answered', f"learner{j}", ts=day + i * 60 + j, topic='DeFi', correct=j % 2)
+        log.flush()
+
+
+def test_flushed_events_are_read_back_by_day(log):
+    log.record('lesson_completed', 'ada', ts=DAY_ONE, lesson=3, tokens=5.0)
+    log.record('quiz_completed', 'ada', ts=DAY_ONE + DAY, score=80.0)
+    assert log.flush() == 2 and log.pending == 0
+
+    assert list(log.partitions()) == ['2023-11-15', '2023-11-16']
+    table = log.read(['event', 'learner', 'lesson'], since='2023-11-16')
+    assert table.column('event').to_pylist() == ['quiz_completed']
+    assert table.column('learner').to_pylist() == [learner_key('ada')]
+    assert log.read(['lesson'], until='2023-11-15').column('lesson').to_pylist() == [3]
+
+
+def test_unknown_events_are_rejected(log):
+    with pytest.raises(ValueError):
+        log.record('signed_up', 'ada')
+
+
+def test_compaction_merges_finished_days(log):
+    record_flushes(log, 4)
+    record_flushes(log, 2, day=DAY_ONE + DAY)
+    assert log.compact(before='2023-11-16') == 3
+    partitions = log.partitions()
+    assert [os.path.basename(path).startswith('compacted-') for path in partitions['2023-11-15']] == [True]
+    assert len(partitions['2023-11-16']) == 2
+    assert log.read().num_rows == 18
+    assert log.compact(before='2023-11-16') == 0
+
+
+def test_parts_left_beside_a_compacted_file_are_counted_once(log, monkeypatch):
+    record_flushes(log, 3)
+    # As if a reader listed the day between the compacted file's rename and the parts' removal
+    monkeypatch.setattr('event_log.os.unlink', lambda path: None)
+    log.compact(before='2023-11-16')
+    monkeypatch.undo()
+    assert len(log.partitions()['2023-11-15']) == 4
+    assert log.read().num_rows == 9
+
+
+def test_read_racing_a_compaction_lists_the_day_again(log, monkeypatch):
+    record_flushes(log, 3)
+    stale = log.partitions()
+    log.compact(before='2023-11-16')
+    listings = [stale]
+    fresh = log.partitions
+    monkeypatch.setattr(log, 'partitions', lambda since=None, until=None: listings.pop() if listings
+                        else fresh(since, until))
+    assert log.read().num_rows == 9
+
+
+def test_compaction_is_skipped_while_another_holds_the_lock(log):
+    record_flushes(log, 2)
+    with open(os.path.join(log.directory, '.compact.lock'), 'w') as held:
+        assert _try_lock(held)
+        assert log.compact(before='2023-11-16') is None
+    assert log.compact(before='2023-11-16') == 1
+
+
+def test_failed_flush_keeps_events_in_order(log, monkeypatch):
+    log.record('quiz_started', 'ada', ts=DAY_ONE)
+    monkeypatch.setattr(log, 'write_table', lambda table: (_ for _ in ()).throw(OSError("disk full")))
+    with pytest.raises(OSError):
+        log.flush()
+    log.record('quiz_answered', 'ada', ts=DAY_ONE + 1)
+    monkeypatch.undo()
+    assert log.flush() == 2
+    assert log.read(['event']).column('event').to_pylist() == ['quiz_started', 'quiz_answered']
+
+
+def test_flush_thread_survives_a_failed_flush(tmp_path, monkeypatch):
+    log = EventLog(str(tmp_path / 'events'), flush_interval=0.05)
+    failures = []
+    write_table = log.write_table
+
+    def fail_once(table):
+        if not failures:
+            failures.append(table.num_rows)
+            raise RuntimeError("unexpected")
+        write_table(table)
+
+    monkeypatch.setattr(log, 'write_table', fail_once)
+    log.record('quiz_started', 'ada', ts=DAY_ONE)
+    deadline = time.monotonic() + 5
+    while log.flushes == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert failures == [1] and log.flushes == 1
+    assert log.read().num_rows == 1
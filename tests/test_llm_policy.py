@@ -0,0 +1,116 @@
+"""Circuit breaker states and the generation policy's deadline and hedging"""
+import time
+
+import pytest
+
+from llm_policy import CircuitBreaker, CircuitOpenError, DeadlineExceeded, GenerationPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, **kwargs):
+    settings = dict(window_size=10, min_calls=4, error_rate_threshold=0.5, p95_latency_threshold=5.0, cooldown=30.0)
+    settings.update(kwargs)
+    return CircuitBreaker(clock=clock, **settings)
+
+
+def test_breaker_trips_on_error_rate_only_after_min_calls():
+    breaker = make_breaker(FakeClock())
+    for _ in range(3):
+        breaker.record_failure(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_breaker_trips_on_p95_latency():
+    breaker = make_breaker(FakeClock())
+    for _ in range(4):
+        breaker.record_success(6.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_allows_one_probe_and_closes_on_a_fast_success():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker._trip()
+    clock.now = 29.0
+    assert not breaker.allow_request()
+    clock.now = 30.0
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_success(1.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()['calls'] == 0
+
+
+@pytest.mark.parametrize('outcome', ['failure', 'slow'])
+def test_failed_or_slow_probe_reopens(outcome):
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker._trip()
+    clock.now = 30.0
+    assert breaker.allow_request()
+    if outcome == 'failure':
+        breaker.record_failure(1.0)
+    else:
+        breaker.record_success(6.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_at == 30.0
+
+
+def test_policy_returns_result_and_passes_the_budget():
+    policy = GenerationPolicy(deadline=2.0)
+    budgets = []
+    assert policy.call(lambda budget: budgets.append(budget) or 'ok') == 'ok'
+    assert budgets == [2.0]
+    assert policy.breaker.snapshot()['calls'] == 1
+
+
+def test_policy_deadline_records_a_failure():
+    policy = GenerationPolicy(deadline=0.1)
+    with pytest.raises(DeadlineExceeded):
+        policy.call(lambda budget: time.sleep(0.5))
+    assert policy.breaker.snapshot()['error_rate'] == 1.0
+
+
+def test_policy_reraises_the_attempts_error():
+    policy = GenerationPolicy(deadline=1.0)
+
+    def fail(budget):
+        raise ValueError("bad reply")
+
+    with pytest.raises(ValueError, match="bad reply"):
+        policy.call(fail)
+
+
+def test_policy_hedges_a_slow_first_attempt():
+    policy = GenerationPolicy(deadline=2.0, hedge_after=0.1)
+    calls = []
+
+    def attempt(budget):
+        calls.append(budget)
+        if len(calls) == 1:
+            time.sleep(1.0)
+            return 'slow'
+        return 'hedge'
+
+    started = time.monotonic()
+    assert policy.call(attempt) == 'hedge'
+    assert time.monotonic() - started < 0.9
+    assert len(calls) == 2 and calls[1] < 2.0
+
+
+def test_open_circuit_does_not_call():
+    policy = GenerationPolicy(breaker=make_breaker(FakeClock()))
+    policy.breaker._trip()
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda budget: pytest.fail("called while open"))
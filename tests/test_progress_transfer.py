@@ -0,0 +1,150 @@
+"""Bulk progress export and import"""
+import csv
+import io
+import json
+
+import pytest
+
+from event_log import EventLog, learner_key
+from progress_transfer import export_progress, import_file, validate_event, validate_progress, write_resume_links
+from question_bank import QuestionStore
+from session_checkpoint import CheckpointStore, SessionCheckpointer, restore_models
+from session_models import QuizState, UserData, WalletState
+
+# The address formats the app's wallet connect buttons create
+WALLETS = [
+    ('0x0007d6bef2f11dcb', 'CrossFi Testnet'),
+    ('crossfi12345678901', 'CrossFi Chain'),
+    ('xfi1234567890123', 'XFI Network'),
+]
+
+
+def checkpoint_learners(store):
+    learner_ids = []
+    for i, (address, network) in enumerate(WALLETS):
+        user_data = UserData(username=f"learner{i}", xp=100 * i, tokens=10 + i, completed_lessons=[1, 2])
+        user_data.lesson_completed_at = {1: 1_700_000_000.0, 2: 1_700_000_100.0}
+        user_data.achievements = ['first_lesson']
+        user_data.quiz_scores.append(75.0, 1_700_000_200.0)
+        wallet = WalletState()
+        wallet.update(connected=True, address=address, network=network, balance=12.5)
+        SessionCheckpointer(store, user_data.learner_id, QuestionStore()).checkpoint(
+            {'user_data': user_data, 'wallet': wallet, 'quiz_state': QuizState()})
+        learner_ids.append(user_data.learner_id)
+    return learner_ids
+
+
+def restored(store, learner_id):
+    return restore_models(store.load(learner_id)[0], {'user_data': UserData, 'wallet': WalletState})
+
+
+@pytest.mark.parametrize('fmt', ['jsonl', 'csv'])
+def test_exported_progress_imports_into_a_fresh_store(tmp_path, fmt):
+    source = CheckpointStore(str(tmp_path / 'source'))
+    learner_ids = checkpoint_learners(source)
+    path = tmp_path / f"progress.{fmt}"
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        assert export_progress(source, f, fmt) == len(WALLETS)
+
+    target = CheckpointStore(str(tmp_path / 'target'))
+    state = import_file(str(path), 'progress', target)
+
+    assert (state['imported'], state['rejected']) == (len(WALLETS), 0)
+    for learner_id in learner_ids:
+        before, after = restored(source, learner_id), restored(target, learner_id)
+        assert after['wallet'] == before['wallet']
+        for name in ('username', 'xp', 'tokens', 'completed_lessons', 'lesson_completed_at', 'achievements'):
+            assert getattr(after['user_data'], name) == getattr(before['user_data'], name)
+        assert list(after['user_data'].quiz_scores.scores) == list(before['user_data'].quiz_scores.scores)
+
+
+@pytest.mark.parametrize('raw', [
+    {'username': 'no id'},
+    {'learner_id': '../escape'},
+    {'learner_id': 'a', 'xp': -1},
+    {'learner_id': 'a', 'xp': '1.5'},
+    {'learner_id': 'a', 'ability': 'nan'},
+    {'learner_id': 'a', 'wallet_balance': float('inf')},
+    {'learner_id': 'a', 'username': 'two\nlines'},
+    {'learner_id': 'a', 'wallet_address': '0x12 34'},
+    {'learner_id': 'a', 'lesson_completed_at': {'1': -5}},
+    {'learner_id': 'a', 'quiz_scores': [50.0], 'quiz_score_times': []},
+])
+def test_invalid_progress_is_rejected(raw):
+    with pytest.raises(ValueError):
+        validate_progress(raw)
+
+
+def test_csv_text_is_parsed_and_a_linked_address_connects_the_wallet():
+    record = validate_progress({'learner_id': 'a', 'xp': '40', 'wallet_address': '0xabc', 'username': ''})
+    assert record == {'learner_id': 'a', 'xp': 40, 'wallet_address': '0xabc', 'wallet_connected': True}
+
+
+def test_events_accept_a_learner_id():
+    row = validate_event({'ts': '1700000000', 'learner_id': 'ada', 'event': 'quiz_completed', 'score': '80'})
+    assert (row['learner'], row['score'], row['correct']) == (learner_key('ada'), 80.0, -1)
+    with pytest.raises(ValueError):
+        validate_event({'ts': 1, 'learner': 1, 'event': 'signed_up'})
+
+
+def write_jsonl(path, records):
+    path.write_text(''.join(line if isinstance(line, str) else json.dumps(line) + '\n' for line in records))
+
+
+def test_interrupted_import_resumes_after_the_last_chunk(tmp_path):
+    path = tmp_path / 'progress.jsonl'
+    write_jsonl(path, [{'learner_id': f"l{i}", 'xp': i} for i in range(5)] + ['not json\n', {'xp': 1}])
+    target = CheckpointStore(str(tmp_path / 'target'))
+
+    def interrupt(state):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        import_file(str(path), 'progress', target, chunk_size=2, on_chunk=interrupt)
+    assert sorted(target.learner_ids()) == ['l0', 'l1']
+
+    state = import_file(str(path), 'progress', target, chunk_size=2)
+    assert (state['imported'], state['rejected'], state['done']) == (5, 2, True)
+    assert sorted(target.learner_ids()) == [f"l{i}" for i in range(5)]
+    rejects = [json.loads(line) for line in open(f"{path}.rejects.jsonl")]
+    assert [reject['line'] for reject in rejects] == ['not json', '{"xp": 1}']
+
+
+def test_import_refuses_to_resume_a_changed_file(tmp_path):
+    path = tmp_path / 'progress.jsonl'
+    write_jsonl(path, [{'learner_id': 'a'}])
+    target = CheckpointStore(str(tmp_path / 'target'))
+    import_file(str(path), 'progress', target)
+    write_jsonl(path, [{'learner_id': 'a'}, {'learner_id': 'b'}])
+    with pytest.raises(ValueError, match='changed'):
+        import_file(str(path), 'progress', target)
+    assert import_file(str(path), 'progress', target, restart=True)['imported'] == 2
+
+
+def test_skip_existing_keeps_current_progress(tmp_path):
+    target = CheckpointStore(str(tmp_path / 'target'))
+    learner_id = checkpoint_learners(target)[1]
+    path = tmp_path / 'progress.jsonl'
+    write_jsonl(path, [{'learner_id': learner_id, 'xp': 0}, {'learner_id': 'new'}])
+    state = import_file(str(path), 'progress', target, skip_existing=True)
+    assert (state['imported'], state['skipped']) == (1, 1)
+    assert restored(target, learner_id)['user_data'].xp == 100
+
+
+def test_imported_events_are_readable(tmp_path):
+    path = tmp_path / 'events.csv'
+    path.write_text('ts,learner_id,event,lesson\n1700000000,ada,lesson_completed,2\n1700000060,bob,bogus,1\n')
+    log = EventLog(str(tmp_path / 'events'), flush_interval=3600)
+    state = import_file(str(path), 'events', log)
+    assert (state['imported'], state['rejected']) == (1, 1)
+    assert log.read(['learner', 'lesson']).to_pylist() == [{'learner': learner_key('ada'), 'lesson': 2}]
+
+
+def test_resume_links_issue_working_tokens(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    learner_ids = checkpoint_learners(store)
+    out = io.StringIO()
+    assert write_resume_links(store, out) == len(learner_ids)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert sorted(row['learner_id'] for row in rows) == sorted(learner_ids)
+    assert all(store.resume(row['resume']) == row['learner_id'] for row in rows)
@@ -0,0 +1,34 @@
+"""Paraphrase dedupe when a quiz is built from review and generated questions"""
+from question_bank import QuestionBank, QuestionStore
+
+
+def make_question(text, options=("A validator", "A wallet", "A token", "A block")):
+    return {'question': text, 'options': list(options), 'correct': 0, 'explanation': 'Because.'}
+
+
+REVIEW = make_question("What secures the CrossFi chain by staking XFI and producing blocks?")
+PARAPHRASE = make_question("What secures the CrossFi chain by staking XFI tokens and producing new blocks?")
+OTHER = make_question("Which EVM tool deploys Solidity contracts?", ("Remix", "Excel", "Paint", "Word"))
+
+
+def test_review_question_and_paraphrase_from_generation_serve_once():
+    store = QuestionStore()
+    bank = QuestionBank(store)
+    # Banked by an earlier quiz, now due for review
+    review_ids = tuple(bank.add('CrossFi Basics', 'beginner', [REVIEW]))
+    # Generation returns the review question and a paraphrase of it alongside a new one
+    generated = bank.add('CrossFi Basics', 'beginner', [PARAPHRASE, REVIEW, OTHER])
+    assert bank.near_duplicates_rejected == 1
+
+    fresh_ids = bank.distinct(generated, exclude=review_ids)
+
+    assert fresh_ids == [store.intern(OTHER)]
+    served = review_ids + tuple(fresh_ids)
+    assert len({bank.cluster_of(qid) for qid in served}) == len(served) == 2
+
+
+def test_rejected_paraphrase_keeps_its_cluster():
+    bank = QuestionBank(QuestionStore())
+    review_id, paraphrase_id = bank.add('CrossFi Basics', 'beginner', [REVIEW, PARAPHRASE])
+    assert bank.cluster_of(paraphrase_id) == bank.cluster_of(review_id)
+    assert bank.size('CrossFi Basics', 'beginner') == 1
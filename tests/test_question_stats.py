@@ -0,0 +1,59 @@
+"""Answer statistics flushing and difficulty calibration across workers"""
+import sqlite3
+
+import pytest
+
+from question_stats import LABEL_PRIORS, AnswerStats, calibrate
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'stats.db')
+
+
+def open_stats(path):
+    return AnswerStats(path, flush_interval=3600)
+
+
+def test_calibration_starts_at_the_label_prior_and_follows_answers():
+    assert calibrate('advanced', 0, 0, 0.0) == pytest.approx(LABEL_PRIORS['advanced'])
+    assert calibrate('advanced', 50, 50, 0.0) < calibrate('advanced', 50, 10, 0.0)
+
+
+def test_flush_writes_one_row_per_question(path):
+    stats = open_stats(path)
+    stats.record('q1', 'beginner', True, 4.0, 0.0)
+    stats.record('q1', 'beginner', False, 0.0, 0.0, skipped=True)
+    stats.record('q2', 'advanced', False, 9.0, 0.5)
+    assert stats.difficulty('q1', 'beginner') == LABEL_PRIORS['beginner']
+    assert stats.flush() == 2 and stats.pending == 0
+    summary = {row['qid']: row for row in stats.summary()}
+    assert (summary['q1']['exposures'], summary['q1']['accuracy'], summary['q1']['mean_seconds']) == (2, 0.5, 4.0)
+    assert stats.difficulty('q2', 'advanced') == summary['q2']['difficulty']
+    stats.close()
+
+
+def test_failed_flush_keeps_the_answers(path):
+    stats = open_stats(path)
+    stats.record('q1', 'beginner', True, 4.0, 0.0)
+    stats.path = path + '.missing/stats.db'
+    with pytest.raises(sqlite3.Error):
+        stats.flush()
+    stats._flush_quietly()
+    assert stats.pending == 1
+    stats.path = path
+    assert stats.flush() == 1
+    assert stats.summary()[0]['exposures'] == 1
+    stats.close()
+
+
+def test_refresh_picks_up_other_workers_calibrations(path):
+    first, second = open_stats(path), open_stats(path)
+    for _ in range(20):
+        first.record('q1', 'intermediate', True, 3.0, 0.0)
+    first.flush()
+    assert second.difficulty('q1', 'intermediate') == 0.0
+    assert second.refresh() == 1
+    assert second.difficulty('q1', 'intermediate') == first.difficulty('q1', 'intermediate') < 0.0
+    first.close()
+    second.close()
@@ -0,0 +1,70 @@
+"""Parsing, salvage and repair of model replies"""
+import json
+
+import pytest
+
+from quiz_generation import parse_quiz_response, repair_question, validate_questions
+
+QUESTION = {
+    'question': 'What is XFI?',
+    'options': ['A) The native token', 'B) A wallet', 'C) A validator', 'D) A block'],
+    'correct': 0,
+    'explanation': 'XFI pays for gas.',
+}
+
+
+def test_parses_fenced_json_with_prose():
+    content = f"Here you go:\n```json\n{json.dumps({'questions': [QUESTION]})}\n```\nEnjoy!"
+    assert parse_quiz_response(content) == [QUESTION]
+
+
+def test_salvages_complete_questions_from_a_truncated_array():
+    content = json.dumps([QUESTION, QUESTION])[:-40]
+    assert parse_quiz_response(content) == [QUESTION]
+
+
+def test_reply_without_questions_is_an_error():
+    with pytest.raises(ValueError):
+        parse_quiz_response("Sorry, I cannot help with that.")
+    with pytest.raises(ValueError):
+        parse_quiz_response('{"questions": []}')
+
+
+@pytest.mark.parametrize('answer', [0, '0', 'A', 'a)', '(A)', 'The native token', 'A) The native token'])
+def test_repairs_answer_formats(answer):
+    raw = dict(QUESTION, options=['The native token', 'A wallet', 'A validator', 'A block'])
+    del raw['correct']
+    raw['answer'] = answer
+    repaired = repair_question(raw)
+    assert repaired['correct'] == 0
+    assert repaired['options'][0] == 'A) The native token'
+
+
+def test_repairs_dict_options_and_missing_explanation():
+    raw = {'question': '  What is XFI? ', 'options': {'b': 'A wallet', 'a': 'The native token', 'c': 'A validator',
+                                                    'd': 'A block'}, 'correct': 'A'}
+    assert repair_question(raw) == {
+        'question': 'What is XFI?',
+        'options': ['A) The native token', 'B) A wallet', 'C) A validator', 'D) A block'],
+        'correct': 0,
+        'explanation': '',
+    }
+
+
+@pytest.mark.parametrize('raw', [
+    dict(QUESTION, options=QUESTION['options'][:3]),
+    dict(QUESTION, options=['A) Same', 'B) same', 'C) Other', 'D) Another']),
+    dict(QUESTION, correct=4),
+    dict(QUESTION, correct=True),
+    dict(QUESTION, question=''),
+    'not a question',
+])
+def test_rejects_unrepairable_questions(raw):
+    assert repair_question(raw) is None
+
+
+def test_validate_counts_repaired_and_rejected():
+    needs_repair = dict(QUESTION, correct='B')
+    valid, repaired, rejected = validate_questions([QUESTION, needs_repair, {'question': 'x'}])
+    assert [question['correct'] for question in valid] == [0, 1]
+    assert (repaired, rejected) == (1, 1)
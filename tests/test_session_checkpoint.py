@@ -0,0 +1,119 @@
+"""Checkpoint logs, replay, compaction and resume tokens"""
+import pytest
+
+from question_bank import QuestionStore
+from session_checkpoint import CheckpointStore, ScoreTail, SessionCheckpointer, restore_models
+from session_models import QuizState, UserData
+
+QUESTION = {'question': 'What is XFI?', 'options': ['A) a', 'B) b', 'C) c', 'D) d'], 'correct': 0,
+            'explanation': ''}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path))
+
+
+def session(store, user_data, **kwargs):
+    return SessionCheckpointer(store, user_data.learner_id, QuestionStore(), **kwargs)
+
+
+def test_checkpoints_append_only_changed_fields(store):
+    user_data = UserData(username='ada')
+    checkpointer = session(store, user_data)
+    checkpointer.checkpoint({'user_data': user_data})
+    user_data.xp = 50
+    checkpointer.checkpoint({'user_data': user_data})
+    assert checkpointer.checkpoint({'user_data': user_data}) == 0
+
+    snapshot, change = store.records(user_data.learner_id)
+    assert snapshot['snapshot'] and ('user_data', 'username') in snapshot['fields']
+    assert change['fields'] == {('user_data', 'xp'): 50}
+    fields, _ = store.load(user_data.learner_id)
+    assert restore_models(fields, {'user_data': UserData})['user_data'].xp == 50
+
+
+def test_in_place_edits_are_detected(store):
+    user_data = UserData()
+    checkpointer = session(store, user_data)
+    checkpointer.checkpoint({'user_data': user_data})
+    user_data.completed_lessons.append(1)
+    checkpointer.checkpoint({'user_data': user_data})
+    assert store.records(user_data.learner_id)[-1]['fields'] == {('user_data', 'completed_lessons'): [1]}
+
+
+def test_score_history_is_written_as_tails(store):
+    user_data = UserData()
+    checkpointer = session(store, user_data)
+    user_data.quiz_scores.append(50.0, 1.0)
+    checkpointer.checkpoint({'user_data': user_data})
+    user_data.quiz_scores.append(75.0, 2.0)
+    checkpointer.checkpoint({'user_data': user_data})
+
+    tail = store.records(user_data.learner_id)[-1]['fields'][('user_data', 'quiz_scores')]
+    assert isinstance(tail, ScoreTail) and tail.start == 1 and list(tail.scores) == [75.0]
+    fields, _ = store.load(user_data.learner_id)
+    history = fields[('user_data', 'quiz_scores')]
+    assert list(history.scores) == [50.0, 75.0] and list(history.timestamps) == [1.0, 2.0]
+
+
+def test_log_is_compacted_into_a_snapshot(store):
+    user_data = UserData()
+    checkpointer = session(store, user_data, compact_after=3)
+    for xp in range(6):
+        user_data.xp = xp
+        checkpointer.checkpoint({'user_data': user_data})
+    assert checkpointer.snapshots == 2
+    assert len(store.records(user_data.learner_id)) == 2
+    assert store.load(user_data.learner_id)[0][('user_data', 'xp')] == 5
+
+
+def test_torn_record_ends_replay(store, tmp_path):
+    user_data = UserData()
+    checkpointer = session(store, user_data)
+    checkpointer.checkpoint({'user_data': user_data})
+    user_data.xp = 10
+    checkpointer.checkpoint({'user_data': user_data})
+    path = tmp_path / f"{user_data.learner_id}.ckpt"
+    path.write_bytes(path.read_bytes()[:-2])
+    assert store.load(user_data.learner_id)[0][('user_data', 'xp')] == 0
+
+
+def test_quiz_checkpoints_carry_question_bodies(store):
+    questions = QuestionStore()
+    qid = questions.intern(QUESTION)
+    checkpointer = SessionCheckpointer(store, 'learner', questions)
+    checkpointer.checkpoint({'quiz_state': QuizState(active=True, question_ids=[qid])})
+    fields, saved = store.load('learner')
+    assert fields[('quiz_state', 'question_ids')] == (qid,)
+    assert saved[qid]['question'] == QUESTION['question']
+
+
+def test_skipped_fields_are_not_written(store):
+    user_data = UserData(username='ada')
+    session(store, user_data, skip={('user_data', 'username')}).checkpoint({'user_data': user_data})
+    assert ('user_data', 'username') not in store.load(user_data.learner_id)[0]
+
+
+def test_resume_tokens_rotate_and_are_revoked(store):
+    assert store.resume('learner') is None
+    first = store.issue_resume('learner')
+    assert first.startswith('learner.') and store.resume(first) == 'learner'
+    second = store.issue_resume('learner')
+    assert store.resume(first) is None and store.resume(second) == 'learner'
+    assert store.resume('other.' + second.partition('.')[2]) is None
+    assert store.resume('../learner.x') is None
+    store.delete('learner')
+    assert store.resume(second) is None
+
+
+def test_reissued_token_supersedes_the_old_session(store):
+    store.issue_resume('learner')
+    user_data = UserData()
+    old = SessionCheckpointer(store, 'learner', QuestionStore(), resume_stamp=store.resume_stamp('learner'))
+    assert old.checkpoint({'user_data': user_data}) > 0
+
+    store.issue_resume('learner')
+    user_data.xp = 99
+    assert old.checkpoint({'user_data': user_data}) == 0 and old.superseded
+    assert store.load('learner')[0][('user_data', 'xp')] == 0
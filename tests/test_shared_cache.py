@@ -0,0 +1,124 @@
+"""Leases, single-flight and in-flight sharing on every cache backend"""
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks import fake_redis
+from shared_cache import CacheError, MemoryCache, RedisCache, SQLiteCache, open_cache
+
+
+@pytest.fixture(scope='module')
+def redis_port():
+    ready = queue.Queue()
+    threading.Thread(target=fake_redis.serve, kwargs={'port': 0, 'ready': ready}, daemon=True).start()
+    return ready.get(timeout=5)
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        cache = MemoryCache()
+    elif request.param == 'sqlite':
+        cache = SQLiteCache(str(tmp_path / 'cache.db'))
+    else:
+        cache = RedisCache(port=request.getfixturevalue('redis_port'), prefix=f"{uuid.uuid4().hex}:")
+    cache.poll_interval = 0.01
+    return cache
+
+
+def test_values_expire(cache):
+    cache.set('a', {'x': 1}, ttl=0.1)
+    cache.set('b', [1, 2])
+    assert cache.get('a') == {'x': 1}
+    time.sleep(0.15)
+    assert cache.get('a', 'gone') == 'gone' and cache.get('b') == [1, 2]
+    cache.delete('b')
+    assert cache.get('b') is None
+
+
+def test_release_only_deletes_its_own_lease(cache):
+    assert cache._acquire('L', 'a', 0.1)
+    assert not cache._acquire('L', 'b', 5)
+    time.sleep(0.15)
+    # 'a' outlived its lease and 'b' took over; a late release by 'a' must not free the lock
+    assert cache._acquire('L', 'b', 5)
+    cache._release('L', 'a')
+    assert cache._holder('L') == 'b'
+    cache._release('L', 'b')
+    assert cache._holder('L') is None
+
+
+def test_lock_yields_false_while_held(cache):
+    with cache.lock('job', wait_seconds=0.1) as first:
+        with cache.lock('job', wait_seconds=0.1) as second:
+            assert (first, second) == (True, False)
+    with cache.lock('job', wait_seconds=0.1) as again:
+        assert again
+
+
+def slow(result, calls, seconds=0.2):
+    def compute():
+        calls.append(1)
+        time.sleep(seconds)
+        return result
+    return compute
+
+
+def test_get_or_compute_computes_once_across_callers(cache):
+    calls = []
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: cache.get_or_compute('k', slow('v', calls), ttl=60), range(8)))
+    assert results == ['v'] * 8 and len(calls) == 1
+    assert cache.get_or_compute('k', slow('other', calls)) == 'v' and len(calls) == 1
+
+
+def test_get_or_compute_caches_nothing_on_error(cache):
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('k', fail)
+    assert cache._holder('k') is None
+    assert cache.get_or_compute('k', lambda: 'v') == 'v'
+
+
+def test_share_in_flight_merges_overlapping_calls_only(cache):
+    calls = []
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: cache.share_in_flight('k', slow(len(calls), calls)), range(8)))
+    assert results == [0] * 8 and len(calls) == 1
+    # Nothing is reused once the computation has ended
+    assert cache.share_in_flight('k', slow('fresh', calls, 0)) == 'fresh' and len(calls) == 2
+
+
+def test_late_waiter_gives_up_with_the_holder(cache):
+    holder_calls, waiter_calls = [], []
+    with ThreadPoolExecutor(1) as pool:
+        holder = pool.submit(cache.share_in_flight, 'k', slow('holder', holder_calls, 1.0), 5.0, 0.4)
+        time.sleep(0.2)
+        started = time.monotonic()
+        # The waiter's own budget is 5 s, but the holder's runs out in about 0.2 s
+        assert cache.share_in_flight('k', lambda: waiter_calls.append(1) or 'local', wait_seconds=5.0) == 'local'
+        assert time.monotonic() - started < 0.6
+        assert holder.result() == 'holder' and waiter_calls == [1]
+
+
+def test_unreachable_backend_computes_locally():
+    cache = RedisCache(port=1, timeout=0.2)
+    with pytest.raises(CacheError):
+        cache.get('k')
+    assert cache.get_or_compute('k', lambda: 'v') == 'v'
+    assert cache.share_in_flight('k', lambda: 'w') == 'w'
+
+
+def test_open_cache_urls(tmp_path):
+    assert isinstance(open_cache('memory', None), MemoryCache)
+    assert isinstance(open_cache('', str(tmp_path / 'a.db')), SQLiteCache)
+    redis = open_cache('redis://:s%40cret@example.com:6390/2', None)
+    assert (redis.host, redis.port, redis.db, redis.password) == ('example.com', 6390, 2, 's@cret')
+    with pytest.raises(ValueError):
+        open_cache('memcached://x', None)
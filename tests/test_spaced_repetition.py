@@ -0,0 +1,118 @@
+"""SM-2 scheduling and review state persistence"""
+import os
+
+import pytest
+
+from spaced_repetition import (DAY, QUALITY_CORRECT, QUALITY_INCORRECT, ReviewItem, ReviewSchedule,
+                               ReviewStore)
+
+QIDS = [f"{i:016x}" for i in range(1, 6)]
+
+
+def state(schedule):
+    # Easiness and interval are stored as float32
+    return {qid: (item.deck, pytest.approx(item.easiness), pytest.approx(item.interval), item.repetitions,
+                  item.lapses, item.due)
+            for qid, item in schedule.items.items()}
+
+
+def test_sm2_intervals_grow_and_a_lapse_resets_them():
+    item = ReviewItem(QIDS[0], 'basics')
+    intervals = []
+    for _ in range(3):
+        item.review(QUALITY_CORRECT, now=0.0)
+        intervals.append(item.interval)
+    assert intervals == [1.0, 6.0, round(6.0 * item.easiness, 2)]
+    item.review(QUALITY_INCORRECT, now=100.0)
+    assert (item.interval, item.repetitions, item.lapses) == (1.0, 0, 1)
+    assert item.due == 100.0 + DAY
+
+
+def test_easiness_has_a_floor():
+    item = ReviewItem(QIDS[0], 'basics')
+    for _ in range(20):
+        item.review(0, now=0.0)
+    assert item.easiness == 1.3
+
+
+def test_due_returns_most_overdue_first_and_keeps_items_scheduled():
+    schedule = ReviewSchedule()
+    for offset, qid in enumerate(QIDS[:3]):
+        schedule.record(qid, 'basics', QUALITY_INCORRECT, now=offset * 10.0)
+    schedule.record(QIDS[3], 'defi', QUALITY_INCORRECT, now=0.0)
+    now = 20.0 + DAY
+    assert schedule.due('basics', 2, now=now) == QIDS[:2]
+    assert schedule.due('basics', 5, now=now) == QIDS[:3]
+    assert schedule.due('basics', 5, now=DAY + 5.0) == QIDS[:1]
+    assert schedule.due('missing', 5, now=now) == []
+
+
+def test_rescheduled_items_skip_their_stale_heap_entries():
+    schedule = ReviewSchedule()
+    schedule.record(QIDS[0], 'basics', QUALITY_INCORRECT, now=0.0)
+    schedule.record(QIDS[1], 'basics', QUALITY_INCORRECT, now=0.0)
+    schedule.record(QIDS[0], 'basics', QUALITY_CORRECT, now=DAY)
+    schedule.record(QIDS[0], 'basics', QUALITY_CORRECT, now=DAY)
+    assert schedule.due('basics', 5, now=DAY + 10.0) == [QIDS[1]]
+    assert schedule.due('basics', 5, now=DAY * 8) == [QIDS[1], QIDS[0]]
+
+
+def test_schedule_bytes_round_trip():
+    schedule = ReviewSchedule()
+    schedule.record(QIDS[0], 'basics', QUALITY_CORRECT, now=0.0)
+    schedule.record(QIDS[1], 'DeFi ✓', QUALITY_INCORRECT, now=0.0)
+    loaded = ReviewSchedule.from_bytes(schedule.to_bytes())
+    assert state(loaded) == state(schedule)
+    assert loaded.due('DeFi ✓', 1, now=DAY) == [QIDS[1]]
+
+
+def test_store_appends_changes_and_replays_them(tmp_path):
+    store = ReviewStore(str(tmp_path), compact_after=10)
+    schedule = store.load('learner')
+    schedule.record(QIDS[0], 'basics', QUALITY_CORRECT, now=0.0)
+    store.save('learner', schedule)
+    schedule.record(QIDS[0], 'basics', QUALITY_CORRECT, now=DAY)
+    schedule.record(QIDS[1], 'defi', QUALITY_INCORRECT, now=DAY)
+    store.save('learner', schedule)
+
+    assert not os.path.exists(tmp_path / 'learner.srs')
+    loaded = store.load('learner')
+    assert state(loaded) == state(schedule)
+    assert loaded.logged == 3 and not loaded.dirty
+
+
+def test_store_compacts_the_log_into_a_snapshot(tmp_path):
+    store = ReviewStore(str(tmp_path), compact_after=2)
+    schedule = store.load('learner')
+    for i, qid in enumerate(QIDS):
+        schedule.record(qid, 'basics', QUALITY_CORRECT, now=float(i))
+        store.save('learner', schedule)
+    assert os.path.exists(tmp_path / 'learner.srs')
+    assert schedule.logged <= 2
+    assert state(store.load('learner')) == state(schedule)
+
+
+def test_torn_log_record_ends_replay(tmp_path):
+    store = ReviewStore(str(tmp_path))
+    schedule = store.load('learner')
+    schedule.record(QIDS[0], 'basics', QUALITY_CORRECT, now=0.0)
+    store.save('learner', schedule)
+    expected = state(schedule)
+    schedule.record(QIDS[1], 'basics', QUALITY_CORRECT, now=0.0)
+    store.save('learner', schedule)
+    log = tmp_path / 'learner.srs.log'
+    log.write_bytes(log.read_bytes()[:-3])
+    assert state(store.load('learner')) == expected
+
+
+def test_question_bodies_are_kept_by_id(tmp_path):
+    store = ReviewStore(str(tmp_path))
+    question = {'question': 'What is XFI?', 'options': ['A) a', 'B) b', 'C) c', 'D) d'], 'correct': 0}
+    store.save_question(QIDS[0], question)
+    store.save_question(QIDS[0], dict(question, correct=1))
+    assert store.load_question(QIDS[0]) == question
+    assert store.load_question(QIDS[1]) is None
+    with pytest.raises(ValueError):
+        store.load_question('../secrets')
+    with pytest.raises(ValueError):
+        store.load('../learner')
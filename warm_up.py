@@ -0,0 +1,61 @@
+"""Process warm-up that runs before a worker is reported ready.
+
+A fresh process makes its first learners pay for creating the Groq client,
+loading the question bank, indexing lessons and the first Plotly figure and
+pandas Styler (both import and compile a lot lazily). ``WarmUp`` runs named
+steps once, in order, and times each one; ``status()`` is ready only after
+every step has finished. A failing step is logged and recorded, not
+retried: the app has a degraded path for each of them, so it should not
+keep the worker out of rotation.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """Ordered ``(name, callable)`` steps, run once per process"""
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.results = []
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        """Run every step in order; calling it again does nothing"""
+        with self._lock:
+            if self.started is not None:
+                return self
+            self.started = time.time()
+        for name, step in self.steps:
+            began = time.perf_counter()
+            error = None
+            try:
+                step()
+            except Exception as e:
+                logger.warning("Warm-up step %s failed: %s", name, e, exc_info=True)
+                error = f"{type(e).__name__}: {e}"
+            with self._lock:
+                self.results.append({'step': name, 'seconds': round(time.perf_counter() - began, 3), 'error': error})
+        self.finished = time.time()
+        return self
+
+    @property
+    def ready(self):
+        return self.finished is not None
+
+    def status(self):
+        """Readiness summary for ``/ready`` and the admin tab"""
+        with self._lock:
+            results = [dict(result) for result in self.results]
+        done = {result['step'] for result in results}
+        return {
+            'ready': self.ready,
+            'seconds': round((self.finished or time.time()) - self.started, 3) if self.started else 0.0,
+            'steps': results,
+            'pending': [name for name, _ in self.steps if name not in done]
+        }